@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
-from tree_sitter_languages import get_parser
+from tree_sitter import Tree
+
+from .parser_pool import get_parser
+from .symbols import is_decorated, symbol_kind, symbol_name
 
 
 @dataclass
@@ -11,6 +14,10 @@ class AstChunk:
   text: str
   start_line: int
   end_line: int
+  # Set for chunks that are a named definition (function, class, method, ...).
+  symbol: Optional[str] = None
+  kind: Optional[str] = None
+  decorated: bool = False
 
 
 NODE_TYPES: Dict[str, List[str]] = {
@@ -45,13 +52,14 @@ NODE_TYPES: Dict[str, List[str]] = {
 }
 
 
-def extract_ast_chunks(language: str, source: str, path: str) -> List[AstChunk]:
-  try:
-    parser = get_parser(language)
-  except Exception:
-    return []
-
-  tree = parser.parse(bytes(source, "utf-8"))
+def extract_ast_chunks(language: str, source: str, path: str, tree: Optional[Tree] = None) -> List[AstChunk]:
+  """Chunk `source`; pass the `tree` from language detection to skip re-parsing."""
+  if tree is None:
+    try:
+      parser = get_parser(language)
+    except Exception:
+      return []
+    tree = parser.parse(bytes(source, "utf-8"))
   if tree.root_node.has_error:
     return []
 
@@ -73,6 +81,9 @@ def extract_ast_chunks(language: str, source: str, path: str) -> List[AstChunk]:
         text=text,
         start_line=start_line,
         end_line=end_line,
+        symbol=symbol_name(node),
+        kind=symbol_kind(node),
+        decorated=is_decorated(node),
       )
     )
 
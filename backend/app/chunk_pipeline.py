@@ -0,0 +1,143 @@
+import hashlib
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from .ast_chunker import AstChunk
+from .config import settings
+from .import_extractor import extract_import_specs
+from .repo_parser import analyze_file
+from .symbols import SymbolDef
+
+# Namespace for deterministic chunk point ids; changing it orphans every stored point.
+_POINT_NAMESPACE = uuid.UUID("6f1f3c1e-3b7a-5d2c-9a41-0c7e2b9d8f10")
+
+
+def chunk_point_id(project_id: str, path: str, start_line: int, end_line: int, text: str) -> str:
+  """Stable Qdrant point id, so re-embedding unchanged chunks overwrites instead of duplicating."""
+  text_hash = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+  return str(uuid.uuid5(_POINT_NAMESPACE, f"{project_id}:{path}:{start_line}-{end_line}:{text_hash}"))
+
+
+@dataclass
+class FileChunks:
+  path: str
+  chunks: List[AstChunk]
+  imports: List[str] = field(default_factory=list)
+  symbols: List[SymbolDef] = field(default_factory=list)
+  identifiers: Dict[str, int] = field(default_factory=dict)
+  # sha256 of the file bytes, matching the upload manifest.
+  sha256: str = ""
+
+
+def chunk_files(root: Path, files: List[str]) -> List[FileChunks]:
+  """Read and chunk files serially; this is the unit of work a pool worker runs."""
+  results: List[FileChunks] = []
+  for rel in files:
+    full = root / rel
+    if not full.is_file():
+      continue
+    data = full.read_bytes()
+    # Same text Path.read_text would give (universal newlines), without reading the file twice.
+    content = data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    analysis = analyze_file(full, content, rel)
+    results.append(
+      FileChunks(
+        path=rel,
+        chunks=analysis.chunks,
+        imports=analysis.imports,
+        symbols=analysis.symbols,
+        identifiers=analysis.identifiers,
+        sha256=hashlib.sha256(data).hexdigest(),
+      )
+    )
+  return results
+
+
+def scan_import_specs(root: Path, files: List[str]) -> Dict[str, List[str]]:
+  """Read files and extract their import specifiers without parsing; the pool task for edge building."""
+  specs: Dict[str, List[str]] = {}
+  for rel in files:
+    try:
+      content = (root / rel).read_text(encoding="utf-8", errors="ignore")
+    except OSError:
+      continue
+    specs[rel] = extract_import_specs(rel, content)
+  return specs
+
+
+def collect_import_specs(root: Path, files: List[str], workers: Optional[int] = None) -> Dict[str, List[str]]:
+  """Import specifiers for `files`, scanned across the chunk pool when there is more than one task."""
+  workers = workers or settings.chunk_workers
+  per_task = max(1, settings.chunk_files_per_task) * 4
+  tasks = [files[i : i + per_task] for i in range(0, len(files), per_task)]
+  specs: Dict[str, List[str]] = {}
+  if workers <= 1 or len(tasks) <= 1:
+    for task in tasks:
+      specs.update(scan_import_specs(root, task))
+    return specs
+  pool = _get_pool(workers)
+  for result in pool.map(scan_import_specs, [root] * len(tasks), tasks):
+    specs.update(result)
+  return specs
+
+
+def iter_chunk_batches(
+  root: Path,
+  files: List[str],
+  workers: Optional[int] = None,
+  files_per_task: Optional[int] = None,
+) -> Iterator[List[FileChunks]]:
+  """
+  Parse and chunk `files` across a process pool, yielding one batch per completed task.
+  At most `workers + settings.chunk_queue_size` tasks are submitted or waiting to be consumed,
+  so a slow embedding stage applies backpressure instead of the whole repo piling up in memory.
+  Batches arrive in completion order, not file order.
+  """
+  workers = workers or settings.chunk_workers
+  files_per_task = max(1, files_per_task or settings.chunk_files_per_task)
+  tasks = [files[i : i + files_per_task] for i in range(0, len(files), files_per_task)]
+  if workers <= 1 or len(tasks) <= 1:
+    for task in tasks:
+      yield chunk_files(root, task)
+    return
+
+  pool = _get_pool(workers)
+  remaining = iter(tasks)
+  pending: Set[Future] = {
+    pool.submit(chunk_files, root, task) for task in islice(remaining, workers + max(1, settings.chunk_queue_size))
+  }
+  try:
+    while pending:
+      finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+      for future in finished:
+        # Refill before handing the batch over so workers stay busy while the consumer embeds.
+        next_task = next(remaining, None)
+        if next_task is not None:
+          pending.add(pool.submit(chunk_files, root, next_task))
+        yield future.result()
+  finally:
+    for future in pending:
+      future.cancel()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+  """One long-lived pool per process; spawn avoids forking a server that already runs threads."""
+  global _pool, _pool_workers
+  with _pool_lock:
+    if _pool is None or _pool_workers != workers:
+      if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+      _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+      _pool_workers = workers
+    return _pool
@@ -1,23 +1,88 @@
-from typing import Optional
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
 from qdrant_client import QdrantClient
-from qdrant_client.http.exceptions import UnexpectedResponse
 from qdrant_client.http import models as rest
 
 from .config import settings
 
+# One client (and HTTP connection pool) per Qdrant endpoint, reused by every request.
+_clients: Dict[Tuple[str, Optional[str]], QdrantClient] = {}
+# Vector size of the collections each client has already seen or created.
+_known_collections: "weakref.WeakKeyDictionary[QdrantClient, Dict[str, int]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class CollectionSizeMismatch(ValueError):
+  """A collection exists but holds vectors of another size than the ones being written or searched."""
+
 
 def get_qdrant() -> Optional[QdrantClient]:
-  """Return a Qdrant client when URL is configured; otherwise None."""
+  """Return the shared Qdrant client when URL is configured; otherwise None."""
   if not settings.qdrant_url:
     return None
-  return QdrantClient(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
+  key = (settings.qdrant_url, settings.qdrant_api_key)
+  with _lock:
+    client = _clients.get(key)
+    if client is None:
+      client = _clients[key] = QdrantClient(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
+  return client
 
 
-def ensure_collection(client: QdrantClient, name: str, vector_size: int) -> None:
-  try:
-    client.get_collection(name)
-  except UnexpectedResponse:
+def ensure_collection(client: QdrantClient, name: str, vector_size: int, recreate: bool = False) -> None:
+  """
+  Create collection `name` if missing. A collection holding vectors of another size (e.g. after
+  VECTOR_SIZE or the embedding provider changed) raises CollectionSizeMismatch, unless `recreate`
+  is set, which drops it and its points; only a full re-embed should ask for that. The size is
+  remembered in-process, so only the first call per collection round-trips.
+  """
+  with _lock:
+    if _known_collections.get(client, {}).get(name) == vector_size:
+      return
+  exists = client.collection_exists(name)
+  size = _collection_vector_size(client, name) if exists else None
+  if exists and size != vector_size:
+    if not recreate:
+      raise CollectionSizeMismatch(f"collection {name} holds vectors of size {size}, not {vector_size}")
+    print(f"[qdrant] collection={name} holds vectors of size {size}; recreating it for size {vector_size}")
+    client.delete_collection(name)
+    exists = False
+  if not exists:
     client.create_collection(
       collection_name=name,
       vectors_config=rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE),
+      quantization_config=quantization_config(),
     )
+  with _lock:
+    _known_collections.setdefault(client, {})[name] = vector_size
+
+
+def _collection_vector_size(client: QdrantClient, name: str) -> Optional[int]:
+  """Size of the collection's single unnamed vector; None for any other layout."""
+  vectors = client.get_collection(name).config.params.vectors
+  return vectors.size if isinstance(vectors, rest.VectorParams) else None
+
+
+def quantization_config() -> Optional[rest.QuantizationConfig]:
+  """Quantization for new collections per settings.qdrant_quantization; None keeps full-precision vectors only."""
+  mode = settings.qdrant_quantization
+  if mode == "none":
+    return None
+  if mode == "scalar":
+    return rest.ScalarQuantization(
+      scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, quantile=0.99, always_ram=True)
+    )
+  if mode == "product":
+    return rest.ProductQuantization(
+      product=rest.ProductQuantizationConfig(compression=rest.CompressionRatio.X16, always_ram=True)
+    )
+  raise ValueError(f"unknown Qdrant quantization: {mode}")
+
+
+def search_params() -> Optional[rest.SearchParams]:
+  """Search over quantized vectors, re-scoring oversampled candidates with the original ones."""
+  if settings.qdrant_quantization == "none":
+    return None
+  return rest.SearchParams(
+    quantization=rest.QuantizationSearchParams(rescore=True, oversampling=settings.qdrant_oversampling)
+  )
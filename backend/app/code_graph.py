@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+from .db import load_dependencies, project_files
+
+
+class DependencyGraph:
+  """
+  Read-only import graph of one project in CSR form.
+  Node i's imports are out_idx[out_ptr[i]:out_ptr[i + 1]]; its importers live in the same
+  layout under in_ptr/in_idx. Paths map to node ids through `index`.
+  """
+
+  def __init__(self, paths: List[str], edges: Iterable[Tuple[str, str]]) -> None:
+    edges = list(edges)
+    self.paths = sorted(set(paths).union(*map(set, edges)))
+    self.index: Dict[str, int] = {path: i for i, path in enumerate(self.paths)}
+    pairs = np.array([(self.index[src], self.index[dst]) for src, dst in edges], dtype=np.int32).reshape(-1, 2)
+    self.out_ptr, self.out_idx = _csr(len(self.paths), pairs[:, 0], pairs[:, 1])
+    self.in_ptr, self.in_idx = _csr(len(self.paths), pairs[:, 1], pairs[:, 0])
+    self._pagerank: Optional[np.ndarray] = None
+
+  def __len__(self) -> int:
+    return len(self.paths)
+
+  @property
+  def edge_count(self) -> int:
+    return int(self.out_idx.shape[0])
+
+  def dependencies(self, path: str) -> List[str]:
+    """Files `path` imports."""
+    return self._adjacent(path, self.out_ptr, self.out_idx)
+
+  def dependents(self, path: str) -> List[str]:
+    """Files that import `path`."""
+    return self._adjacent(path, self.in_ptr, self.in_idx)
+
+  def k_hop(self, sources: Iterable[str], hops: int, direction: str = "both") -> Dict[str, int]:
+    """
+    Breadth-first distances from `sources` up to `hops` edges away, sources included at 0.
+    direction is "out" (imports), "in" (importers) or "both".
+    """
+    if direction not in {"out", "in", "both"}:
+      raise ValueError(f"Unknown direction '{direction}'")
+    adjacency = []
+    if direction in {"out", "both"}:
+      adjacency.append((self.out_ptr, self.out_idx))
+    if direction in {"in", "both"}:
+      adjacency.append((self.in_ptr, self.in_idx))
+    dist: Dict[int, int] = {self.index[path]: 0 for path in sources if path in self.index}
+    frontier = deque(dist)
+    while frontier:
+      node = frontier.popleft()
+      if dist[node] >= hops:
+        continue
+      for ptr, idx in adjacency:
+        for nxt in idx[ptr[node] : ptr[node + 1]].tolist():
+          if nxt not in dist:
+            dist[nxt] = dist[node] + 1
+            frontier.append(nxt)
+    return {self.paths[node]: d for node, d in dist.items()}
+
+  def strongly_connected_components(self, min_size: int = 1) -> List[List[str]]:
+    """Import cycles (and singletons when min_size is 1), largest first; iterative Tarjan."""
+    n = len(self.paths)
+    order = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[str]] = []
+    counter = 0
+    for root in range(n):
+      if order[root] != -1:
+        continue
+      work = [(root, int(self.out_ptr[root]))]
+      order[root] = low[root] = counter
+      counter += 1
+      stack.append(root)
+      on_stack[root] = True
+      while work:
+        node, pos = work[-1]
+        if pos < self.out_ptr[node + 1]:
+          work[-1] = (node, pos + 1)
+          nxt = int(self.out_idx[pos])
+          if order[nxt] == -1:
+            order[nxt] = low[nxt] = counter
+            counter += 1
+            stack.append(nxt)
+            on_stack[nxt] = True
+            work.append((nxt, int(self.out_ptr[nxt])))
+          elif on_stack[nxt]:
+            low[node] = min(low[node], order[nxt])
+          continue
+        work.pop()
+        if work:
+          parent = work[-1][0]
+          low[parent] = min(low[parent], low[node])
+        if low[node] == order[node]:
+          component = []
+          while True:
+            member = stack.pop()
+            on_stack[member] = False
+            component.append(self.paths[member])
+            if member == node:
+              break
+          if len(component) >= min_size:
+            components.append(sorted(component))
+    components.sort(key=lambda c: (-len(c), c))
+    return components
+
+  def pagerank(self, damping: float = 0.85, iterations: int = 100, tol: float = 1e-8) -> Dict[str, float]:
+    """
+    Centrality along import edges: heavily imported files, and files imported by those, score high.
+    Computed once per graph.
+    """
+    if self._pagerank is None:
+      self._pagerank = self._power_iteration(damping, iterations, tol)
+    return {path: float(score) for path, score in zip(self.paths, self._pagerank)}
+
+  def central_files(self, limit: Optional[int] = None) -> List[str]:
+    """Paths ordered by PageRank, highest first; ties keep path order."""
+    ranks = self.pagerank()
+    ordered = sorted(self.paths, key=lambda path: -ranks[path])
+    return ordered if limit is None else ordered[:limit]
+
+  def _adjacent(self, path: str, ptr: np.ndarray, idx: np.ndarray) -> List[str]:
+    node = self.index.get(path)
+    if node is None:
+      return []
+    return [self.paths[i] for i in idx[ptr[node] : ptr[node + 1]].tolist()]
+
+  def _power_iteration(self, damping: float, iterations: int, tol: float) -> np.ndarray:
+    n = len(self.paths)
+    if not n:
+      return np.zeros(0)
+    out_degree = np.diff(self.out_ptr).astype(np.float64)
+    src = np.repeat(np.arange(n), np.diff(self.out_ptr))
+    dangling = out_degree == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+      share = np.divide(rank, out_degree, out=np.zeros(n), where=~dangling)
+      nxt = np.bincount(self.out_idx, weights=share[src], minlength=n)
+      # Files that import nothing spread their rank evenly, like a random jump.
+      nxt = damping * (nxt + rank[dangling].sum() / n) + (1.0 - damping) / n
+      done = np.abs(nxt - rank).sum() < tol
+      rank = nxt
+      if done:
+        break
+    return rank
+
+
+def _csr(n: int, rows: np.ndarray, cols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+  order = np.lexsort((cols, rows))
+  ptr = np.zeros(n + 1, dtype=np.int64)
+  np.cumsum(np.bincount(rows, minlength=n), out=ptr[1:])
+  return ptr, cols[order].astype(np.int32)
+
+
+_graphs: "OrderedDict[str, DependencyGraph]" = OrderedDict()
+_graphs_lock = threading.Lock()
+# Bumped on invalidation so a load that raced with a dependency save is not cached.
+_generations: Dict[str, int] = {}
+
+
+def get_graph(project_id: str) -> DependencyGraph:
+  """Project graph from the in-process LRU, loading files and edges from SQLite on a miss."""
+  with _graphs_lock:
+    graph = _graphs.get(project_id)
+    if graph is not None:
+      _graphs.move_to_end(project_id)
+      return graph
+    generation = _generations.get(project_id, 0)
+  graph = DependencyGraph(project_files(project_id), load_dependencies(project_id))
+  with _graphs_lock:
+    if _generations.get(project_id, 0) != generation:
+      return graph
+    _graphs[project_id] = graph
+    _graphs.move_to_end(project_id)
+    while len(_graphs) > max(1, settings.graph_cache_size):
+      _graphs.popitem(last=False)
+  return graph
+
+
+def invalidate_graph(project_id: str) -> None:
+  """Drop the cached graph; call after the project's files or dependencies change."""
+  with _graphs_lock:
+    _graphs.pop(project_id, None)
+    _generations[project_id] = _generations.get(project_id, 0) + 1
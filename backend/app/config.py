@@ -16,7 +16,75 @@ class Settings:
     self.storage_dir.mkdir(parents=True, exist_ok=True)
     db_path_env = os.getenv("DATABASE_PATH")
     self.database_path = Path(db_path_env).resolve() if db_path_env else self.storage_dir / "projects.db"
-    self.vector_size = 64
+    # Dimension of local (offline) embeddings. Indexes built at another size are treated as stale
+    # (retrieval finds nothing) until /embedRepo rebuilds them.
+    self.vector_size = int(os.getenv("VECTOR_SIZE", "64"))
+    # Path-scoped Qdrant retrieval: "grouped" (one search_groups query over all neighbor paths)
+    # or "parallel" (one search per path, qdrant_search_concurrency at a time).
+    self.qdrant_path_search = os.getenv("QDRANT_PATH_SEARCH", "grouped")
+    self.qdrant_search_concurrency = int(os.getenv("QDRANT_SEARCH_CONCURRENCY", "8"))
+    # Quantization for newly created Qdrant collections: "none", "scalar" (int8) or "product";
+    # quantized searches re-score qdrant_oversampling x limit candidates with the original vectors.
+    self.qdrant_quantization = os.getenv("QDRANT_QUANTIZATION", "none")
+    self.qdrant_oversampling = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+    # Local index vector storage: "float32", "float16" or "int8" (per-row scale); an existing index
+    # is converted the next time it is saved (/embedRepo or an upload). local_vector_rerank > 0
+    # re-ranks that many x k candidates of a quantized index at full precision, at the cost of a
+    # float32 copy on disk next to the quantized rows (more disk than plain float32); 0 keeps none.
+    self.local_vector_dtype = os.getenv("LOCAL_VECTOR_DTYPE", "float32")
+    self.local_vector_rerank = int(os.getenv("LOCAL_VECTOR_RERANK", "0"))
+    # IVF-flat ANN over the local index, trained by /embedRepo once a project has ann_min_rows chunks
+    # (0 never builds one): lists (0 = about sqrt(rows)) and lists scanned per query (0 = exact scan).
+    self.ann_min_rows = int(os.getenv("ANN_MIN_ROWS", "50000"))
+    self.ann_nlist = int(os.getenv("ANN_NLIST", "0"))
+    self.ann_nprobe = int(os.getenv("ANN_NPROBE", "16"))
+    # Upload guards: request body size, total extracted bytes, source files per archive, and the
+    # uncompressed/compressed ratio above which an entry is treated as a zip bomb.
+    self.max_upload_bytes = int(os.getenv("MAX_UPLOAD_BYTES", str(4 * 1024**3)))
+    self.max_extract_bytes = int(os.getenv("MAX_EXTRACT_BYTES", str(2 * 1024**3)))
+    self.max_archive_entries = int(os.getenv("MAX_ARCHIVE_ENTRIES", "200000"))
+    self.max_compression_ratio = float(os.getenv("MAX_COMPRESSION_RATIO", "200"))
+    # Chunks sent per provider embedding request, and how many requests may be in flight.
+    self.embed_batch_size = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    self.embed_max_inflight = int(os.getenv("EMBED_MAX_INFLIGHT", "4"))
+    # Max vectors kept in the on-disk embedding cache; 0 disables caching.
+    self.embed_cache_max_entries = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+    # Background worker threads for /jobs (embedRepo, reviewRepo).
+    self.job_workers = int(os.getenv("JOB_WORKERS", "2"))
+    # Parse/chunk process pool: worker count (<=1 runs inline), files per task, finished batches buffered.
+    self.chunk_workers = int(os.getenv("CHUNK_WORKERS", str(max(1, (os.cpu_count() or 1) - 1))))
+    self.chunk_files_per_task = int(os.getenv("CHUNK_FILES_PER_TASK", "16"))
+    self.chunk_queue_size = int(os.getenv("CHUNK_QUEUE_SIZE", "8"))
+    # Dependency graphs kept in memory; import hops and max files a path-scoped retrieval widens to.
+    self.graph_cache_size = int(os.getenv("GRAPH_CACHE_SIZE", "32"))
+    self.graph_hops = int(os.getenv("GRAPH_HOPS", "2"))
+    self.graph_max_paths = int(os.getenv("GRAPH_MAX_PATHS", "8"))
+    # Decoded file contents kept in memory for slicing retrieval snippets (characters, roughly bytes).
+    self.snippet_cache_bytes = int(os.getenv("SNIPPET_CACHE_BYTES", str(64 * 1024 * 1024)))
+    # Definition chunks appended to retrieval results for identifiers the hits use; 0 disables.
+    self.definition_expansion = int(os.getenv("DEFINITION_EXPANSION", "3"))
+    # Retrieval ranking: "vector", "lexical" (BM25) or "hybrid" (reciprocal rank fusion of both),
+    # and the RRF constant that damps the weight of top ranks.
+    self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid")
+    self.rrf_k = int(os.getenv("RRF_K", "60"))
+    # Prompt context budgets in (estimated) tokens for file and repository reviews.
+    self.context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+    self.repo_context_token_budget = int(os.getenv("REPO_CONTEXT_TOKEN_BUDGET", "24000"))
+    # Repo review: "single" prompt or "map_reduce" over partitions sized to the repo budget, with
+    # at most review_concurrency partitions in flight and a wall-clock cap for the whole review.
+    self.repo_review_mode = os.getenv("REPO_REVIEW_MODE", "single")
+    self.review_concurrency = int(os.getenv("REVIEW_CONCURRENCY", "4"))
+    self.review_deadline_seconds = float(os.getenv("REVIEW_DEADLINE_SECONDS", "600"))
+    # LLM/embedding provider calls: per-attempt timeout, retries on 429/5xx (backoff doubling from
+    # llm_backoff_seconds), requests in flight per provider and requests per minute (0 = unlimited).
+    self.llm_timeout_seconds = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+    self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    self.llm_backoff_seconds = float(os.getenv("LLM_BACKOFF_SECONDS", "1.0"))
+    self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    self.llm_requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    # Generated responses kept on disk (0 disables caching) and how long one stays valid.
+    self.llm_cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    self.llm_cache_ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
 
 
 settings = Settings()
@@ -0,0 +1,165 @@
+import hashlib
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List
+
+# Approximates BPE tokenizers on code: one token per punctuation mark and per (up to) 4-character
+# slice of a word. No tokenizer dependency, and it errs slightly high, which is the safe side.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+# Charged per packed chunk for the "@@ lines a-b" header it may introduce.
+_BLOCK_OVERHEAD = 8
+# A chunk that does not fit is cut to its leading lines only if at least this much budget is left.
+_MIN_PARTIAL_TOKENS = 48
+
+
+def count_tokens(text: str) -> int:
+  return len(_TOKEN_RE.findall(text))
+
+
+@dataclass
+class PackedContext:
+  text: str
+  tokens: int
+  chunks_packed: int
+  chunks_dropped: int
+  # Files with at least one line in `text`, in the order they appear.
+  paths: List[str]
+
+
+def pack_context(chunks: List[dict], budget: int) -> PackedContext:
+  """
+  Fill a token budget with ranked chunks ({path, snippet, line, ...}, best first) and render them
+  as line-numbered source grouped by file.
+  Selection is greedy in rank order: lines already taken from the same file cost nothing again,
+  identical chunks are packed once, and a chunk that does not fit is cut to the leading lines that
+  do (or skipped when too little budget is left, so later, smaller chunks can still use the room).
+  Overlapping and adjacent ranges of one file come out as a single block.
+  """
+  taken: Dict[str, Dict[int, str]] = {}
+  seen_text = set()
+  remaining = budget
+  packed = dropped = 0
+  for chunk in chunks:
+    path = chunk["path"]
+    snippet = chunk.get("snippet") or ""
+    digest = hashlib.sha1(snippet.encode("utf-8")).digest()
+    file_lines = taken.get(path, {})
+    start = chunk.get("line") or 1
+    fresh = [(n, text) for n, text in enumerate(snippet.splitlines(), start=start) if n not in file_lines]
+    if not fresh or digest in seen_text:
+      continue
+    cost = _BLOCK_OVERHEAD + (0 if path in taken else count_tokens(_file_header(path)))
+    costs = [count_tokens(_numbered(n, text)) for n, text in fresh]
+    if cost + sum(costs) > remaining:
+      if remaining < _MIN_PARTIAL_TOKENS:
+        dropped += 1
+        continue
+      keep = 0
+      running = cost
+      while keep < len(fresh) and running + costs[keep] <= remaining:
+        running += costs[keep]
+        keep += 1
+      if keep == 0:
+        dropped += 1
+        continue
+      fresh, costs = fresh[:keep], costs[:keep]
+    seen_text.add(digest)
+    taken.setdefault(path, {}).update(fresh)
+    remaining -= cost + sum(costs)
+    packed += 1
+
+  text = "\n\n".join(_render_file(path, lines) for path, lines in taken.items())
+  return PackedContext(
+    text=text, tokens=count_tokens(text), chunks_packed=packed, chunks_dropped=dropped, paths=list(taken)
+  )
+
+
+def whole_file_tokens(path: str, content: str) -> int:
+  """Budget pack_context charges for `content` packed whole as one chunk starting at line 1."""
+  lines = sum(count_tokens(_numbered(n, text)) for n, text in enumerate(content.splitlines(), start=1))
+  return _BLOCK_OVERHEAD + count_tokens(_file_header(path)) + lines
+
+
+def _file_header(path: str) -> str:
+  return f"File: {path}"
+
+
+def _numbered(number: int, text: str) -> str:
+  return f"{number:>5} | {text}"
+
+
+def _render_file(path: str, lines: Dict[int, str]) -> str:
+  numbers = sorted(lines)
+  out = [_file_header(path)]
+  for i, number in enumerate(numbers):
+    if i == 0 or number != numbers[i - 1] + 1:
+      block_end = number
+      while block_end + 1 in lines:
+        block_end += 1
+      out.append(f"@@ lines {number}-{block_end}")
+    out.append(_numbered(number, lines[number]))
+  return "\n".join(out)
+
+
+class PromptStats:
+  """
+  Per-kind prompt token counters for measuring what packing saves; thread-safe. Token totals
+  count only prompts actually sent to the provider; cache hits and skipped calls are tallied
+  separately so they do not inflate the cost.
+  """
+
+  def __init__(self) -> None:
+    self._lock = threading.Lock()
+    self._kinds: Dict[str, Dict[str, int]] = {}
+
+  def record(self, kind: str, prompt: str, context: PackedContext, budget: int, outcome: str) -> int:
+    """
+    Count `prompt` once the call is done, log it and add it to the totals for `kind`. `outcome`
+    is "sent", "cached" or "skipped" (see llm_cache); returns the tokens sent, 0 unless sent.
+    """
+    tokens = count_tokens(prompt)
+    print(
+      f"[llm] {kind} prompt {outcome}: {tokens} tokens (context {context.tokens}/{budget}, "
+      f"{context.chunks_packed} chunks packed, {context.chunks_dropped} dropped)"
+    )
+    sent = outcome == "sent"
+    with self._lock:
+      totals = self._kinds.setdefault(
+        kind,
+        {
+          "requests": 0,
+          "sent": 0,
+          "cached": 0,
+          "skipped": 0,
+          "prompt_tokens": 0,
+          "cached_prompt_tokens": 0,
+          "context_tokens": 0,
+          "chunks_packed": 0,
+          "chunks_dropped": 0,
+        },
+      )
+      totals["requests"] += 1
+      totals[outcome if outcome in ("cached", "skipped") else "sent"] += 1
+      if sent:
+        totals["prompt_tokens"] += tokens
+        totals["context_tokens"] += context.tokens
+      elif outcome == "cached":
+        totals["cached_prompt_tokens"] += tokens
+      totals["chunks_packed"] += context.chunks_packed
+      totals["chunks_dropped"] += context.chunks_dropped
+    return tokens if sent else 0
+
+  def stats(self) -> List[Dict]:
+    with self._lock:
+      return [
+        {
+          "kind": kind,
+          **totals,
+          "avg_prompt_tokens": round(totals["prompt_tokens"] / totals["sent"], 1) if totals["sent"] else 0.0,
+        }
+        for kind, totals in sorted(self._kinds.items())
+      ]
+
+
+prompt_stats = PromptStats()
@@ -1,95 +1,472 @@
+import json
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .config import settings
 
-
-def _db_path() -> Path:
-  return settings.database_path
-
-
-def init_db():
-  path = _db_path()
-  conn = sqlite3.connect(path)
-  cur = conn.cursor()
-  cur.execute(
+# Each entry is one schema version; PRAGMA user_version records how many have been applied.
+# Append new migrations, never edit applied ones. Version 1 matches databases created before
+# versioning existed, so its statements must stay idempotent.
+_MIGRATIONS: List[List[str]] = [
+  [
     """
     CREATE TABLE IF NOT EXISTS projects (
       id TEXT PRIMARY KEY,
       name TEXT NOT NULL,
       created_at TEXT NOT NULL
     )
-    """
-  )
-  cur.execute(
+    """,
     """
     CREATE TABLE IF NOT EXISTS files (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       project_id TEXT NOT NULL,
       path TEXT NOT NULL
     )
-    """
-  )
-  cur.execute(
+    """,
     """
     CREATE TABLE IF NOT EXISTS dependencies (
       project_id TEXT NOT NULL,
       src TEXT NOT NULL,
       dst TEXT NOT NULL
     )
+    """,
     """
-  )
-  conn.commit()
-  conn.close()
+    CREATE TABLE IF NOT EXISTS jobs (
+      id TEXT PRIMARY KEY,
+      kind TEXT NOT NULL,
+      project_id TEXT NOT NULL,
+      params TEXT NOT NULL,
+      status TEXT NOT NULL,
+      progress_done INTEGER NOT NULL DEFAULT 0,
+      progress_total INTEGER NOT NULL DEFAULT 0,
+      message TEXT,
+      result TEXT,
+      error TEXT,
+      cancel_requested INTEGER NOT NULL DEFAULT 0,
+      created_at TEXT NOT NULL,
+      updated_at TEXT NOT NULL
+    )
+    """,
+  ],
+  [
+    "CREATE INDEX IF NOT EXISTS idx_files_project_path ON files (project_id, path)",
+    "CREATE INDEX IF NOT EXISTS idx_dependencies_src ON dependencies (project_id, src)",
+    "CREATE INDEX IF NOT EXISTS idx_dependencies_dst ON dependencies (project_id, dst)",
+    "CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)",
+  ],
+  [
+    # Symbol index: per-file identifier counts (JSON), their project-wide totals, and definitions.
+    """
+    CREATE TABLE symbol_files (
+      project_id TEXT NOT NULL,
+      path TEXT NOT NULL,
+      sha256 TEXT NOT NULL,
+      tokens TEXT NOT NULL,
+      PRIMARY KEY (project_id, path)
+    )
+    """,
+    """
+    CREATE TABLE symbol_refs (
+      project_id TEXT NOT NULL,
+      name TEXT NOT NULL,
+      uses INTEGER NOT NULL,
+      PRIMARY KEY (project_id, name)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE symbol_defs (
+      project_id TEXT NOT NULL,
+      path TEXT NOT NULL,
+      name TEXT NOT NULL,
+      kind TEXT NOT NULL,
+      start_line INTEGER NOT NULL,
+      end_line INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX idx_symbol_defs_name ON symbol_defs (project_id, name)",
+    "CREATE INDEX idx_symbol_defs_path ON symbol_defs (project_id, path)",
+  ],
+  [
+    # Definitions now come from the chunker: link each to its chunk (Qdrant point id).
+    "ALTER TABLE symbol_defs ADD COLUMN chunk_id TEXT",
+    "ALTER TABLE symbol_defs ADD COLUMN decorated INTEGER NOT NULL DEFAULT 0",
+  ],
+  [
+    # Import specifiers of each file (JSON list), so incremental uploads can re-resolve the
+    # imports of unchanged files without reading them.
+    """
+    CREATE TABLE import_specs (
+      project_id TEXT NOT NULL,
+      path TEXT NOT NULL,
+      specs TEXT NOT NULL,
+      PRIMARY KEY (project_id, path)
+    ) WITHOUT ROWID
+    """,
+  ],
+]
 
+_local = threading.local()
 
-def save_project(project_id: str, name: str, created_at: str, files: List[str]):
-  conn = sqlite3.connect(_db_path())
+
+def _db_path() -> Path:
+  return settings.database_path
+
+
+def _connection() -> sqlite3.Connection:
+  """This thread's connection to the configured database, opened once and reused."""
+  conns: Dict[str, sqlite3.Connection] = getattr(_local, "conns", None) or {}
+  if not conns:
+    _local.conns = conns
+  key = str(_db_path())
+  conn = conns.get(key)
+  if conn is None:
+    # Autocommit mode; writes go through transaction() which issues BEGIN IMMEDIATE itself.
+    conn = sqlite3.connect(key, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conns[key] = conn
+  return conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Cursor]:
+  """Write transaction on this thread's connection; commits on success, rolls back on error."""
+  conn = _connection()
   cur = conn.cursor()
-  cur.execute(
-    "INSERT OR REPLACE INTO projects (id, name, created_at) VALUES (?, ?, ?)",
-    (project_id, name, created_at),
-  )
-  cur.execute("DELETE FROM files WHERE project_id = ?", (project_id,))
-  cur.executemany(
-    "INSERT INTO files (project_id, path) VALUES (?, ?)",
-    [(project_id, path) for path in files],
-  )
-  conn.commit()
-  conn.close()
+  cur.execute("BEGIN IMMEDIATE")
+  try:
+    yield cur
+  except BaseException:
+    cur.execute("ROLLBACK")
+    raise
+  cur.execute("COMMIT")
+
+
+def _query(sql: str, params: tuple = ()) -> List[tuple]:
+  return _connection().execute(sql, params).fetchall()
+
+
+def close_connections() -> None:
+  """Close every connection opened by the calling thread."""
+  for conn in (getattr(_local, "conns", None) or {}).values():
+    conn.close()
+  _local.conns = {}
+
+
+def init_db():
+  """Create or upgrade the schema to the latest migration."""
+  with transaction() as cur:
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    for number, statements in enumerate(_MIGRATIONS[version:], start=version + 1):
+      for statement in statements:
+        cur.execute(statement)
+      cur.execute(f"PRAGMA user_version = {number}")
+
+
+def save_project(project_id: str, name: str, created_at: str, files: List[str]):
+  with transaction() as cur:
+    cur.execute(
+      "INSERT OR REPLACE INTO projects (id, name, created_at) VALUES (?, ?, ?)",
+      (project_id, name, created_at),
+    )
+    cur.execute("DELETE FROM files WHERE project_id = ?", (project_id,))
+    cur.executemany(
+      "INSERT INTO files (project_id, path) VALUES (?, ?)",
+      [(project_id, path) for path in files],
+    )
 
 
 def save_dependencies(project_id: str, edges: List[tuple[str, str]]):
-  conn = sqlite3.connect(_db_path())
-  cur = conn.cursor()
-  cur.execute("DELETE FROM dependencies WHERE project_id = ?", (project_id,))
+  with transaction() as cur:
+    cur.execute("DELETE FROM dependencies WHERE project_id = ?", (project_id,))
+    cur.executemany(
+      "INSERT INTO dependencies (project_id, src, dst) VALUES (?, ?, ?)",
+      [(project_id, src, dst) for src, dst in edges],
+    )
+
+
+def update_dependencies(project_id: str, sources: List[str], removed: List[str], edges: List[tuple[str, str]]):
+  """Replace outgoing edges of `sources` and drop any edge touching a `removed` path."""
+  with transaction() as cur:
+    cur.executemany(
+      "DELETE FROM dependencies WHERE project_id = ? AND src = ?",
+      [(project_id, path) for path in [*sources, *removed]],
+    )
+    cur.executemany(
+      "DELETE FROM dependencies WHERE project_id = ? AND dst = ?",
+      [(project_id, path) for path in removed],
+    )
+    cur.executemany(
+      "INSERT INTO dependencies (project_id, src, dst) VALUES (?, ?, ?)",
+      [(project_id, src, dst) for src, dst in edges],
+    )
+
+
+def save_import_specs(project_id: str, specs: Dict[str, List[str]]):
+  """Replace every stored import specifier list of the project."""
+  with transaction() as cur:
+    cur.execute("DELETE FROM import_specs WHERE project_id = ?", (project_id,))
+    _insert_import_specs(cur, project_id, specs)
+
+
+def update_import_specs(project_id: str, specs: Dict[str, List[str]], removed: List[str]):
+  """Store the specifier lists of `specs` files and forget those of `removed` ones."""
+  with transaction() as cur:
+    cur.executemany(
+      "DELETE FROM import_specs WHERE project_id = ? AND path = ?", [(project_id, path) for path in removed]
+    )
+    _insert_import_specs(cur, project_id, specs)
+
+
+def _insert_import_specs(cur: sqlite3.Cursor, project_id: str, specs: Dict[str, List[str]]) -> None:
   cur.executemany(
-    "INSERT INTO dependencies (project_id, src, dst) VALUES (?, ?, ?)",
-    [(project_id, src, dst) for src, dst in edges],
+    "INSERT OR REPLACE INTO import_specs (project_id, path, specs) VALUES (?, ?, ?)",
+    [(project_id, path, json.dumps(file_specs)) for path, file_specs in specs.items()],
   )
-  conn.commit()
-  conn.close()
+
+
+def load_import_specs(project_id: str) -> Dict[str, List[str]]:
+  rows = _query("SELECT path, specs FROM import_specs WHERE project_id = ?", (project_id,))
+  return {path: json.loads(specs) for path, specs in rows}
+
+
+def get_project(project_id: str) -> Optional[Dict]:
+  rows = _query("SELECT id, name, created_at FROM projects WHERE id = ?", (project_id,))
+  if not rows:
+    return None
+  row = rows[0]
+  return {"id": row[0], "name": row[1], "created_at": row[2]}
 
 
 def neighbors(project_id: str, path: str) -> List[str]:
-  conn = sqlite3.connect(_db_path())
-  cur = conn.cursor()
-  cur.execute("SELECT dst FROM dependencies WHERE project_id = ? AND src = ?", (project_id, path))
-  res = [row[0] for row in cur.fetchall()]
-  conn.close()
-  return res
+  rows = _query("SELECT dst FROM dependencies WHERE project_id = ? AND src = ?", (project_id, path))
+  return [row[0] for row in rows]
 
 
-def list_projects() -> List[Dict]:
-  conn = sqlite3.connect(_db_path())
-  cur = conn.cursor()
-  cur.execute("SELECT id, name, created_at FROM projects ORDER BY created_at DESC")
-  projects = cur.fetchall()
-  result = []
-  for project_id, name, created_at in projects:
-    cur.execute("SELECT path FROM files WHERE project_id = ? ORDER BY path", (project_id,))
-    files = [row[0] for row in cur.fetchall()]
-    result.append({"id": project_id, "name": name, "created_at": created_at, "files": files})
-  conn.close()
+def project_files(project_id: str) -> List[str]:
+  return [row[0] for row in _query("SELECT path FROM files WHERE project_id = ? ORDER BY path", (project_id,))]
+
+
+def load_dependencies(project_id: str) -> List[tuple[str, str]]:
+  return [(row[0], row[1]) for row in _query("SELECT src, dst FROM dependencies WHERE project_id = ?", (project_id,))]
+
+
+def list_projects(limit: int = 50, offset: int = 0, include_files: bool = False) -> List[Dict]:
+  """One page of projects, newest first, with file counts; full file lists only on request."""
+  rows = _query(
+    """
+    SELECT p.id, p.name, p.created_at, (SELECT COUNT(*) FROM files f WHERE f.project_id = p.id)
+    FROM projects p
+    ORDER BY p.created_at DESC, p.id
+    LIMIT ? OFFSET ?
+    """,
+    (limit, offset),
+  )
+  result = [
+    {"id": project_id, "name": name, "created_at": created_at, "file_count": file_count}
+    for project_id, name, created_at, file_count in rows
+  ]
+  if include_files and result:
+    files: Dict[str, List[str]] = {project["id"]: [] for project in result}
+    marks = ",".join("?" * len(files))
+    for project_id, path in _query(
+      f"SELECT project_id, path FROM files WHERE project_id IN ({marks}) ORDER BY project_id, path",
+      tuple(files),
+    ):
+      files[project_id].append(path)
+    for project in result:
+      project["files"] = files[project["id"]]
   return result
+
+
+def count_projects() -> int:
+  return _query("SELECT COUNT(*) FROM projects")[0][0]
+
+
+def symbol_file_hashes(project_id: str) -> Dict[str, str]:
+  """Content hash of every file currently in the project's symbol index."""
+  return dict(_query("SELECT path, sha256 FROM symbol_files WHERE project_id = ?", (project_id,)))
+
+
+def apply_symbol_changes(
+  project_id: str,
+  removed: List[str],
+  updates: List[Tuple[str, str, Dict[str, int], List[Tuple[str, str, int, int, Optional[str], bool]]]],
+) -> None:
+  """
+  Drop `removed` files from the symbol index and (re)index `updates`, given as
+  (path, sha256, identifier counts, [(name, kind, start_line, end_line, chunk_id, decorated)]).
+  Project-wide identifier totals are adjusted by the difference, so unchanged files are never re-read.
+  """
+  with transaction() as cur:
+    for path in [*removed, *(update[0] for update in updates)]:
+      row = cur.execute(
+        "SELECT tokens FROM symbol_files WHERE project_id = ? AND path = ?", (project_id, path)
+      ).fetchone()
+      if row is None:
+        continue
+      cur.executemany(
+        "UPDATE symbol_refs SET uses = uses - ? WHERE project_id = ? AND name = ?",
+        [(count, project_id, name) for name, count in json.loads(row[0]).items()],
+      )
+      cur.execute("DELETE FROM symbol_files WHERE project_id = ? AND path = ?", (project_id, path))
+      cur.execute("DELETE FROM symbol_defs WHERE project_id = ? AND path = ?", (project_id, path))
+    for path, sha256, counts, definitions in updates:
+      cur.execute(
+        "INSERT INTO symbol_files (project_id, path, sha256, tokens) VALUES (?, ?, ?, ?)",
+        (project_id, path, sha256, json.dumps(counts, separators=(",", ":"))),
+      )
+      cur.executemany(
+        """
+        INSERT INTO symbol_refs (project_id, name, uses) VALUES (?, ?, ?)
+        ON CONFLICT (project_id, name) DO UPDATE SET uses = uses + excluded.uses
+        """,
+        [(project_id, name, count) for name, count in counts.items()],
+      )
+      cur.executemany(
+        """
+        INSERT INTO symbol_defs (project_id, path, name, kind, start_line, end_line, chunk_id, decorated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(project_id, path, *definition) for definition in definitions],
+      )
+    cur.execute("DELETE FROM symbol_refs WHERE project_id = ? AND uses <= 0", (project_id,))
+
+
+def unused_symbol_defs(project_id: str) -> List[Dict]:
+  """Definitions whose name occurs nowhere in the project except at its own definition sites."""
+  rows = _query(
+    """
+    SELECT d.name, d.kind, d.path, d.start_line
+    FROM symbol_defs d
+    JOIN (SELECT name, COUNT(*) AS sites FROM symbol_defs WHERE project_id = ? GROUP BY name) s ON s.name = d.name
+    LEFT JOIN symbol_refs r ON r.project_id = d.project_id AND r.name = d.name
+    WHERE d.project_id = ? AND d.decorated = 0 AND COALESCE(r.uses, 0) <= s.sites
+    ORDER BY d.name, d.path, d.start_line
+    """,
+    (project_id, project_id),
+  )
+  return [{"name": name, "kind": kind, "path": path, "line": line} for name, kind, path, line in rows]
+
+
+_SYMBOL_COLUMNS = ("name", "kind", "path", "start_line", "end_line", "chunk_id")
+
+
+def find_symbol_defs(
+  project_id: str, names: Optional[List[str]] = None, path: Optional[str] = None
+) -> List[Dict]:
+  """Definitions in a project, filtered to `names` and/or one `path`, ordered by path and line."""
+  clauses, params = ["project_id = ?"], [project_id]
+  if names is not None:
+    if not names:
+      return []
+    clauses.append(f"name IN ({','.join('?' * len(names))})")
+    params.extend(names)
+  if path is not None:
+    clauses.append("path = ?")
+    params.append(path)
+  rows = _query(
+    f"SELECT {', '.join(_SYMBOL_COLUMNS)} FROM symbol_defs WHERE {' AND '.join(clauses)} ORDER BY path, start_line",
+    tuple(params),
+  )
+  return [dict(zip(_SYMBOL_COLUMNS, row)) for row in rows]
+
+
+def files_using_identifier(project_id: str, name: str) -> List[Tuple[str, int]]:
+  """(path, occurrences) for every indexed file whose tokens include `name`."""
+  rows = _query(
+    """
+    SELECT path, json_extract(tokens, ?) AS uses FROM symbol_files
+    WHERE project_id = ? AND uses IS NOT NULL ORDER BY path
+    """,
+    (f'$."{name}"', project_id),
+  )
+  return [(path, uses) for path, uses in rows]
+
+
+_JOB_COLUMNS = (
+  "id, kind, project_id, params, status, progress_done, progress_total, message, result, error, "
+  "cancel_requested, created_at, updated_at"
+)
+
+
+def _job_row(row) -> Dict:
+  keys = [key.strip() for key in _JOB_COLUMNS.split(",")]
+  job = dict(zip(keys, row))
+  job["params"] = json.loads(job["params"] or "{}")
+  job["result"] = json.loads(job["result"]) if job["result"] else None
+  job["cancel_requested"] = bool(job["cancel_requested"])
+  return job
+
+
+def create_job(job_id: str, kind: str, project_id: str, params: Dict, created_at: str) -> Dict:
+  with transaction() as cur:
+    cur.execute(
+      "INSERT INTO jobs (id, kind, project_id, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+      (job_id, kind, project_id, json.dumps(params), created_at, created_at),
+    )
+  return get_job(job_id)  # type: ignore[return-value]
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+  rows = _query(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+  return _job_row(rows[0]) if rows else None
+
+
+def claim_next_job(now: str) -> Optional[Dict]:
+  """Atomically move the oldest queued job to running and return it."""
+  with transaction() as cur:
+    row = cur.execute(
+      f"""
+      UPDATE jobs SET status = 'running', updated_at = ?
+      WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1)
+      RETURNING {_JOB_COLUMNS}
+      """,
+      (now,),
+    ).fetchone()
+  return _job_row(row) if row else None
+
+
+def update_job(job_id: str, now: str, **fields) -> None:
+  """Set any of status, progress_done, progress_total, message, result, error on a job."""
+  if "result" in fields:
+    fields["result"] = json.dumps(fields["result"])
+  assignments = ", ".join(f"{key} = ?" for key in fields)
+  with transaction() as cur:
+    cur.execute(
+      f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+      (*fields.values(), now, job_id),
+    )
+
+
+def request_job_cancel(job_id: str, now: str) -> Optional[Dict]:
+  """Cancel a queued job outright; flag a running job so its worker stops at the next checkpoint."""
+  with transaction() as cur:
+    cur.execute(
+      "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'queued'",
+      (now, job_id),
+    )
+    cur.execute(
+      "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+      (now, job_id),
+    )
+  return get_job(job_id)
+
+
+def requeue_interrupted_jobs(now: str) -> int:
+  """Jobs left running by a previous process are queued again on startup."""
+  with transaction() as cur:
+    cur.execute(
+      "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND cancel_requested = 0",
+      (now,),
+    )
+    requeued = cur.rowcount
+    cur.execute(
+      "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE status = 'running' AND cancel_requested = 1",
+      (now,),
+    )
+  return requeued
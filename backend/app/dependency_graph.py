@@ -1,122 +1,234 @@
-import re
-from pathlib import Path
-from typing import Dict, List, Set, Tuple
+import posixpath
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-REL_IMPORT_RE = re.compile(r"""from\s+['"]([^'"]+)['"]|import\s+['"]([^'"]+)['"]""")
-JS_IMPORT_RE = re.compile(r"""(?:import|require)\s*(?:[\w\{\}\*\s,]+from\s*)?['"]([^'"]+)['"]""")
-PY_IMPORT_RE = re.compile(r"""^(?:from\s+([a-zA-Z0-9_\.]+)\s+import|import\s+([a-zA-Z0-9_\.]+))""", re.MULTILINE)
-GO_IMPORT_RE = re.compile(r'^\s*import\s+"([^"]+)"|^\s*"([^"]+)"', re.MULTILINE)
-JAVA_IMPORT_RE = re.compile(r"""^\s*import\s+([a-zA-Z0-9\._]+);""", re.MULTILINE)
+from .chunk_pipeline import collect_import_specs
+from .import_extractor import import_language
 
+JS_EXTS = [".ts", ".tsx", ".js", ".jsx"]
+# Leading segments of common TS path aliases ("@/lib/x", "~/lib/x"); the rest resolves by suffix.
+JS_ALIASES = {"@", "~"}
 
-def build_dependency_edges(root: Path, files: List[str]) -> List[Tuple[str, str]]:
-  file_set: Set[str] = set(files)
+
+def build_dependency_edges(
+  root: Path,
+  files: List[str],
+  sources: Optional[List[str]] = None,
+  specs: Optional[Dict[str, List[str]]] = None,
+) -> List[Tuple[str, str]]:
+  """
+  Import edges between project files. Imports resolve against all of `files`;
+  only `sources` (default: every file) contribute edges. Import specifiers already collected
+  during upload or chunking can be passed as `specs`; other sources are read and scanned,
+  in parallel on the chunk pool for large sets.
+  """
+  sources = files if sources is None else sources
+  return resolve_import_edges(files, import_specs_for(root, sources, specs))
+
+
+def import_specs_for(
+  root: Path, sources: List[str], specs: Optional[Dict[str, List[str]]] = None
+) -> Dict[str, List[str]]:
+  """Import specifiers of each of `sources`, taken from `specs` when present and scanned from disk otherwise."""
+  known = dict(specs or {})
+  missing = [rel for rel in sources if rel not in known and import_language(rel)]
+  if missing:
+    known.update(collect_import_specs(root, missing))
+  return {rel: known.get(rel, []) for rel in sources}
+
+
+def resolve_import_edges(files: Iterable[str], specs: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+  """Resolve per-file import specifiers to (importer, imported) edges within `files`."""
+  index = PathIndex(files)
   edges: Set[Tuple[str, str]] = set()
-  for rel in files:
-    full = root / rel
-    if not full.exists():
+  for rel, file_specs in specs.items():
+    resolver = _RESOLVERS.get(import_language(rel) or "")
+    if resolver is None:
       continue
-    try:
-      content = full.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-      continue
-    lang = _language_for_path(rel)
-    targets: Set[str] = set()
-    if lang in {"javascript", "typescript", "tsx"}:
-      targets |= _resolve_js_imports(rel, content, file_set)
-    elif lang == "python":
-      targets |= _resolve_python_imports(rel, content, file_set)
-    elif lang == "go":
-      targets |= _resolve_go_imports(rel, content, file_set)
-    elif lang == "java":
-      targets |= _resolve_java_imports(rel, content, file_set)
-    edges |= {(rel, t) for t in targets if t in file_set and t != rel}
+    for spec in file_specs:
+      for target in resolver(index, rel, spec):
+        if target != rel:
+          edges.add((rel, target))
   return sorted(edges)
 
 
-def _language_for_path(path: str) -> str:
-  ext = Path(path).suffix.lower()
-  if ext in {".js", ".jsx"}:
-    return "javascript"
-  if ext in {".ts", ".tsx"}:
-    return "typescript"
-  if ext == ".py":
-    return "python"
-  if ext == ".go":
-    return "go"
-  if ext == ".java":
-    return "java"
-  return "unknown"
-
-
-def _resolve_js_imports(rel_path: str, content: str, file_set: Set[str]) -> Set[str]:
-  targets: Set[str] = set()
-  dir_path = Path(rel_path).parent
-  for match in JS_IMPORT_RE.finditer(content):
-    mod = match.group(1)
-    if not mod:
-      continue
-    resolved = _resolve_rel_path(dir_path, mod, [".ts", ".tsx", ".js", ".jsx"])
-    if resolved in file_set:
-      targets.add(resolved)
-  return targets
-
-
-def _resolve_python_imports(rel_path: str, content: str, file_set: Set[str]) -> Set[str]:
-  targets: Set[str] = set()
-  dir_path = Path(rel_path).parent
-  for match in PY_IMPORT_RE.finditer(content):
-    mod = match.group(1) or match.group(2)
-    if not mod:
-      continue
-    candidate = Path(*mod.split(".")).with_suffix(".py")
-    # absolute import
-    if str(candidate) in file_set:
-      targets.add(str(candidate))
-    else:
-      rel_candidate = (dir_path / candidate).as_posix()
-      if rel_candidate in file_set:
-        targets.add(rel_candidate)
-  return targets
-
-
-def _resolve_go_imports(rel_path: str, content: str, file_set: Set[str]) -> Set[str]:
-  targets: Set[str] = set()
-  dir_path = Path(rel_path).parent
-  for match in GO_IMPORT_RE.finditer(content):
-    mod = match.group(1) or match.group(2)
-    if not mod:
-      continue
-    # local import like "./pkg" or "../pkg"
-    if mod.startswith("."):
-      candidate = (dir_path / mod / "index.go").resolve().relative_to(Path.cwd()).as_posix()
-      if candidate in file_set:
-        targets.add(candidate)
-      continue
-    # try match file names
-    candidate = "/".join(mod.split("/")) + ".go"
-    if candidate in file_set:
-      targets.add(candidate)
-  return targets
-
-
-def _resolve_java_imports(rel_path: str, content: str, file_set: Set[str]) -> Set[str]:
-  targets: Set[str] = set()
-  for match in JAVA_IMPORT_RE.finditer(content):
-    mod = match.group(1)
-    if not mod:
-      continue
-    candidate = "/".join(mod.split(".")) + ".java"
-    if candidate in file_set:
-      targets.add(candidate)
-  return targets
-
-
-def _resolve_rel_path(base: Path, mod: str, exts: List[str]) -> str:
-  p = Path(mod)
-  if not p.suffix:
-    for ext in exts:
-      candidate = (base / (mod + ext)).as_posix()
-      if candidate:
+class _TrieNode:
+  __slots__ = ("children", "paths")
+
+  def __init__(self) -> None:
+    self.children: Dict[str, "_TrieNode"] = {}
+    self.paths: List[str] = []
+
+
+class PathIndex:
+  """
+  Lookup structure over a project's files for import resolution, built once per edge pass.
+  Exact paths are a set lookup; module paths that only match the tail of a file path
+  (e.g. "lib/store.ts" for "frontend/src/lib/store.ts") go through suffix tries of files and directories.
+  """
+
+  def __init__(self, files: Iterable[str]) -> None:
+    self.files: Set[str] = set(files)
+    self.dir_files: Dict[str, List[str]] = {}
+    self._file_trie = _TrieNode()
+    self._dir_trie = _TrieNode()
+    for path in sorted(self.files):
+      parts = path.split("/")
+      _insert(self._file_trie, parts, path)
+      directory = "/".join(parts[:-1])
+      if directory not in self.dir_files:
+        self.dir_files[directory] = []
+        if directory:
+          _insert(self._dir_trie, parts[:-1], directory)
+      self.dir_files[directory].append(path)
+
+  def first(self, candidates: Iterable[str]) -> Optional[str]:
+    for candidate in candidates:
+      if candidate in self.files:
         return candidate
-  return (base / mod).as_posix()
+    return None
+
+  def by_suffix(self, suffix: str, near: str) -> Optional[str]:
+    """File whose path ends with `suffix`, preferring the one sharing the longest directory prefix with `near`."""
+    return _closest(_lookup(self._file_trie, suffix.split("/")), near)
+
+  def dir_by_suffix(self, suffix: str, near: str) -> Optional[str]:
+    return _closest(_lookup(self._dir_trie, suffix.split("/")), near)
+
+
+def _insert(root: _TrieNode, parts: List[str], value: str) -> None:
+  node = root
+  for part in reversed(parts):
+    node = node.children.setdefault(part, _TrieNode())
+    node.paths.append(value)
+
+
+def _lookup(root: _TrieNode, parts: List[str]) -> List[str]:
+  node = root
+  for part in reversed(parts):
+    node = node.children.get(part)
+    if node is None:
+      return []
+  return node.paths
+
+
+def _closest(paths: List[str], near: str) -> Optional[str]:
+  if not paths:
+    return None
+  near_parts = near.split("/")[:-1]
+
+  def shared(path: str) -> int:
+    count = 0
+    for a, b in zip(near_parts, path.split("/")):
+      if a != b:
+        break
+      count += 1
+    return count
+
+  return min(paths, key=lambda path: (-shared(path), path.count("/"), path))
+
+
+def _join(base: str, spec: str) -> Optional[str]:
+  """Normalize `spec` relative to directory `base`; None if it escapes the project root."""
+  joined = posixpath.normpath(posixpath.join(base, spec))
+  if joined == ".":
+    return ""
+  if joined.startswith("../") or joined == ".." or joined.startswith("/"):
+    return None
+  return joined
+
+
+def _with_exts(stem: str, exts: List[str], index_name: str) -> List[str]:
+  """Candidate files for an extensionless module path: stem.ext, then stem/index.ext."""
+  candidates = [stem + ext for ext in exts]
+  candidates += [f"{stem}/{index_name}{ext}" if stem else f"{index_name}{ext}" for ext in exts]
+  return candidates
+
+
+def _resolve_js(index: PathIndex, rel: str, spec: str) -> List[str]:
+  spec = spec.split("?")[0]
+  if spec.startswith("."):
+    stem = _join(posixpath.dirname(rel), spec)
+    if stem is None:
+      return []
+    candidates = [stem] if PurePosixPath(stem).suffix else []
+    if stem.endswith((".js", ".jsx")):
+      # ESM TypeScript imports name the emitted .js file.
+      candidates += [stem.rsplit(".", 1)[0] + ext for ext in (".ts", ".tsx")]
+    candidates += _with_exts(stem, JS_EXTS, "index")
+    target = index.first(candidates)
+    return [target] if target else []
+  parts = spec.split("/")
+  if parts[0] in JS_ALIASES:
+    parts = parts[1:]
+  if len(parts) < 2 or parts[0].startswith("@"):
+    # Bare package names and scoped packages live in node_modules, not in the project.
+    return []
+  for candidate in _with_exts("/".join(parts), JS_EXTS, "index"):
+    target = index.by_suffix(candidate, rel)
+    if target:
+      return [target]
+  return []
+
+
+def _resolve_python(index: PathIndex, rel: str, spec: str) -> List[str]:
+  dots = len(spec) - len(spec.lstrip("."))
+  module = spec[dots:].replace(".", "/")
+  if dots:
+    base = _join(posixpath.dirname(rel), "/".join([".."] * (dots - 1)) or ".")
+    if base is None:
+      return []
+    stem = posixpath.join(base, module) if module else base
+    target = index.first([f"{stem}.py", f"{stem}/__init__.py" if stem else "__init__.py"])
+    return [target] if target else []
+  if not module:
+    return []
+  candidates = [f"{module}.py", f"{module}/__init__.py"]
+  local = posixpath.dirname(rel)
+  target = index.first(candidates + [posixpath.join(local, c) for c in candidates])
+  if target is None and "/" in module:
+    # Project packages nested under a source dir (backend/app/db.py for `app.db`).
+    target = index.by_suffix(candidates[0], rel) or index.by_suffix(candidates[1], rel)
+  return [target] if target else []
+
+
+def _resolve_go(index: PathIndex, rel: str, spec: str) -> List[str]:
+  if spec.startswith("."):
+    directory = _join(posixpath.dirname(rel), spec)
+  elif "/" in spec:
+    # Module paths end with the package directory; match it against the tail of project dirs.
+    directory = index.dir_by_suffix(spec, rel)
+    if directory is None:
+      parts = spec.split("/")
+      for start in range(1, len(parts) - 1):
+        directory = index.dir_by_suffix("/".join(parts[start:]), rel)
+        if directory is not None:
+          break
+  else:
+    directory = None
+  if directory is None:
+    return []
+  return [f for f in index.dir_files.get(directory, []) if f.endswith(".go") and not f.endswith("_test.go")]
+
+
+def _resolve_java(index: PathIndex, rel: str, spec: str) -> List[str]:
+  parts = spec.split(".")
+  if parts[-1] == "*":
+    directory = index.dir_by_suffix("/".join(parts[:-1]), rel)
+    return [f for f in index.dir_files.get(directory or "", []) if f.endswith(".java")] if directory else []
+  # Static imports name a member; drop trailing segments until a class file matches.
+  while len(parts) >= 2:
+    target = index.by_suffix("/".join(parts) + ".java", rel)
+    if target:
+      return [target]
+    parts = parts[:-1]
+  return []
+
+
+_RESOLVERS = {
+  "javascript": _resolve_js,
+  "typescript": _resolve_js,
+  "python": _resolve_python,
+  "go": _resolve_go,
+  "java": _resolve_java,
+}
@@ -0,0 +1,143 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .config import settings
+from .embeddings import LOCAL_MODEL, embed_texts
+
+LOCAL_PROVIDER = ("local", LOCAL_MODEL)
+
+
+class EmbeddingCache:
+  """
+  Persistent, content-addressed vector cache.
+  Entries are keyed by (provider, model, dimension, sha256(text)) and evicted least-recently-used
+  once the table grows past max_entries.
+  """
+
+  def __init__(self, path: Path, max_entries: int) -> None:
+    self.path = path
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    self._conn.execute(
+      """
+      CREATE TABLE IF NOT EXISTS embeddings (
+        key TEXT PRIMARY KEY,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        dim INTEGER NOT NULL,
+        vector BLOB NOT NULL,
+        last_used REAL NOT NULL
+      )
+      """
+    )
+    self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+    self._conn.commit()
+    self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+  def get_many(self, provider: str, model: str, dim: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+    keys = [_cache_key(provider, model, dim, text) for text in texts]
+    found: Dict[str, List[float]] = {}
+    with self._lock:
+      for part in _chunked(sorted(set(keys)), 500):
+        marks = ",".join("?" * len(part))
+        rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part).fetchall()
+        for key, blob in rows:
+          found[key] = array("f", blob).tolist()
+      if found:
+        now = time.time()
+        self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        self._conn.commit()
+      hits = sum(1 for key in keys if key in found)
+      self.hits += hits
+      self.misses += len(keys) - hits
+    return [found.get(key) for key in keys]
+
+  def put_many(self, provider: str, model: str, dim: int, texts: Sequence[str], vectors: Sequence[List[float]]) -> None:
+    now = time.time()
+    rows = [
+      (_cache_key(provider, model, dim, text), provider, model, dim, array("f", vector).tobytes(), now)
+      for text, vector in zip(texts, vectors)
+    ]
+    with self._lock:
+      cur = self._conn.cursor()
+      for row in rows:
+        cur.execute(
+          "INSERT OR IGNORE INTO embeddings (key, provider, model, dim, vector, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+          row,
+        )
+        self._count += cur.rowcount
+      if self._count > self.max_entries:
+        # Evict a little below the bound so we do not pay for eviction on every insert.
+        excess = self._count - int(self.max_entries * 0.95)
+        cur.execute(
+          "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+          (excess,),
+        )
+        self._count -= cur.rowcount
+        self.evictions += cur.rowcount
+      self._conn.commit()
+
+  def stats(self) -> Dict:
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "entries": self._count,
+        "max_entries": self.max_entries,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+      }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+  """Process-wide cache under settings.storage_dir; None when EMBED_CACHE_MAX_ENTRIES is 0."""
+  global _cache
+  if settings.embed_cache_max_entries <= 0:
+    return None
+  path = settings.storage_dir / "embedding_cache.db"
+  with _cache_lock:
+    if _cache is None or _cache.path != path:
+      _cache = EmbeddingCache(path, settings.embed_cache_max_entries)
+  return _cache
+
+
+def embed_texts_local(texts: Sequence[str], dim: int) -> List[List[float]]:
+  """Local embeddings for many texts, served from the cache when possible; misses embed as one batch."""
+  cache = get_embedding_cache()
+  if cache is None:
+    return embed_texts(texts, dim=dim).tolist()
+  provider, model = LOCAL_PROVIDER
+  vectors = cache.get_many(provider, model, dim, texts)
+  missing = [i for i, vec in enumerate(vectors) if vec is None]
+  if missing:
+    fresh = embed_texts([texts[i] for i in missing], dim=dim).tolist()
+    cache.put_many(provider, model, dim, [texts[i] for i in missing], fresh)
+    for i, vec in zip(missing, fresh):
+      vectors[i] = vec
+  return vectors  # type: ignore[return-value]
+
+
+def _cache_key(provider: str, model: str, dim: int, text: str) -> str:
+  text_hash = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+  return hashlib.sha256(f"{provider}\0{model}\0{dim}\0{text_hash}".encode("utf-8")).hexdigest()
+
+
+def _chunked(items: List[str], size: int):
+  for i in range(0, len(items), size):
+    yield items[i : i + size]
@@ -1,12 +1,18 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
+from qdrant_client import QdrantClient
 from qdrant_client.http import models as rest
 
-from .clients import get_qdrant, ensure_collection
+from .clients import CollectionSizeMismatch, get_qdrant, ensure_collection, search_params
 from .config import settings
-from .embeddings import embed_text
-from .llm_clients import embed_with_provider, have_embedding_provider
+from .embedding_cache import embed_texts_local, get_embedding_cache
+from .llm_clients import embed_batch_with_provider, embedding_model_id, have_embedding_provider
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 @dataclass
@@ -31,9 +37,9 @@ class SearchResult:
 class EmbeddingStore:
   """Utility to embed code chunks and store/search them in Qdrant with metadata."""
 
-  def __init__(self, collection_prefix: str = "project") -> None:
+  def __init__(self, collection_prefix: str = "project", client: Optional[QdrantClient] = None) -> None:
     self.collection_prefix = collection_prefix
-    self.client = get_qdrant()
+    self.client = client or get_qdrant()
     if not self.client:
       raise RuntimeError("Qdrant client is not configured; set QDRANT_URL to enable vector storage.")
 
@@ -41,52 +47,124 @@ class EmbeddingStore:
     return f"{self.collection_prefix}-{project_id}"
 
   def embed(self, text: str) -> List[float]:
-    if have_embedding_provider():
-      vec = embed_with_provider(text)
-      if vec:
-        return vec
-    return embed_text(text, dim=settings.vector_size)
+    return self.embed_batch([text])[0]
 
-  def upsert_chunks(self, project_id: str, chunks: List[ChunkInput]) -> None:
+  def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    return self._embed_batch(texts)[0]
+
+  def _embed_batch(self, texts: List[str]) -> Tuple[List[List[float]], bool]:
+    """(vectors, whether they came from the configured provider rather than the local fallback)."""
+    if have_embedding_provider():
+      vecs = self._embed_batch_provider(texts)
+      if vecs is not None:
+        return vecs, True
+    return embed_texts_local(texts, dim=settings.vector_size), False
+
+  def _embed_batch_provider(self, texts: List[str]) -> Optional[List[List[float]]]:
+    cache = get_embedding_cache()
+    if cache is None:
+      vecs = embed_batch_with_provider(texts)
+      return vecs if vecs and len(vecs) == len(texts) else None
+    # Provider vectors use their native dimension, recorded as 0 in the cache key.
+    provider, model = embedding_model_id()
+    cached = cache.get_many(provider, model, 0, texts)
+    missing = [i for i, vec in enumerate(cached) if vec is None]
+    if missing:
+      fresh = embed_batch_with_provider([texts[i] for i in missing])
+      if not fresh or len(fresh) != len(missing):
+        return None
+      cache.put_many(provider, model, 0, [texts[i] for i in missing], fresh)
+      for i, vec in zip(missing, fresh):
+        cached[i] = vec
+    return cached  # type: ignore[return-value]
+
+  def upsert_chunks(self, project_id: str, chunks: List[ChunkInput], recreate: bool = False) -> None:
+    """
+    Embed and store chunks in the project's collection. Batches whose vectors do not fit an
+    existing collection are skipped; with `recreate` (a full re-embed) the collection is recreated
+    for them instead, except for local vectors standing in for a failed provider call.
+    """
     if not self.client:
       raise RuntimeError("Qdrant client missing.")
+    if not chunks:
+      return
     collection = self._collection(project_id)
-    # Align collection vector size to the actual embedding dimension.
-    sample_vec = self.embed(chunks[0].text) if chunks else embed_text("", dim=settings.vector_size)
-    ensure_collection(self.client, collection, len(sample_vec))
+    batch_size = max(1, settings.embed_batch_size)
+    batches = [chunks[i : i + batch_size] for i in range(0, len(chunks), batch_size)]
 
-    points = []
     approx_total_tokens = 0
     provider_enabled = have_embedding_provider()
-    for chunk in chunks:
-      approx_tokens = _approx_tokens(chunk.text)
+    embedded = _bounded_map(
+      lambda batch: self._embed_batch([chunk.text for chunk in batch]),
+      batches,
+      max_inflight=max(1, settings.embed_max_inflight),
+    )
+    for batch_no, (batch, (vectors, from_provider)) in enumerate(zip(batches, embedded), start=1):
+      fallback = provider_enabled and not from_provider
+      try:
+        ensure_collection(self.client, collection, len(vectors[0]), recreate=recreate and not fallback)
+      except CollectionSizeMismatch as exc:
+        print(f"[embed] project={project_id} batch={batch_no}/{len(batches)} skipped: {exc}")
+        continue
+      approx_tokens = sum(_approx_tokens(chunk.text) for chunk in batch)
       approx_total_tokens += approx_tokens
       print(
-        f"[embed] project={project_id} path={chunk.path} lines={chunk.start_line}-{chunk.end_line} "
-        f"chars={len(chunk.text)} tokens~{approx_tokens} using={'provider' if provider_enabled else 'local'}"
+        f"[embed] project={project_id} batch={batch_no}/{len(batches)} chunks={len(batch)} "
+        f"tokens~{approx_tokens} using={'provider' if from_provider else 'local'}"
       )
-      vector = self.embed(chunk.text)
-      payload = {
-        "project_id": chunk.project_id,
-        "path": chunk.path,
-        "start_line": chunk.start_line,
-        "end_line": chunk.end_line,
-        **(chunk.metadata or {}),
-      }
-      points.append({"id": chunk.id, "vector": vector, "payload": payload})
+      points = []
+      for chunk, vector in zip(batch, vectors):
+        payload = {
+          "project_id": chunk.project_id,
+          "path": chunk.path,
+          "start_line": chunk.start_line,
+          "end_line": chunk.end_line,
+          # Retrieval serves the snippet straight from the hit, without opening the file.
+          "text": chunk.text,
+          **(chunk.metadata or {}),
+        }
+        points.append(rest.PointStruct(id=chunk.id, vector=vector, payload=payload))
+      self.client.upsert(collection_name=collection, points=points, wait=True)
 
     print(
-      f"[embed] summary project={project_id} chunks={len(chunks)} approx_tokens_total={approx_total_tokens} "
-      f"using={'provider' if provider_enabled else 'local'}"
+      f"[embed] summary project={project_id} chunks={len(chunks)} batches={len(batches)} "
+      f"approx_tokens_total={approx_total_tokens} using={'provider' if provider_enabled else 'local'}"
     )
 
-    self.client.upsert(collection_name=collection, points=points, wait=True)
+  def delete_paths(self, project_id: str, paths: List[str]) -> None:
+    """Remove every point that belongs to one of `paths`."""
+    if not self.client:
+      raise RuntimeError("Qdrant client missing.")
+    collection = self._collection(project_id)
+    if not paths or not self.client.collection_exists(collection):
+      return
+    self.client.delete(
+      collection_name=collection,
+      points_selector=rest.FilterSelector(
+        filter=rest.Filter(
+          must=[
+            rest.FieldCondition(key="project_id", match=rest.MatchValue(value=project_id)),
+            rest.FieldCondition(key="path", match=rest.MatchAny(any=list(paths))),
+          ]
+        )
+      ),
+      wait=True,
+    )
 
-  def search(self, project_id: str, query: str, limit: int = 5, path: Optional[str] = None) -> List[SearchResult]:
+  def search(
+    self,
+    project_id: str,
+    query: str,
+    limit: int = 5,
+    path: Optional[str] = None,
+    query_vector: Optional[List[float]] = None,
+  ) -> List[SearchResult]:
+    """Top `limit` chunks for `query` (or an already embedded `query_vector`), optionally within one file."""
     if not self.client:
       raise RuntimeError("Qdrant client missing.")
     collection = self._collection(project_id)
-    query_vector = self.embed(query)
+    if query_vector is None:
+      query_vector = self.embed(query)
     ensure_collection(self.client, collection, len(query_vector))
     must_filters = [rest.FieldCondition(key="project_id", match=rest.MatchValue(value=project_id))]
     if path:
@@ -96,21 +174,55 @@ class EmbeddingStore:
       query_vector=query_vector,
       limit=limit,
       query_filter=rest.Filter(must=must_filters),
+      search_params=search_params(),
       with_payload=True,
     )
-
-    results: List[SearchResult] = []
-    for hit in hits:
-      payload = hit.payload or {}
-      results.append(
-        SearchResult(
-          id=str(hit.id),
-          score=hit.score or 0.0,
-          path=str(payload.get("path", "")),
-          metadata=payload,
-        )
+    return [_search_result(hit) for hit in hits]
+
+  def search_paths(
+    self, project_id: str, query_vector: List[float], paths: List[str], per_path: int
+  ) -> List[SearchResult]:
+    """
+    Up to `per_path` best chunks from each of `paths` for one query vector.
+    settings.qdrant_path_search "grouped" asks Qdrant once (search_groups grouped by path over a
+    MatchAny filter); "parallel" runs one filtered search per path, settings.qdrant_search_concurrency
+    at a time.
+    """
+    if not self.client:
+      raise RuntimeError("Qdrant client missing.")
+    if not paths:
+      return []
+    if settings.qdrant_path_search == "parallel":
+      per_file = _bounded_map(
+        lambda p: self.search(project_id, "", limit=per_path, path=p, query_vector=query_vector),
+        paths,
+        max_inflight=max(1, settings.qdrant_search_concurrency),
       )
-    return results
+      return [hit for hits in per_file for hit in hits]
+
+    collection = self._collection(project_id)
+    ensure_collection(self.client, collection, len(query_vector))
+    groups = self.client.search_groups(
+      collection_name=collection,
+      query_vector=query_vector,
+      group_by="path",
+      limit=len(paths),
+      group_size=per_path,
+      query_filter=rest.Filter(
+        must=[
+          rest.FieldCondition(key="project_id", match=rest.MatchValue(value=project_id)),
+          rest.FieldCondition(key="path", match=rest.MatchAny(any=list(paths))),
+        ]
+      ),
+      search_params=search_params(),
+      with_payload=True,
+    )
+    return [_search_result(hit) for group in groups.groups for hit in group.hits]
+
+
+def _search_result(hit) -> SearchResult:
+  payload = hit.payload or {}
+  return SearchResult(id=str(hit.id), score=hit.score or 0.0, path=str(payload.get("path", "")), metadata=payload)
 
 
 def _get_openai_key() -> Optional[str]:
@@ -119,6 +231,18 @@ def _get_openai_key() -> Optional[str]:
   return os.getenv("OPENAI_API_KEY")
 
 
+def _bounded_map(fn: Callable[[T], R], items: Iterable[T], max_inflight: int) -> Iterator[R]:
+  """Like map() over a thread pool, but keeps at most max_inflight calls running and yields in order."""
+  with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+    pending: deque = deque()
+    for item in items:
+      if len(pending) >= max_inflight:
+        yield pending.popleft().result()
+      pending.append(pool.submit(fn, item))
+    while pending:
+      yield pending.popleft().result()
+
+
 def _approx_tokens(text: str) -> int:
   # Rough heuristic: ~4 chars per token for English-like text.
   return max(1, len(text) // 4)
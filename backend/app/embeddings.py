@@ -1,14 +1,135 @@
 import math
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
 
-def embed_text(text: str, dim: int = 64) -> List[float]:
-  """Deterministic stub embedding; replace with real model call."""
-  vec = [0.0] * dim
-  for i, ch in enumerate(text):
-    vec[i % dim] += (ord(ch) * (i + 1)) % 97
-  norm = math.sqrt(sum(v * v for v in vec)) or 1.0
-  return [round(v / norm, 6) for v in vec]
+from .config import settings
+
+# Identifies the feature hashing below in embedding cache keys; bump it whenever vectors change.
+LOCAL_MODEL = "hashed-ngrams-v1"
+
+_NGRAM_WEIGHT = 1.0
+# Whole identifiers and their camelCase/snake_case/digit sub-tokens, e.g. parseHTTPResponse ->
+# parse, http, response; they are what makes code about the same names land close together.
+_IDENTIFIER_WEIGHT = 2.0
+_SUBTOKEN_WEIGHT = 2.0
+# Byte positions with their own hash key inside a token; longer tokens reuse them cyclically.
+_POSITION_KEYS_LEN = 32
+
+_keys = np.random.default_rng(0x5EED).integers(1, 2**63, size=_POSITION_KEYS_LEN + 6, dtype=np.uint64)
+_POSITION_KEYS = _keys[:_POSITION_KEYS_LEN] | np.uint64(1)
+_NGRAM_KEYS = _keys[_POSITION_KEYS_LEN : _POSITION_KEYS_LEN + 3] | np.uint64(1)
+_NGRAM_SEED, _IDENTIFIER_SEED, _SUBTOKEN_SEED = _keys[_POSITION_KEYS_LEN + 3 :]
+
+# Byte class tables, indexed by byte value.
+_BYTES = np.arange(256)
+_IS_UPPER = (_BYTES >= ord("A")) & (_BYTES <= ord("Z"))
+_IS_LOWER = (_BYTES >= ord("a")) & (_BYTES <= ord("z"))
+_IS_DIGIT = (_BYTES >= ord("0")) & (_BYTES <= ord("9"))
+_IS_ALNUM = _IS_UPPER | _IS_LOWER | _IS_DIGIT
+_IS_WORD = _IS_ALNUM | (_BYTES == ord("_")) | (_BYTES == ord("$"))
+_IS_SPACE = np.isin(_BYTES, [ord(c) for c in " \t\r\n\f\v"])
+_LOWERED = np.where(_IS_UPPER, _BYTES + 32, _BYTES).astype(np.uint64)
+
+
+def embed_text(text: str, dim: Optional[int] = None) -> List[float]:
+  """Local embedding of one text; see embed_texts."""
+  return embed_texts([text], dim)[0].tolist()
+
+
+def embed_texts(texts: Sequence[str], dim: Optional[int] = None) -> np.ndarray:
+  """
+  Deterministic local embeddings, float32 [len(texts), dim] with L2-normalized rows.
+  Hashes case-folded byte 3-grams (all-whitespace ones skipped), identifiers and identifier
+  sub-tokens into signed buckets, then damps counts with log1p. All texts of a batch are
+  processed as one byte array, and a text embeds the same alone or in a batch.
+  """
+  dim = dim or settings.vector_size
+  count = len(texts)
+  if not count:
+    return np.zeros((0, dim), dtype=np.float32)
+  encoded = [text.encode("utf-8", errors="ignore") for text in texts]
+  lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=count)
+  # Texts are joined by one separator byte that never joins a feature.
+  raw = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+  doc = np.repeat(np.arange(count), lengths + 1)[: raw.shape[0]]
+  separator = np.zeros(raw.shape[0], dtype=bool)
+  separator[np.cumsum(lengths + 1)[:-1] - 1] = True
+  lowered = _LOWERED[raw]
+
+  docs: List[np.ndarray] = []
+  hashes: List[np.ndarray] = []
+  weights: List[np.ndarray] = []
+
+  def add(feature_docs: np.ndarray, feature_hashes: np.ndarray, seed: np.uint64, weight: float) -> None:
+    docs.append(feature_docs)
+    hashes.append(_mix(feature_hashes ^ seed))
+    weights.append(np.full(feature_hashes.shape[0], weight))
+
+  if raw.shape[0] >= 3:
+    valid = ~(separator[:-2] | separator[1:-1] | separator[2:])
+    space = _IS_SPACE[raw]
+    valid &= ~(space[:-2] & space[1:-1] & space[2:])
+    grams = lowered[:-2] * _NGRAM_KEYS[0] + lowered[1:-1] * _NGRAM_KEYS[1] + lowered[2:] * _NGRAM_KEYS[2]
+    add(doc[:-2][valid], grams[valid], _NGRAM_SEED, _NGRAM_WEIGHT)
+
+  word = _IS_WORD[raw]
+  previous_word = np.concatenate([[False], word[:-1]])
+  add(*_segments(lowered, doc, word, word & ~previous_word), _IDENTIFIER_SEED, _IDENTIFIER_WEIGHT)
+
+  alnum = _IS_ALNUM[raw]
+  upper, lower, digit = _IS_UPPER[raw], _IS_LOWER[raw], _IS_DIGIT[raw]
+  prev_alnum, prev_upper, prev_lower, prev_digit = (
+    np.concatenate([[False], flags[:-1]]) for flags in (alnum, upper, lower, digit)
+  )
+  next_lower = np.concatenate([lower[1:], [False]])
+  boundary = (
+    ~prev_alnum
+    | (upper & prev_lower)  # fooBar
+    | (upper & prev_upper & next_lower)  # HTTPResponse
+    | (digit != prev_digit)  # utf8 / v2
+  )
+  add(*_segments(lowered, doc, alnum, alnum & boundary), _SUBTOKEN_SEED, _SUBTOKEN_WEIGHT)
+
+  all_hashes = np.concatenate(hashes)
+  buckets = np.concatenate(docs) * dim + (all_hashes % np.uint64(dim)).astype(np.int64)
+  signs = np.where(all_hashes >> np.uint64(63), -1.0, 1.0)
+  counts = np.bincount(buckets, weights=signs * np.concatenate(weights), minlength=count * dim)
+  vectors = counts.reshape(count, dim)
+  vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+  norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+  norms[norms == 0] = 1.0
+  return (vectors / norms).astype(np.float32)
+
+
+def _segments(
+  lowered: np.ndarray, doc: np.ndarray, member: np.ndarray, starts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  (doc, hash) for each run of `member` bytes, split at `starts`, of two bytes or more. The hash
+  sums byte * per-position key over the run plus its length, so it depends on order.
+  """
+  index = np.flatnonzero(member)
+  if not index.shape[0]:
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+  segment = np.cumsum(starts)[index] - 1
+  first = np.flatnonzero(starts)
+  position = index - first[segment]
+  contributions = lowered[index] * _POSITION_KEYS[position % _POSITION_KEYS_LEN]
+  heads = np.flatnonzero(np.diff(segment, prepend=-1))
+  sums = np.add.reduceat(contributions, heads)
+  lengths = np.diff(np.append(heads, index.shape[0]))
+  keep = lengths >= 2
+  return doc[first[keep]], sums[keep] + lengths[keep].astype(np.uint64) * _POSITION_KEYS[0]
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+  """splitmix64 finalizer: spreads every input bit over the whole 64-bit hash."""
+  values = values ^ (values >> np.uint64(30))
+  values = values * np.uint64(0xBF58476D1CE4E5B9)
+  values = values ^ (values >> np.uint64(27))
+  values = values * np.uint64(0x94D049BB133111EB)
+  return values ^ (values >> np.uint64(31))
 
 
 def cosine_similarity(a: List[float], b: List[float]) -> float:
@@ -0,0 +1,130 @@
+import re
+from pathlib import PurePosixPath
+from typing import Callable, Dict, List, Optional, Set
+
+from tree_sitter import Tree
+
+JS_IMPORT_RE = re.compile(
+  r"""(?:\bimport|\bexport)\s*(?:[\w\{\}\*\s,$]+?\s*from\s*)?['"]([^'"\n]+)['"]"""
+  r"""|\b(?:require|import)\s*\(\s*['"]([^'"\n]+)['"]\s*\)"""
+)
+PY_FROM_RE = re.compile(r"^[ \t]*from[ \t]+(\.*[\w\.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#;]+)", re.MULTILINE)
+PY_IMPORT_RE = re.compile(r"^[ \t]*import[ \t]+([^\n#;]+)", re.MULTILINE)
+GO_IMPORT_BLOCK_RE = re.compile(r"^[ \t]*import[ \t]*\(([^)]*)\)", re.MULTILINE)
+GO_IMPORT_LINE_RE = re.compile(r"""^[ \t]*import[ \t]+(?:[\w\.]+[ \t]+)?"([^"\n]+)\"""", re.MULTILINE)
+GO_SPEC_RE = re.compile(r'"([^"\n]+)"')
+JAVA_IMPORT_RE = re.compile(r"^[ \t]*import[ \t]+(?:static[ \t]+)?([\w\.]+(?:\.\*)?)[ \t]*;", re.MULTILINE)
+
+_EXT_LANGUAGE = {
+  ".py": "python",
+  ".js": "javascript",
+  ".jsx": "javascript",
+  ".mjs": "javascript",
+  ".cjs": "javascript",
+  ".ts": "typescript",
+  ".tsx": "typescript",
+  ".go": "go",
+  ".java": "java",
+}
+
+# Tree-sitter nodes that can hold an import; only their text is scanned when a tree is given.
+_JS_IMPORT_NODES = {"import_statement", "export_statement", "lexical_declaration", "variable_declaration", "expression_statement"}
+IMPORT_NODE_TYPES = {
+  "python": {"import_statement", "import_from_statement", "future_import_statement"},
+  "javascript": _JS_IMPORT_NODES,
+  "typescript": _JS_IMPORT_NODES,
+  "go": {"import_declaration"},
+  "java": {"import_declaration"},
+}
+# Python and JS allow imports inside functions and blocks, so statement containers are searched too.
+_NESTED_IMPORTS = {"python", "javascript", "typescript"}
+_CONTAINER_SUFFIXES = ("block", "body", "definition", "statement", "clause", "declaration")
+
+
+def import_language(path: str) -> Optional[str]:
+  """Import syntax family for `path` by extension; TS and TSX share the JavaScript rules."""
+  return _EXT_LANGUAGE.get(PurePosixPath(path).suffix.lower())
+
+
+def extract_import_specs(path: str, content: str, tree: Optional[Tree] = None) -> List[str]:
+  """
+  Raw import specifiers of one file, e.g. "./util", "..pkg.mod" or "com.acme.Service", in source order.
+  With a parse `tree`, only import-like statement nodes are scanned, so strings and comments
+  that merely look like imports are skipped.
+  """
+  language = import_language(path)
+  if language is None:
+    return []
+  if tree is not None and not tree.root_node.has_error:
+    content = _import_text(tree, content.encode("utf-8"), IMPORT_NODE_TYPES[language], language in _NESTED_IMPORTS)
+  return _EXTRACTORS[language](content)
+
+
+def import_collector(specs: Dict[str, List[str]]) -> Callable[[str, bytes], None]:
+  """Callback for storage uploads that records each extracted file's import specifiers into `specs`."""
+
+  def collect(rel: str, data: bytes) -> None:
+    if import_language(rel):
+      specs[rel] = extract_import_specs(rel, data.decode("utf-8", errors="ignore"))
+
+  return collect
+
+
+def _import_text(tree: Tree, source: bytes, node_types: Set[str], nested: bool) -> str:
+  parts = []
+  stack = list(reversed(tree.root_node.children))
+  while stack:
+    node = stack.pop()
+    if node.type in node_types:
+      parts.append(source[node.start_byte : node.end_byte].decode("utf-8", errors="ignore"))
+    elif nested and node.type.endswith(_CONTAINER_SUFFIXES):
+      stack.extend(reversed(node.children))
+  return "\n".join(parts)
+
+
+def _js_specs(content: str) -> List[str]:
+  return [match.group(1) or match.group(2) for match in JS_IMPORT_RE.finditer(content)]
+
+
+def _python_specs(content: str) -> List[str]:
+  specs: List[str] = []
+  for match in PY_FROM_RE.finditer(content):
+    module = match.group(1)
+    specs.append(module)
+    # `from pkg import mod` may name a submodule rather than a symbol; resolution keeps what exists.
+    joiner = "" if module.endswith(".") else "."
+    for name in _names(match.group(2)):
+      if name != "*":
+        specs.append(f"{module}{joiner}{name}")
+  for match in PY_IMPORT_RE.finditer(content):
+    specs.extend(_names(match.group(1)))
+  return specs
+
+
+def _go_specs(content: str) -> List[str]:
+  specs = [match.group(1) for match in GO_IMPORT_LINE_RE.finditer(content)]
+  for block in GO_IMPORT_BLOCK_RE.finditer(content):
+    specs.extend(match.group(1) for match in GO_SPEC_RE.finditer(block.group(1)))
+  return specs
+
+
+def _java_specs(content: str) -> List[str]:
+  return [match.group(1) for match in JAVA_IMPORT_RE.finditer(content)]
+
+
+def _names(clause: str) -> List[str]:
+  names = []
+  for item in clause.strip().strip("()").replace("\\", " ").split(","):
+    name = item.split(" as ")[0].strip()
+    if name:
+      names.append(name)
+  return names
+
+
+_EXTRACTORS = {
+  "python": _python_specs,
+  "javascript": _js_specs,
+  "typescript": _js_specs,
+  "go": _go_specs,
+  "java": _java_specs,
+}
@@ -0,0 +1,225 @@
+from typing import Callable, Dict, List, Optional, Set
+
+from .clients import get_qdrant
+from .code_graph import invalidate_graph
+from .config import settings
+from .db import (
+  load_dependencies,
+  load_import_specs,
+  save_dependencies,
+  save_import_specs,
+  update_dependencies,
+  update_import_specs,
+)
+from .dependency_graph import import_specs_for, resolve_import_edges
+from .embedding_cache import embed_texts_local
+from .embeddings import LOCAL_MODEL
+from .embedding_store import ChunkInput, EmbeddingStore
+from .chunk_pipeline import FileChunks, chunk_files, chunk_point_id, iter_chunk_batches
+from .lexical_index import LexicalIndex
+from .snippets import invalidate_snippets
+from .storage import UploadDiff
+from .symbol_index import record_chunk_symbols
+from .vector_index import LocalVectorIndex, has_local_index
+
+def embed_path(
+  project_id: str,
+  path: str,
+  store: Optional[EmbeddingStore] = None,
+  index: Optional[LocalVectorIndex] = None,
+  lexical: Optional[LexicalIndex] = None,
+) -> tuple[int, bool]:
+  """
+  Embed one project file locally and, when Qdrant is configured, per chunk in Qdrant.
+  Pass a loaded `index` (and open `lexical` index) to batch many files into one save; the caller
+  then saves/commits them.
+  """
+  batch = chunk_files(settings.storage_dir / project_id, [path])
+  if not batch:
+    raise FileNotFoundError(path)
+
+  if store is None and get_qdrant():
+    store = EmbeddingStore()
+  local_index = index if index is not None else LocalVectorIndex.load(project_id, LOCAL_MODEL, settings.vector_size)
+  lexical_index = lexical if lexical is not None else LexicalIndex.open(project_id)
+  try:
+    stored_in_qdrant = index_file_chunks(project_id, batch, store, local_index, lexical_index)
+  finally:
+    if lexical is None:
+      lexical_index.commit()
+      lexical_index.close()
+  if index is None and not local_index.stale:
+    # A stale index is left for /embedRepo rather than replaced by one holding just this file.
+    local_index.save()
+  return settings.vector_size, stored_in_qdrant
+
+
+def index_file_chunks(
+  project_id: str,
+  batch: List[FileChunks],
+  store: Optional[EmbeddingStore],
+  index: LocalVectorIndex,
+  lexical: Optional[LexicalIndex] = None,
+  recreate_collection: bool = False,
+) -> bool:
+  """
+  Embed already-chunked files into the local index and, when `store` is given, into Qdrant.
+  The files' symbols are recorded in the symbol index alongside, and their chunk terms in
+  `lexical` when given (the caller commits it). `recreate_collection` lets a full re-embed
+  replace a Qdrant collection that holds vectors of another size.
+  """
+  record_chunk_symbols(project_id, batch)
+  if lexical is not None:
+    for item in batch:
+      lexical.upsert_chunks(item.path, [(chunk.start_line, chunk.end_line, chunk.text) for chunk in item.chunks])
+  texts = [chunk.text for item in batch for chunk in item.chunks]
+  vectors = embed_texts_local(texts, dim=settings.vector_size)
+  offset = 0
+  for item in batch:
+    count = len(item.chunks)
+    index.upsert_chunks(
+      item.path, vectors[offset : offset + count], [(chunk.start_line, chunk.end_line) for chunk in item.chunks]
+    )
+    offset += count
+
+  if not store:
+    return False
+  chunk_inputs = [
+    ChunkInput(
+      id=chunk_point_id(project_id, item.path, chunk.start_line, chunk.end_line, chunk.text),
+      project_id=project_id,
+      path=item.path,
+      text=chunk.text,
+      start_line=chunk.start_line,
+      end_line=chunk.end_line,
+      metadata={
+        "raw_id": f"{item.path}:{chunk.start_line}-{chunk.end_line}",
+        "language": chunk.language,
+      },
+    )
+    for item in batch
+    for chunk in item.chunks
+  ]
+  store.upsert_chunks(project_id, chunk_inputs, recreate=recreate_collection)
+  return True
+
+
+def embed_project(
+  project_id: str,
+  files: List[str],
+  on_progress: Optional[Callable[[int, int, str], None]] = None,
+  should_stop: Optional[Callable[[], bool]] = None,
+) -> tuple[int, bool]:
+  """
+  Embed every file of a project into a new local index, built in memory and saved over the old one
+  only once every file is in, so an index built by another embedder or at another VECTOR_SIZE is
+  replaced rather than extended, and a cancelled or failed run leaves the saved index as it was.
+  Parsing and chunking run on the chunk_pipeline process pool; embedding consumes its batches.
+  on_progress(done, total, path) is called as files complete; should_stop() is checked between
+  batches and, when it returns True, EmbedCancelled is raised.
+  Import edges are refreshed from the same parse trees once every batch is in, and projects with
+  settings.ann_min_rows chunks or more get their IVF index (re)trained.
+  Returns (files embedded, stored in Qdrant).
+  """
+  embedded = 0
+  import_specs: Dict[str, List[str]] = {}
+  stored_any = False
+  store = EmbeddingStore() if get_qdrant() else None
+  index = LocalVectorIndex.empty(project_id, LOCAL_MODEL)
+  lexical = LexicalIndex.open(project_id)
+  project_root = settings.storage_dir / project_id
+  try:
+    for batch in iter_chunk_batches(project_root, files):
+      if should_stop and should_stop():
+        raise EmbedCancelled(f"stopped after {embedded} of {len(files)} files")
+      if batch:
+        stored = index_file_chunks(project_id, batch, store, index, lexical, recreate_collection=True)
+        stored_any = stored or stored_any
+        lexical.commit()
+        embedded += len(batch)
+        import_specs.update((item.path, item.imports) for item in batch)
+      if on_progress:
+        on_progress(embedded, len(files), batch[-1].path if batch else "")
+    if settings.ann_min_rows > 0 and len(index) >= settings.ann_min_rows:
+      index.build_ann()
+    index.save()
+  finally:
+    lexical.close()
+  save_dependencies(project_id, resolve_import_edges(files, import_specs))
+  save_import_specs(project_id, import_specs)
+  invalidate_graph(project_id)
+  return embedded, stored_any
+
+
+class EmbedCancelled(Exception):
+  pass
+
+
+def apply_upload_diff(
+  project_id: str, diff: UploadDiff, import_specs: Optional[Dict[str, List[str]]] = None
+) -> List[str]:
+  """
+  Bring a project's indexes in line with an incremental upload: drop vectors, lexical entries and
+  edges of removed/changed files, then re-embed and re-scan imports only for added/changed files.
+  `import_specs` collected during extraction spare re-reading the touched files.
+  Returns the paths that were re-embedded.
+  """
+  touched = [*diff.added, *diff.changed]
+  stale = [*diff.changed, *diff.removed]
+
+  project_root = settings.storage_dir / project_id
+  specs = import_specs_for(project_root, touched, import_specs)
+  edges = resolve_import_edges(diff.files, specs)
+  sources = list(touched)
+  if diff.added or diff.removed:
+    # Added or removed files can change what unchanged files' imports resolve to, e.g. an import
+    # whose target did not exist before. Re-resolve their stored specifiers (no file reads) and
+    # rewrite the edges of those whose targets moved.
+    touched_set = set(touched)
+    unchanged = [path for path in diff.files if path not in touched_set]
+    stored = load_import_specs(project_id)
+    # Projects indexed before specifiers were stored are scanned once, then kept.
+    legacy = import_specs_for(project_root, [path for path in unchanged if path not in stored])
+    stored.update(legacy)
+    specs.update(legacy)
+    current: Dict[str, Set[str]] = {}
+    for src, dst in load_dependencies(project_id):
+      current.setdefault(src, set()).add(dst)
+    resolved: Dict[str, Set[str]] = {}
+    for src, dst in resolve_import_edges(diff.files, {path: stored.get(path, []) for path in unchanged}):
+      resolved.setdefault(src, set()).add(dst)
+    for path in unchanged:
+      if resolved.get(path, set()) != current.get(path, set()):
+        sources.append(path)
+        edges.extend((path, dst) for dst in sorted(resolved.get(path, ())))
+  update_dependencies(project_id, sources=sources, removed=diff.removed, edges=edges)
+  update_import_specs(project_id, specs, removed=diff.removed)
+  invalidate_graph(project_id)
+  invalidate_snippets(project_id)
+
+  if not has_local_index(project_id):
+    # Never embedded; /embedRepo will index the whole project when asked.
+    return []
+  index = LocalVectorIndex.load(project_id, LOCAL_MODEL, settings.vector_size)
+  index.remove_paths(stale)
+
+  store = EmbeddingStore() if get_qdrant() else None
+  if store:
+    store.delete_paths(project_id, stale)
+  embedded = []
+  with LexicalIndex.open(project_id) as lexical:
+    lexical.remove_paths(stale)
+    for path in touched:
+      try:
+        embed_path(project_id, path, store=store, index=index, lexical=lexical)
+        embedded.append(path)
+      except FileNotFoundError:
+        continue
+    lexical.commit()
+  if index.stale:
+    # Built by another embedder or at another VECTOR_SIZE. Saving now would replace it with an
+    # index of the touched files only, which looks valid but misses the rest of the project, so
+    # it stays stale (the lexical, symbol and Qdrant updates above still apply) until /embedRepo.
+    return []
+  index.save()
+  return embedded
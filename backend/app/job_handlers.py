@@ -0,0 +1,51 @@
+from typing import Dict
+
+from .indexing import EmbedCancelled, embed_project
+from .jobs import JobCancelled, JobContext, job_handler
+from .config import settings
+from .rag_pipeline import iter_repo_review, run_repo_review
+from .storage import list_files
+
+
+@job_handler("embed_repo")
+def embed_repo_job(ctx: JobContext) -> Dict:
+  files = list_files(ctx.project_id)
+  if not files:
+    raise ValueError("Project not found or no files present")
+  ctx.progress(0, len(files))
+  try:
+    embedded, stored_any = embed_project(
+      ctx.project_id,
+      files,
+      on_progress=lambda done, total, path: ctx.progress(done, total, path),
+      should_stop=ctx.cancelled,
+    )
+  except EmbedCancelled:
+    raise JobCancelled()
+  return {"files_total": len(files), "files_embedded": embedded, "stored_in_qdrant": stored_any}
+
+
+@job_handler("review_repo")
+def review_repo_job(ctx: JobContext) -> Dict:
+  query = ctx.params.get("query") or "Repo review"
+  if (ctx.params.get("review_mode") or settings.repo_review_mode) == "map_reduce":
+    return _map_reduce_review(ctx, query)
+  ctx.progress(0, 1, "reviewing")
+  review = run_repo_review(ctx.project_id, query, review_mode="single")
+  ctx.progress(1, 1)
+  return {"query": query, "findings": review.get("findings", []), "prompt_tokens": review.get("prompt_tokens")}
+
+
+def _map_reduce_review(ctx: JobContext, query: str) -> Dict:
+  """Partition-by-partition progress; cancelling abandons the partitions not yet reviewed."""
+  ctx.progress(0, 1, "partitioning")
+  events = iter_repo_review(ctx.project_id, query)
+  try:
+    for event in events:
+      if event["type"] == "summary":
+        return {"query": query, **{key: value for key, value in event.items() if key != "type"}}
+      ctx.progress(event["partitions_done"], event["partitions_total"], f"reviewed {len(event['files'])} files")
+      ctx.check_cancelled()
+  finally:
+    events.close()
+  return {"query": query, "findings": []}
@@ -0,0 +1,142 @@
+import threading
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from .config import settings
+from .db import claim_next_job, create_job, get_job, request_job_cancel, requeue_interrupted_jobs, update_job
+
+
+class JobCancelled(Exception):
+  pass
+
+
+class JobContext:
+  """Handle passed to job handlers for reporting progress and honouring cancellation."""
+
+  def __init__(self, job: Dict) -> None:
+    self.job_id: str = job["id"]
+    self.project_id: str = job["project_id"]
+    self.params: Dict = job["params"]
+
+  def progress(self, done: int, total: int, message: str = "") -> None:
+    update_job(self.job_id, _now_iso(), progress_done=done, progress_total=total, message=message)
+
+  def cancelled(self) -> bool:
+    job = get_job(self.job_id)
+    return bool(job and job["cancel_requested"])
+
+  def check_cancelled(self) -> None:
+    if self.cancelled():
+      raise JobCancelled()
+
+
+JobHandler = Callable[[JobContext], Optional[Dict]]
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+  """Register the function that runs jobs of `kind`; its return value becomes the job result."""
+
+  def register(fn: JobHandler) -> JobHandler:
+    _handlers[kind] = fn
+    return fn
+
+  return register
+
+
+def job_kinds() -> List[str]:
+  return sorted(_handlers)
+
+
+def submit_job(kind: str, project_id: str, params: Optional[Dict] = None) -> Dict:
+  if kind not in _handlers:
+    raise ValueError(f"Unknown job kind '{kind}'")
+  job = create_job(uuid4().hex, kind, project_id, params or {}, _now_iso())
+  _runner.wake()
+  return job
+
+
+def cancel_job(job_id: str) -> Optional[Dict]:
+  return request_job_cancel(job_id, _now_iso())
+
+
+class JobRunner:
+  """
+  Fixed pool of worker threads pulling queued jobs from SQLite.
+  Jobs live in the database, so anything queued or interrupted survives a restart.
+  """
+
+  def __init__(self, workers: int, poll_interval: float = 1.0) -> None:
+    self.workers = workers
+    self.poll_interval = poll_interval
+    self._wakeup = threading.Event()
+    self._stop = threading.Event()
+    self._threads: List[threading.Thread] = []
+
+  def start(self) -> None:
+    if self._threads:
+      return
+    self._stop.clear()
+    requeued = requeue_interrupted_jobs(_now_iso())
+    if requeued:
+      print(f"[jobs] requeued {requeued} job(s) interrupted by a restart")
+    for i in range(self.workers):
+      thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+      thread.start()
+      self._threads.append(thread)
+
+  def stop(self, timeout: float = 5.0) -> None:
+    self._stop.set()
+    self._wakeup.set()
+    for thread in self._threads:
+      thread.join(timeout)
+    self._threads = []
+
+  def wake(self) -> None:
+    self._wakeup.set()
+
+  def _loop(self) -> None:
+    while not self._stop.is_set():
+      try:
+        job = claim_next_job(_now_iso())
+      except Exception as exc:
+        print(f"[jobs] failed to claim job: {exc}")
+        job = None
+      if job is None:
+        self._wakeup.wait(self.poll_interval)
+        self._wakeup.clear()
+        continue
+      self._run(job)
+
+  def _run(self, job: Dict) -> None:
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+      update_job(job["id"], _now_iso(), status="failed", error=f"Unknown job kind '{job['kind']}'")
+      return
+    print(f"[jobs] start id={job['id']} kind={job['kind']} project={job['project_id']}")
+    try:
+      result = handler(JobContext(job))
+      update_job(job["id"], _now_iso(), status="succeeded", result=result or {})
+    except JobCancelled:
+      update_job(job["id"], _now_iso(), status="cancelled")
+    except Exception as exc:
+      traceback.print_exc()
+      update_job(job["id"], _now_iso(), status="failed", error=str(exc))
+    print(f"[jobs] done id={job['id']} kind={job['kind']}")
+
+
+_runner = JobRunner(workers=settings.job_workers)
+
+
+def start_job_workers() -> None:
+  _runner.start()
+
+
+def stop_job_workers() -> None:
+  _runner.stop()
+
+
+def _now_iso() -> str:
+  return datetime.utcnow().isoformat()
@@ -1,9 +1,10 @@
 import json
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
-from tree_sitter import Parser
-from tree_sitter_languages import get_language
+from tree_sitter import Tree
+
+from .parser_pool import get_parser
 
 _CONFIG_PATH = Path(__file__).with_name("language_registry.json")
 
@@ -18,20 +19,67 @@ _CONFIG = _load_config()
 
 
 def detect_language(path: Path, content: str) -> Optional[str]:
+  return detect_language_with_tree(path, content)[0]
+
+
+def detect_language_with_tree(path: Path, content: str) -> Tuple[Optional[str], Optional[Tree]]:
+  """
+  Detect a file's language. When detection had to parse the whole file, also return that tree
+  so chunk extraction can reuse it instead of parsing again.
+  """
   ext = path.suffix.lower()
   ext_map = _CONFIG.get("extensions", {})
   if ext in ext_map:
-    return ext_map[ext]
+    return ext_map[ext], None
 
   shebang_lang = _detect_shebang_language(content)
   if shebang_lang:
-    return shebang_lang
+    return shebang_lang, None
 
-  # Try fallback languages by checking parse errors
-  for lang in _CONFIG.get("fallback_languages", []):
-    if _parse_ok(lang, content):
-      return lang
-  return None
+  # Rank candidates by cheap signals, then confirm with a parse of a capped prefix.
+  data = content.encode("utf-8")
+  cap = int(_CONFIG.get("detect_prefix_bytes", 16384))
+  complete = len(data) <= cap
+  sample = data if complete else _cut_prefix(data, cap)
+  for lang in _rank_candidates(sample.decode("utf-8", errors="ignore")):
+    tree = _parse(lang, sample)
+    if tree is not None and not tree.root_node.has_error:
+      return lang, tree if complete else None
+  return None, None
+
+
+def _rank_candidates(sample: str) -> List[str]:
+  """Fallback languages with any magic-token evidence, most likely first."""
+  if not sample or _looks_binary(sample):
+    return []
+  order = _CONFIG.get("fallback_languages", [])
+  magic = _CONFIG.get("magic_tokens", {})
+  lines = max(1, sample.count("\n"))
+  # Byte-frequency sniff: braces/semicolons per line favour C-like syntax, colon line endings favour Python.
+  c_like = (sample.count("{") + sample.count(";")) / lines
+  colon_eol = sample.count(":\n") / lines
+  scores: Dict[str, float] = {}
+  for lang in order:
+    hits = sum(min(sample.count(token), 3) for token in magic.get(lang, []))
+    if not hits:
+      continue
+    scores[lang] = hits + (2 * colon_eol - c_like if lang == "python" else c_like)
+  return sorted(scores, key=lambda lang: (-scores[lang], order.index(lang)))
+
+
+def _looks_binary(sample: str) -> bool:
+  control = sum(1 for ch in sample[:4096] if ord(ch) < 32 and ch not in "\n\r\t")
+  return "\x00" in sample or control > len(sample[:4096]) * 0.1
+
+
+def _cut_prefix(data: bytes, cap: int) -> bytes:
+  """Trim to at most `cap` bytes, preferring a blank-line boundary so top-level constructs stay whole."""
+  prefix = data[:cap]
+  for sep in (b"\n\n", b"\n"):
+    cut = prefix.rfind(sep)
+    if cut > 0:
+      return prefix[:cut]
+  return prefix
 
 
 def _detect_shebang_language(content: str) -> Optional[str]:
@@ -49,11 +97,8 @@ def _detect_shebang_language(content: str) -> Optional[str]:
   return None
 
 
-def _parse_ok(language: str, content: str) -> bool:
+def _parse(language: str, data: bytes) -> Optional[Tree]:
   try:
-    parser = Parser()
-    parser.set_language(get_language(language))
-    tree = parser.parse(bytes(content, "utf-8"))
-    return not tree.root_node.has_error
+    return get_parser(language).parse(data)
   except Exception:
-    return False
+    return None
@@ -0,0 +1,122 @@
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .config import settings
+from .vector_index import INDEX_DIR
+
+LEXICAL_FILE = "lexical.db"
+_TOKEN_RE = re.compile(r"[A-Za-z_$][\w$]*|\d+")
+# Sub-words of camelCase / PascalCase / snake_case identifiers: parseHTTPResponse -> parse, HTTP, Response.
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_MAX_QUERY_TERMS = 64
+
+
+def lexical_terms(text: str) -> List[str]:
+  """
+  Lowercased search terms for code: each identifier whole (underscores dropped, so it stays one
+  token) plus its camelCase/snake_case sub-words, and bare numbers such as status codes.
+  """
+  terms: List[str] = []
+  for token in _TOKEN_RE.findall(text):
+    whole = token.replace("_", "").replace("$", "").lower()
+    if whole:
+      terms.append(whole)
+    parts = _SUBWORD_RE.findall(token)
+    if len(parts) > 1:
+      terms.extend(part.lower() for part in parts)
+  return terms
+
+
+class LexicalIndex:
+  """
+  Per-project BM25 index over chunks, stored in <project>/index/lexical.db.
+  An FTS5 table holds the chunk terms and ranks with its built-in bm25(); a plain table maps
+  each row to (path, start_line, end_line) and is indexed by path so files can be replaced cheaply.
+  Needs neither an embedding provider nor Qdrant.
+  """
+
+  def __init__(self, path: Path) -> None:
+    self.path = path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms USING fts5(terms)")
+    self._conn.execute(
+      """
+      CREATE TABLE IF NOT EXISTS chunk_rows (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        start_line INTEGER NOT NULL,
+        end_line INTEGER NOT NULL
+      )
+      """
+    )
+    self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_rows_path ON chunk_rows (path)")
+    self._conn.commit()
+
+  @classmethod
+  def open(cls, project_id: str) -> "LexicalIndex":
+    return cls(settings.storage_dir / project_id / INDEX_DIR / LEXICAL_FILE)
+
+  def __enter__(self) -> "LexicalIndex":
+    return self
+
+  def __exit__(self, *exc) -> None:
+    self.close()
+
+  def close(self) -> None:
+    self._conn.close()
+
+  def upsert_chunks(self, path: str, chunks: Sequence[Tuple[int, int, str]]) -> None:
+    """Replace every chunk of `path` with (start_line, end_line, text) entries; call commit() after a batch."""
+    self._delete([path])
+    for start_line, end_line, text in chunks:
+      cur = self._conn.execute(
+        "INSERT INTO chunk_rows (path, start_line, end_line) VALUES (?, ?, ?)", (path, start_line, end_line)
+      )
+      self._conn.execute(
+        "INSERT INTO chunk_terms (rowid, terms) VALUES (?, ?)", (cur.lastrowid, " ".join(lexical_terms(text)))
+      )
+
+  def remove_paths(self, paths: Iterable[str]) -> None:
+    self._delete(list(paths))
+    self.commit()
+
+  def commit(self) -> None:
+    self._conn.commit()
+
+  def search(
+    self, query: str, k: int, paths: Optional[Sequence[str]] = None
+  ) -> List[Tuple[str, int, int, float]]:
+    """Top-k (path, start_line, end_line, bm25 score) by BM25, best first, optionally only within `paths`."""
+    terms = list(dict.fromkeys(lexical_terms(query)))[:_MAX_QUERY_TERMS]
+    if not terms or k <= 0:
+      return []
+    sql = """
+      SELECT r.path, r.start_line, r.end_line, -bm25(chunk_terms)
+      FROM chunk_terms JOIN chunk_rows r ON r.id = chunk_terms.rowid
+      WHERE chunk_terms MATCH ?
+    """
+    params: list = [" OR ".join(f'"{term}"' for term in terms)]
+    if paths is not None:
+      if not paths:
+        return []
+      sql += f" AND r.path IN ({','.join('?' * len(paths))})"
+      params.extend(paths)
+    sql += " ORDER BY bm25(chunk_terms) LIMIT ?"
+    params.append(k)
+    return [(path, start, end, float(score)) for path, start, end, score in self._conn.execute(sql, params)]
+
+  def _delete(self, paths: List[str]) -> None:
+    for path in paths:
+      rows = [(row,) for (row,) in self._conn.execute("SELECT id FROM chunk_rows WHERE path = ?", (path,))]
+      if rows:
+        self._conn.executemany("DELETE FROM chunk_terms WHERE rowid = ?", rows)
+        self._conn.executemany("DELETE FROM chunk_rows WHERE id = ?", rows)
+
+
+def has_lexical_index(project_id: str) -> bool:
+  return (settings.storage_dir / project_id / INDEX_DIR / LEXICAL_FILE).exists()
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .config import settings
+from .llm_clients import generate_with_provider, have_llm_provider, llm_model_id
+from .storage import project_content_hash
+
+
+class LLMResponseCache:
+  """
+  Persistent cache of generated responses, keyed by response_key(). Entries expire ttl_seconds
+  after they were written and are evicted least-recently-used once the table grows past max_entries.
+  """
+
+  def __init__(self, path: Path, max_entries: int, ttl_seconds: float) -> None:
+    self.path = path
+    self.max_entries = max_entries
+    self.ttl_seconds = ttl_seconds
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expired = 0
+    self.coalesced = 0
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    self._conn.execute(
+      """
+      CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+      )
+      """
+    )
+    self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+    self._conn.commit()
+    self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+  def get(self, key: str, record_stats: bool = True) -> Optional[str]:
+    now = time.time()
+    with self._lock:
+      row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+      if row is not None and now - row[1] > self.ttl_seconds:
+        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._conn.commit()
+        self._count -= 1
+        self.expired += 1
+        row = None
+      if row is None:
+        if record_stats:
+          self.misses += 1
+        return None
+      self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+      self._conn.commit()
+      if record_stats:
+        self.hits += 1
+      return row[0]
+
+  def note_coalesced(self) -> None:
+    with self._lock:
+      self.coalesced += 1
+
+  def put(self, key: str, response: str) -> None:
+    now = time.time()
+    with self._lock:
+      cur = self._conn.cursor()
+      existed = cur.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+      cur.execute(
+        "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+        (key, response, now, now),
+      )
+      self._count += 0 if existed else 1
+      if self._count > self.max_entries:
+        # Evict a little below the bound so we do not pay for eviction on every insert.
+        excess = self._count - int(self.max_entries * 0.95)
+        cur.execute(
+          "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)
+        )
+        self._count -= cur.rowcount
+        self.evictions += cur.rowcount
+      self._conn.commit()
+
+  def stats(self) -> Dict:
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "entries": self._count,
+        "max_entries": self.max_entries,
+        "ttl_seconds": self.ttl_seconds,
+        "hits": self.hits,
+        "misses": self.misses,
+        "coalesced": self.coalesced,
+        "expired": self.expired,
+        "evictions": self.evictions,
+        "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+      }
+
+
+def response_key(provider: str, model: str, system: str, prompt: str, project_hash: str = "") -> str:
+  prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+  return hashlib.sha256(json.dumps([provider, model, system, prompt_hash, project_hash]).encode("utf-8")).hexdigest()
+
+
+# How generate_cached_outcome answered: the prompt went to the provider, was answered from the
+# cache (or by an identical call already in flight), or was never sent (no provider configured,
+# or the identical in-flight call it waited on failed).
+SENT, CACHED, SKIPPED = "sent", "cached", "skipped"
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+# Calls in progress by key; identical requests arriving meanwhile wait on the same future.
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+  """Process-wide cache under settings.storage_dir; None when LLM_CACHE_MAX_ENTRIES is 0."""
+  global _cache
+  if settings.llm_cache_max_entries <= 0:
+    return None
+  path = settings.storage_dir / "llm_cache.db"
+  with _cache_lock:
+    if _cache is None or _cache.path != path:
+      _cache = LLMResponseCache(path, settings.llm_cache_max_entries, settings.llm_cache_ttl_seconds)
+  return _cache
+
+
+def generate_cached(prompt: str, system: str = "", project_id: Optional[str] = None) -> Optional[str]:
+  """
+  generate_with_provider behind the response cache. With `project_id`, the key includes the
+  project's content hash, so any file change misses. Concurrent identical requests share one
+  provider call. Failed generations (None) are not cached.
+  """
+  return generate_cached_outcome(prompt, system, project_id)[0]
+
+
+def generate_cached_outcome(
+  prompt: str, system: str = "", project_id: Optional[str] = None
+) -> Tuple[Optional[str], str]:
+  """generate_cached, plus whether the prompt was SENT to the provider, CACHED or SKIPPED."""
+  if not have_llm_provider():
+    return None, SKIPPED
+  provider, model = llm_model_id()
+  key = response_key(provider, model, system, prompt, project_content_hash(project_id) if project_id else "")
+  cache = get_llm_cache()
+  if cache is not None:
+    cached = cache.get(key)
+    if cached is not None:
+      return cached, CACHED
+
+  with _inflight_lock:
+    future = _inflight.get(key)
+    leader = future is None
+    if leader:
+      future = _inflight[key] = Future()
+  if not leader:
+    if cache is not None:
+      cache.note_coalesced()
+    response = future.result()
+    return response, CACHED if response is not None else SKIPPED
+
+  try:
+    # A call that finished between our lookup and taking the lead has already filled the cache.
+    response = cache.get(key, record_stats=False) if cache is not None else None
+    outcome = CACHED
+    if response is None:
+      response = generate_with_provider(prompt, system)
+      outcome = SENT
+      if response is not None and cache is not None:
+        cache.put(key, response)
+    future.set_result(response)
+    return response, outcome
+  except BaseException as exc:
+    future.set_exception(exc)
+    raise
+  finally:
+    with _inflight_lock:
+      _inflight.pop(key, None)
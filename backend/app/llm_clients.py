@@ -1,9 +1,19 @@
+import asyncio
 import os
-from typing import List, Optional
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Coroutine, Dict, List, Optional, Tuple, TypeVar
 
+import anthropic
 import google.generativeai as genai
-from openai import OpenAI
-from anthropic import Anthropic
+import httpx
+import openai
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from .config import settings
 
 # Provider selection
 _embedding_provider = os.getenv("EMBEDDING_PROVIDER", "").lower()
@@ -25,6 +35,18 @@ _openai_llm_model = os.getenv("OPENAI_LLM_MODEL")
 # Anthropic (Claude)
 _claude_model = os.getenv("CLAUDE_MODEL")
 
+T = TypeVar("T")
+
+# Rate limited, lock/timeout conflicts, or a transient server-side failure.
+_RETRY_STATUSES = {408, 409, 429, *range(500, 600)}
+_MAX_RETRY_AFTER_SECONDS = 30.0
+_RETRY_ERRORS = (
+  asyncio.TimeoutError,
+  httpx.TransportError,
+  openai.APIConnectionError,
+  anthropic.APIConnectionError,
+)
+
 
 def _get_gemini_key() -> Optional[str]:
   return os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
@@ -38,6 +60,15 @@ def have_embedding_provider() -> bool:
   return False
 
 
+def embedding_model_id() -> Tuple[str, str]:
+  """(provider, model) identifying the vectors produced by the configured embedding provider."""
+  if _embedding_provider == "gemini":
+    return "gemini", _gemini_embed_model or ""
+  if _embedding_provider == "openai":
+    return "openai", _openai_embed_model or ""
+  return _embedding_provider, ""
+
+
 def have_llm_provider() -> bool:
   if _llm_provider == "gemini":
     return bool(_get_gemini_key() and _gemini_gen_models)
@@ -48,6 +79,17 @@ def have_llm_provider() -> bool:
   return False
 
 
+def llm_model_id() -> Tuple[str, str]:
+  """(provider, model) answering generate_with_provider; Gemini lists its fallback chain."""
+  if _llm_provider == "gemini":
+    return "gemini", ",".join(_gemini_gen_models)
+  if _llm_provider == "openai":
+    return "openai", _openai_llm_model or ""
+  if _llm_provider == "anthropic":
+    return "anthropic", _claude_model or ""
+  return _llm_provider, ""
+
+
 def _configure_gemini():
   global _gemini_configured
   if _gemini_configured:
@@ -58,25 +100,244 @@ def _configure_gemini():
     _gemini_configured = True
 
 
+class TokenBucket:
+  """Requests-per-minute limiter: up to `capacity` requests back to back, then `per_minute` on average."""
+
+  def __init__(self, per_minute: float, capacity: float = 1.0) -> None:
+    self.rate = per_minute / 60.0
+    self.capacity = max(1.0, capacity)
+    self._tokens = self.capacity
+    self._updated = time.monotonic()
+    self._lock = asyncio.Lock()
+
+  async def acquire(self) -> None:
+    async with self._lock:
+      while True:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1.0:
+          self._tokens -= 1.0
+          return
+        await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class _ProviderLimits:
+  def __init__(self) -> None:
+    concurrency = max(1, settings.llm_max_concurrency)
+    self.semaphore = asyncio.Semaphore(concurrency)
+    self.bucket = None
+    if settings.llm_requests_per_minute > 0:
+      self.bucket = TokenBucket(settings.llm_requests_per_minute, concurrency)
+
+
+class _Runtime:
+  """
+  Event loop on a daemon thread that owns the async provider clients. Every caller, whichever
+  thread or loop it runs on, sends requests here, so all of them share one keep-alive
+  connection pool and one set of concurrency/rate limits per provider.
+  """
+
+  def __init__(self) -> None:
+    self.loop = asyncio.new_event_loop()
+    self._thread = threading.Thread(target=self.loop.run_forever, name="llm-clients", daemon=True)
+    self._thread.start()
+    self.limits: Dict[str, _ProviderLimits] = {}
+    self.openai: Optional[AsyncOpenAI] = None
+    self.anthropic: Optional[AsyncAnthropic] = None
+    self.gemini_models: Dict[str, genai.GenerativeModel] = {}
+
+  def submit(self, coro: Coroutine) -> Future:
+    return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+  def provider_limits(self, provider: str) -> _ProviderLimits:
+    if provider not in self.limits:
+      self.limits[provider] = _ProviderLimits()
+    return self.limits[provider]
+
+  def openai_client(self) -> AsyncOpenAI:
+    if self.openai is None:
+      self.openai = AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=settings.llm_timeout_seconds,
+        max_retries=0,
+        http_client=_http_client(),
+      )
+    return self.openai
+
+  def anthropic_client(self) -> AsyncAnthropic:
+    if self.anthropic is None:
+      self.anthropic = AsyncAnthropic(
+        api_key=os.getenv("ANTHROPIC_API_KEY"),
+        timeout=settings.llm_timeout_seconds,
+        max_retries=0,
+        http_client=_http_client(),
+      )
+    return self.anthropic
+
+  def gemini_model(self, name: str) -> genai.GenerativeModel:
+    if name not in self.gemini_models:
+      self.gemini_models[name] = genai.GenerativeModel(name)
+    return self.gemini_models[name]
+
+  async def aclose(self) -> None:
+    for client in (self.openai, self.anthropic):
+      if client is not None:
+        await client.close()
+
+  def close(self) -> None:
+    try:
+      self.submit(self.aclose()).result(timeout=5)
+    finally:
+      self.loop.call_soon_threadsafe(self.loop.stop)
+      self._thread.join(timeout=5)
+
+
+_runtime: Optional[_Runtime] = None
+_runtime_lock = threading.Lock()
+
+
+def _get_runtime() -> _Runtime:
+  global _runtime
+  with _runtime_lock:
+    if _runtime is None:
+      _runtime = _Runtime()
+    return _runtime
+
+
+def shutdown_llm_clients() -> None:
+  """Close provider connections and stop the client loop; the next call starts a fresh one."""
+  global _runtime
+  with _runtime_lock:
+    runtime, _runtime = _runtime, None
+  if runtime is not None:
+    runtime.close()
+
+
+def _http_client() -> httpx.AsyncClient:
+  concurrency = max(1, settings.llm_max_concurrency)
+  return httpx.AsyncClient(
+    timeout=httpx.Timeout(settings.llm_timeout_seconds, connect=min(10.0, settings.llm_timeout_seconds)),
+    limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency, keepalive_expiry=60.0),
+  )
+
+
+def _run(coro: Coroutine[None, None, T]) -> T:
+  """Block the calling thread on a coroutine run by the shared client loop."""
+  return _get_runtime().submit(coro).result()
+
+
+async def _on_runtime(coro: Coroutine[None, None, T]) -> T:
+  """Await a coroutine on the shared client loop from any event loop."""
+  runtime = _get_runtime()
+  if asyncio.get_running_loop() is runtime.loop:
+    return await coro
+  return await asyncio.wrap_future(runtime.submit(coro))
+
+
+async def _request(provider: str, send: Callable[[], Awaitable[T]]) -> T:
+  """
+  One provider call under that provider's concurrency semaphore and token bucket, with a
+  per-attempt timeout. Rate limits (429), 5xx responses, timeouts and connection errors are
+  retried up to settings.llm_max_retries times with jittered exponential backoff, honouring
+  Retry-After when the provider sends one; anything else is raised at once.
+  """
+  limits = _get_runtime().provider_limits(provider)
+  attempt = 0
+  while True:
+    async with limits.semaphore:
+      if limits.bucket is not None:
+        await limits.bucket.acquire()
+      try:
+        return await asyncio.wait_for(send(), settings.llm_timeout_seconds)
+      except Exception as exc:
+        if attempt >= settings.llm_max_retries or not _retryable(exc):
+          raise
+        delay = _retry_delay(exc, attempt)
+        reason = _status(exc) or type(exc).__name__
+    attempt += 1
+    print(f"[{provider}] request failed ({reason}); retry {attempt}/{settings.llm_max_retries} in {delay:.2f}s")
+    await asyncio.sleep(delay)
+
+
+def _status(exc: Exception) -> Optional[int]:
+  status = getattr(exc, "status_code", None)
+  if status is None:
+    # google.api_core errors carry the HTTP status as `code`.
+    status = getattr(exc, "code", None)
+  return status if isinstance(status, int) else None
+
+
+def _retryable(exc: Exception) -> bool:
+  return isinstance(exc, _RETRY_ERRORS) or _status(exc) in _RETRY_STATUSES
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+  headers = getattr(getattr(exc, "response", None), "headers", None)
+  retry_after = headers.get("retry-after") if headers is not None else None
+  if retry_after:
+    try:
+      return min(_MAX_RETRY_AFTER_SECONDS, max(0.0, float(retry_after)))
+    except ValueError:
+      pass
+  base = settings.llm_backoff_seconds * (2**attempt)
+  return random.uniform(base / 2, base)
+
+
+async def aembed_batch_with_provider(texts: List[str]) -> Optional[List[List[float]]]:
+  """Async embed_batch_with_provider; safe to await from any event loop."""
+  return await _on_runtime(_embed_batch(texts))
+
+
+async def agenerate_with_provider(prompt: str, system: str = "") -> Optional[str]:
+  """Async generate_with_provider; safe to await from any event loop."""
+  return await _on_runtime(_generate(prompt, system))
+
+
 def embed_with_provider(text: str) -> Optional[List[float]]:
   """
   Embed text using the configured provider/model from env.
   Supported: gemini, openai. Returns None if not configured or on failure.
   """
+  vectors = embed_batch_with_provider([text])
+  return vectors[0] if vectors else None
+
+
+def embed_batch_with_provider(texts: List[str]) -> Optional[List[List[float]]]:
+  """
+  Embed many texts in a single provider request, preserving input order.
+  Supported: gemini, openai. Returns None if not configured or on failure.
+  """
+  if not texts:
+    return []
+  return _run(_embed_batch(texts))
+
+
+def generate_with_provider(prompt: str, system: str = "") -> Optional[str]:
+  """
+  Generate text using the configured provider/model from env.
+  Supported: gemini, openai, anthropic. Returns None if not configured or on failure.
+  """
+  return _run(_generate(prompt, system))
+
+
+async def _embed_batch(texts: List[str]) -> Optional[List[List[float]]]:
+  if not texts:
+    return []
+
   if _embedding_provider == "gemini":
     if not have_embedding_provider():
       print("[gemini] embedding skipped: missing key or GEMINI_EMBED_MODEL")
       return None
     _configure_gemini()
     try:
-      resp = genai.embed_content(
-        model=_gemini_embed_model,
-        content=text,
-        task_type="retrieval_document",
+      resp = await _request(
+        "gemini",
+        lambda: genai.embed_content_async(model=_gemini_embed_model, content=texts, task_type="retrieval_document"),
       )
-      return resp["embedding"]  # type: ignore[index]
+      return list(resp["embedding"])  # type: ignore[index]
     except Exception as exc:
-      print(f"[gemini] embedding failed: {exc}")
+      print(f"[gemini] batch embedding failed: {exc}")
       return None
 
   if _embedding_provider == "openai":
@@ -84,32 +345,29 @@ def embed_with_provider(text: str) -> Optional[List[float]]:
       print("[openai] embedding skipped: missing OPENAI_API_KEY or OPENAI_EMBED_MODEL")
       return None
     try:
-      client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-      resp = client.embeddings.create(model=_openai_embed_model, input=text)
-      vec = resp.data[0].embedding  # type: ignore[assignment]
-      return vec
+      client = _get_runtime().openai_client()
+      resp = await _request("openai", lambda: client.embeddings.create(model=_openai_embed_model, input=texts))
+      ordered = sorted(resp.data, key=lambda item: item.index)
+      return [item.embedding for item in ordered]  # type: ignore[misc]
     except Exception as exc:
-      print(f"[openai] embedding failed: {exc}")
+      print(f"[openai] batch embedding failed: {exc}")
       return None
 
   print("[embed] no embedding provider configured (set EMBEDDING_PROVIDER).")
   return None
 
 
-def generate_with_provider(prompt: str, system: str = "") -> Optional[str]:
-  """
-  Generate text using the configured provider/model from env.
-  Supported: gemini, openai, anthropic. Returns None if not configured or on failure.
-  """
+async def _generate(prompt: str, system: str) -> Optional[str]:
   if _llm_provider == "gemini":
     if not have_llm_provider():
       print("[gemini] generation skipped: missing key or GEMINI_GEN_MODELS")
       return None
     _configure_gemini()
+    text = "\n\n".join([m for m in [system, prompt] if m])
     for model_name in _gemini_gen_models:
-      model = genai.GenerativeModel(model_name)
+      model = _get_runtime().gemini_model(model_name)
       try:
-        resp = model.generate_content("\n\n".join([m for m in [system, prompt] if m]))
+        resp = await _request("gemini", lambda: model.generate_content_async(text))
         return resp.text
       except Exception as exc:
         print(f"[gemini] generation failed for {model_name}: {exc}")
@@ -121,12 +379,12 @@ def generate_with_provider(prompt: str, system: str = "") -> Optional[str]:
       print("[openai] generation skipped: missing OPENAI_API_KEY or OPENAI_LLM_MODEL")
       return None
     try:
-      client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+      client = _get_runtime().openai_client()
       messages = []
       if system:
         messages.append({"role": "system", "content": system})
       messages.append({"role": "user", "content": prompt})
-      resp = client.chat.completions.create(model=_openai_llm_model, messages=messages)
+      resp = await _request("openai", lambda: client.chat.completions.create(model=_openai_llm_model, messages=messages))
       return resp.choices[0].message.content  # type: ignore[return-value]
     except Exception as exc:
       print(f"[openai] generation failed: {exc}")
@@ -137,12 +395,15 @@ def generate_with_provider(prompt: str, system: str = "") -> Optional[str]:
       print("[anthropic] generation skipped: missing ANTHROPIC_API_KEY or CLAUDE_MODEL")
       return None
     try:
-      client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-      resp = client.messages.create(
-        model=_claude_model,
-        max_tokens=2048,
-        messages=[{"role": "user", "content": prompt}],
-        system=system or None,
+      client = _get_runtime().anthropic_client()
+      resp = await _request(
+        "anthropic",
+        lambda: client.messages.create(
+          model=_claude_model,
+          max_tokens=2048,
+          messages=[{"role": "user", "content": prompt}],
+          system=system or anthropic.NOT_GIVEN,
+        ),
       )
       # Anthropic returns a list of content blocks
       for block in resp.content:
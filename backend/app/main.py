@@ -1,12 +1,22 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
 from uuid import uuid4
 
 from .config import settings
-from .clients import get_qdrant, ensure_collection
-from .storage import save_upload, list_files, read_file, store_embeddings, load_embeddings
-from .embeddings import embed_text
+from .storage import save_upload, update_upload, project_exists, list_files, read_file, spool_path, UploadRejected
+from .embedding_cache import get_embedding_cache
+from .context_packer import prompt_stats
+from .llm_cache import get_llm_cache
+from .llm_clients import shutdown_llm_clients
 from .reviewer import scan_content
 from .models import (
   UploadResponse,
@@ -16,76 +26,117 @@ from .models import (
   EmbedRequest,
   EmbedResponse,
   EmbedRepoResponse,
+  EmbeddingCacheStats,
+  LLMCacheStats,
+  PromptStatsResponse,
   ReviewRequest,
   ReviewResponse,
   RepoReviewRequest,
   RepoReviewResponse,
+  JobSubmitRequest,
+  JobStatusResponse,
+  SymbolsResponse,
+  ReferencesResponse,
+)
+from .indexing import embed_path, embed_project, apply_upload_diff
+from .rag_pipeline import iter_repo_review, run_rag_review, run_repo_review
+from .db import (
+  init_db,
+  save_project,
+  list_projects,
+  count_projects,
+  save_dependencies,
+  save_import_specs,
+  get_project,
+  get_job,
 )
-from .repo_parser import read_text_file, parse_file
-from .embedding_store import EmbeddingStore, ChunkInput
-from .rag_pipeline import run_rag_review, run_repo_review
-from .db import init_db, save_project, list_projects, save_dependencies, neighbors
-from .dependency_graph import build_dependency_edges
+from .jobs import submit_job, cancel_job, job_kinds, start_job_workers, stop_job_workers
+from . import job_handlers  # noqa: F401  (registers job kinds)
+from .dependency_graph import import_specs_for, resolve_import_edges
+from .code_graph import invalidate_graph
+from .import_extractor import import_collector
+from .symbol_index import file_symbols, find_definitions, find_references
 
 
 router = APIRouter()
 
 
-def _embed_path(project_id: str, path: str) -> tuple[int, bool]:
-  content = read_file(project_id, path)
-  if content is None:
-    raise HTTPException(status_code=404, detail="File not found")
-  project_root = settings.storage_dir / project_id
-  full_path = project_root / path
-  file_content = read_text_file(full_path) or content
-  chunks = parse_file(full_path, file_content, path)
-
-  vector = embed_text(content, dim=settings.vector_size)
-  existing = load_embeddings(project_id)
-  existing[path] = vector
-  store_embeddings(project_id, existing)
-
-  stored_in_qdrant = False
-  client = get_qdrant()
-  if client:
-    store = EmbeddingStore()
-    chunk_inputs = [
-      ChunkInput(
-        id=str(uuid4()),  # ensure Qdrant-compatible UUID id
-        project_id=project_id,
-        path=path,
-        text=chunk.text,
-        start_line=chunk.start_line,
-        end_line=chunk.end_line,
-        metadata={
-          "raw_id": f"{path}:{chunk.start_line}-{chunk.end_line}",
-          "language": chunk.language,
-        },
-      )
-      for chunk in chunks
-    ]
-    store.upsert_chunks(project_id, chunk_inputs)
-    stored_in_qdrant = True
-
-  return len(vector), stored_in_qdrant
-
-
 @router.post("/uploadRepo", response_model=UploadResponse)
-async def upload_repo(file: UploadFile = File(...)):
-  """Accepts a repo archive or text file and stores it on disk."""
-  data = await file.read()
-  if not data:
+async def upload_repo(file: UploadFile = File(...), project_id: Optional[str] = None):
+  """
+  Accepts a repo archive or text file and stores it on disk.
+  Passing an existing project_id updates that project in place, re-indexing only changed files.
+  """
+  spooled = await _spool_upload(file)
+  upload_name = Path(file.filename or "upload.txt").name
+  try:
+    if project_id:
+      return await run_in_threadpool(_update_project, project_id, upload_name, spooled)
+    return await run_in_threadpool(_create_project, upload_name, spooled)
+  except UploadRejected as exc:
+    raise HTTPException(status_code=413, detail=str(exc))
+  finally:
+    spooled.unlink(missing_ok=True)
+
+
+async def _spool_upload(file: UploadFile) -> Path:
+  """Copy the request body to disk in 1 MiB blocks so the archive never sits in memory whole."""
+  spooled = spool_path()
+  size = 0
+  try:
+    with spooled.open("wb") as out:
+      while block := await file.read(1 << 20):
+        size += len(block)
+        if size > settings.max_upload_bytes:
+          raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.max_upload_bytes} bytes")
+        out.write(block)
+  except BaseException:
+    spooled.unlink(missing_ok=True)
+    raise
+  if not size:
+    spooled.unlink(missing_ok=True)
     raise HTTPException(status_code=400, detail="Empty upload")
+  return spooled
+
+
+def _create_project(upload_name: str, upload: Path) -> UploadResponse:
   project_id = uuid4().hex
-  files = save_upload(project_id, file.filename or "upload.txt", data)
-  save_project(project_id, file.filename or "upload.txt", created_at=_now_iso(), files=files)
+  # Import specifiers are pulled from file bytes during extraction so edge building never re-reads them.
+  import_specs: Dict[str, List[str]] = {}
+  try:
+    files = save_upload(project_id, upload_name, upload, on_file=import_collector(import_specs))
+  except UploadRejected:
+    shutil.rmtree(settings.storage_dir / project_id, ignore_errors=True)
+    raise
+  save_project(project_id, upload_name, created_at=_now_iso(), files=files)
   # Build dependency graph
   project_root = settings.storage_dir / project_id
-  edges = build_dependency_edges(project_root, files)
-  save_dependencies(project_id, edges)
+  specs = import_specs_for(project_root, files, import_specs)
+  save_dependencies(project_id, resolve_import_edges(files, specs))
+  save_import_specs(project_id, specs)
+  invalidate_graph(project_id)
   return UploadResponse(project_id=project_id, files=files, chunk_count=len(files))
 
 
+def _update_project(project_id: str, upload_name: str, upload: Path) -> UploadResponse:
+  project = get_project(project_id)
+  if not project or not project_exists(project_id):
+    raise HTTPException(status_code=404, detail="Project not found")
+  import_specs: Dict[str, List[str]] = {}
+  diff = update_upload(project_id, upload_name, upload, on_file=import_collector(import_specs))
+  save_project(project_id, project["name"], created_at=project["created_at"], files=diff.files)
+  reembedded = apply_upload_diff(project_id, diff, import_specs=import_specs)
+  return UploadResponse(
+    project_id=project_id,
+    files=diff.files,
+    chunk_count=len(diff.files),
+    added=diff.added,
+    changed=diff.changed,
+    removed=diff.removed,
+    reembedded=reembedded,
+  )
+
+
 @router.get("/listFiles", response_model=ListFilesResponse)
 async def list_project_files(project_id: str):
   files = list_files(project_id)
@@ -95,8 +146,16 @@ async def list_project_files(project_id: str):
 
 
 @router.get("/listProjects", response_model=ListProjectsResponse)
-async def list_projects_route():
-  return ListProjectsResponse(projects=list_projects())
+def list_projects_route(
+  limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0), include_files: bool = False
+):
+  """Paginated project list with file counts; include_files adds each project's file list."""
+  return ListProjectsResponse(
+    projects=list_projects(limit=limit, offset=offset, include_files=include_files),
+    total=count_projects(),
+    limit=limit,
+    offset=offset,
+  )
 
 
 @router.get("/getFile", response_model=FileResponse)
@@ -107,9 +166,37 @@ async def get_file(project_id: str, path: str):
   return FileResponse(project_id=project_id, path=path, content=content)
 
 
+@router.get("/findDefinition", response_model=SymbolsResponse)
+def find_definition_route(project_id: str, name: str):
+  """Where `name` is defined (functions, classes, methods), with the chunk holding each definition."""
+  _require_project(project_id)
+  return SymbolsResponse(project_id=project_id, symbols=find_definitions(project_id, name))
+
+
+@router.get("/findReferences", response_model=ReferencesResponse)
+def find_references_route(project_id: str, name: str, limit: int = Query(500, ge=1, le=5000)):
+  _require_project(project_id)
+  return ReferencesResponse(project_id=project_id, name=name, references=find_references(project_id, name, limit))
+
+
+@router.get("/listSymbols", response_model=SymbolsResponse)
+def list_symbols_route(project_id: str, path: str):
+  """Definitions in one file, in line order."""
+  _require_project(project_id)
+  return SymbolsResponse(project_id=project_id, symbols=file_symbols(project_id, path))
+
+
+def _require_project(project_id: str) -> None:
+  if not project_exists(project_id):
+    raise HTTPException(status_code=404, detail="Project not found")
+
+
 @router.post("/embedFile", response_model=EmbedResponse)
-async def embed_file(body: EmbedRequest):
-  vector_dim, stored_in_qdrant = _embed_path(body.project_id, body.path)
+def embed_file(body: EmbedRequest):
+  try:
+    vector_dim, stored_in_qdrant = embed_path(body.project_id, body.path)
+  except FileNotFoundError:
+    raise HTTPException(status_code=404, detail="File not found")
 
   return EmbedResponse(
     project_id=body.project_id,
@@ -120,30 +207,45 @@ async def embed_file(body: EmbedRequest):
 
 
 @router.post("/embedRepo", response_model=EmbedRepoResponse)
-async def embed_repo(project_id: str):
+def embed_repo(project_id: str):
   files = list_files(project_id)
   if not files:
     raise HTTPException(status_code=404, detail="Project not found or no files present")
-  embedded = 0
-  stored_any = False
-  for path in files:
-    try:
-      _, stored = _embed_path(project_id, path)
-      embedded += 1
-      stored_any = stored_any or stored
-    except HTTPException:
-      continue
+  embedded, stored_any = embed_project(project_id, files)
   return EmbedRepoResponse(project_id=project_id, files_total=len(files), files_embedded=embedded, stored_in_qdrant=stored_any)
 
 
+@router.get("/embeddingCacheStats", response_model=EmbeddingCacheStats)
+async def embedding_cache_stats():
+  cache = get_embedding_cache()
+  if cache is None:
+    return EmbeddingCacheStats(enabled=False)
+  return EmbeddingCacheStats(enabled=True, **cache.stats())
+
+
+@router.get("/llmCacheStats", response_model=LLMCacheStats)
+async def llm_cache_stats():
+  cache = get_llm_cache()
+  if cache is None:
+    return LLMCacheStats(enabled=False)
+  return LLMCacheStats(enabled=True, **cache.stats())
+
+
+@router.get("/promptStats", response_model=PromptStatsResponse)
+async def prompt_token_stats():
+  return PromptStatsResponse(prompts=prompt_stats.stats())
+
+
 @router.post("/reviewFile", response_model=ReviewResponse)
-async def review_file(body: ReviewRequest):
+def review_file(body: ReviewRequest):
   content = read_file(body.project_id, body.path)
   if content is None:
     raise HTTPException(status_code=404, detail="File not found")
 
   # RAG review with retrieval scoped to this file when possible.
-  rag_result = run_rag_review(body.project_id, body.query or "General review", k=6, path=body.path)
+  rag_result = run_rag_review(
+    body.project_id, body.query or "General review", k=6, path=body.path, mode=body.retrieval_mode
+  )
   findings = [
     {
       "severity": comment.severity,
@@ -163,18 +265,78 @@ async def review_file(body: ReviewRequest):
   if not findings:
     findings = scan_content(body.path, content)
 
-  return ReviewResponse(project_id=body.project_id, path=body.path, findings=findings)
+  return ReviewResponse(
+    project_id=body.project_id, path=body.path, findings=findings, prompt_tokens=rag_result.prompt_tokens
+  )
 
 
 @router.post("/reviewRepo", response_model=RepoReviewResponse)
-async def review_repo(body: RepoReviewRequest):
-  review = run_repo_review(body.project_id, body.query or "Repo review")
+def review_repo(body: RepoReviewRequest):
+  review = run_repo_review(
+    body.project_id, body.query or "Repo review", mode=body.retrieval_mode, review_mode=body.review_mode
+  )
   findings = review.get("findings", [])
-  return RepoReviewResponse(project_id=body.project_id, query=body.query or "Repo review", findings=findings)
+  return RepoReviewResponse(
+    project_id=body.project_id,
+    query=body.query or "Repo review",
+    findings=findings,
+    prompt_tokens=review.get("prompt_tokens"),
+    files_total=review.get("files_total"),
+    files_reviewed=review.get("files_reviewed"),
+    timed_out=review.get("timed_out"),
+  )
+
+
+@router.post("/reviewRepoStream")
+def review_repo_stream(body: RepoReviewRequest):
+  """
+  Map-reduce repo review streamed as NDJSON: one {"type": "partition"} line per reviewed
+  partition as it finishes, then a {"type": "summary"} line with the merged findings.
+  """
+  _require_project(body.project_id)
+  events = iter_repo_review(body.project_id, body.query or "Repo review")
+  return StreamingResponse((json.dumps(event) + "\n" for event in events), media_type="application/x-ndjson")
+
+
+@router.post("/jobs", response_model=JobStatusResponse)
+def submit_job_route(body: JobSubmitRequest):
+  """Queue embed_repo or review_repo to run on a background worker; poll GET /jobs/{id}."""
+  if not list_files(body.project_id):
+    raise HTTPException(status_code=404, detail="Project not found or no files present")
+  try:
+    params = {"query": body.query, "review_mode": body.review_mode}
+    job = submit_job(body.kind, body.project_id, {key: value for key, value in params.items() if value})
+  except ValueError as exc:
+    raise HTTPException(status_code=400, detail=f"{exc}; expected one of {job_kinds()}")
+  return JobStatusResponse(**job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job_route(job_id: str):
+  job = get_job(job_id)
+  if not job:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return JobStatusResponse(**job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobStatusResponse)
+def cancel_job_route(job_id: str):
+  job = cancel_job(job_id)
+  if not job:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return JobStatusResponse(**job)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+  start_job_workers()
+  yield
+  stop_job_workers()
+  shutdown_llm_clients()
 
 
 def create_app() -> FastAPI:
-  app = FastAPI(title="Minimal AI Code Reviewer Backend", version="0.1.0")
+  app = FastAPI(title="Minimal AI Code Reviewer Backend", version="0.1.0", lifespan=_lifespan)
   app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
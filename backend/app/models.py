@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel
 
 
@@ -6,17 +6,26 @@ class UploadResponse(BaseModel):
   project_id: str
   files: List[str]
   chunk_count: int | None = None
+  # Populated when an existing project is updated in place.
+  added: Optional[List[str]] = None
+  changed: Optional[List[str]] = None
+  removed: Optional[List[str]] = None
+  reembedded: Optional[List[str]] = None
 
 
 class ProjectInfo(BaseModel):
   id: str
   name: str
   created_at: str
-  files: List[str]
+  file_count: int
+  files: Optional[List[str]] = None
 
 
 class ListProjectsResponse(BaseModel):
   projects: List[ProjectInfo]
+  total: int
+  limit: int
+  offset: int
 
 
 class ListFilesResponse(BaseModel):
@@ -49,10 +58,57 @@ class EmbedRepoResponse(BaseModel):
   stored_in_qdrant: bool
 
 
+class EmbeddingCacheStats(BaseModel):
+  enabled: bool
+  entries: int = 0
+  max_entries: int = 0
+  hits: int = 0
+  misses: int = 0
+  evictions: int = 0
+  hit_rate: float = 0.0
+
+
+class LLMCacheStats(BaseModel):
+  enabled: bool
+  entries: int = 0
+  max_entries: int = 0
+  ttl_seconds: float = 0.0
+  hits: int = 0
+  misses: int = 0
+  coalesced: int = 0
+  expired: int = 0
+  evictions: int = 0
+  hit_rate: float = 0.0
+
+
+class PromptStatsEntry(BaseModel):
+  kind: str
+  requests: int
+  sent: int
+  cached: int
+  skipped: int
+  # Tokens of prompts sent to the provider; cached_prompt_tokens were answered from the cache.
+  prompt_tokens: int
+  cached_prompt_tokens: int
+  context_tokens: int
+  chunks_packed: int
+  chunks_dropped: int
+  avg_prompt_tokens: float
+
+
+class PromptStatsResponse(BaseModel):
+  prompts: List[PromptStatsEntry]
+
+
+RetrievalMode = Literal["vector", "lexical", "hybrid"]
+
+
 class ReviewRequest(BaseModel):
   project_id: str
   path: str
   query: Optional[str] = "Run a quick health review."
+  # Defaults to the server's RETRIEVAL_MODE.
+  retrieval_mode: Optional[RetrievalMode] = None
 
 
 class Finding(BaseModel):
@@ -71,11 +127,19 @@ class ReviewResponse(BaseModel):
   project_id: str
   path: str
   findings: List[Finding]
+  # Estimated size of the review prompt sent to the model; 0 when answered from cache or not sent.
+  prompt_tokens: Optional[int] = None
+
+
+RepoReviewMode = Literal["single", "map_reduce"]
 
 
 class RepoReviewRequest(BaseModel):
   project_id: str
   query: Optional[str] = "Run a repo-level health review."
+  retrieval_mode: Optional[RetrievalMode] = None
+  # Defaults to the server's REPO_REVIEW_MODE; /reviewRepoStream always uses map_reduce.
+  review_mode: Optional[RepoReviewMode] = None
 
 
 class RepoFinding(BaseModel):
@@ -93,3 +157,56 @@ class RepoReviewResponse(BaseModel):
   project_id: str
   query: str
   findings: List[RepoFinding]
+  prompt_tokens: Optional[int] = None
+  # Coverage, reported by map_reduce reviews.
+  files_total: Optional[int] = None
+  files_reviewed: Optional[int] = None
+  timed_out: Optional[bool] = None
+
+
+class SymbolInfo(BaseModel):
+  name: str
+  kind: str
+  path: str
+  start_line: int
+  end_line: int
+  chunk_id: Optional[str] = None
+
+
+class SymbolsResponse(BaseModel):
+  project_id: str
+  symbols: List[SymbolInfo]
+
+
+class ReferenceInfo(BaseModel):
+  path: str
+  line: int
+  text: str
+
+
+class ReferencesResponse(BaseModel):
+  project_id: str
+  name: str
+  references: List[ReferenceInfo]
+
+
+class JobSubmitRequest(BaseModel):
+  kind: str
+  project_id: str
+  query: Optional[str] = None
+  review_mode: Optional[RepoReviewMode] = None
+
+
+class JobStatusResponse(BaseModel):
+  id: str
+  kind: str
+  project_id: str
+  status: str
+  progress_done: int
+  progress_total: int
+  message: Optional[str] = None
+  result: Optional[Dict[str, Any]] = None
+  error: Optional[str] = None
+  cancel_requested: bool = False
+  created_at: str
+  updated_at: str
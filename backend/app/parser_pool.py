@@ -0,0 +1,42 @@
+import threading
+from typing import Dict
+
+from tree_sitter import Language, Parser
+from tree_sitter_languages import get_language as _load_language
+
+# Grammars are loaded once per process; parsers are not thread-safe, so each thread keeps its own.
+_languages: Dict[str, Language] = {}
+_languages_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_language(name: str) -> Language:
+  """Process-wide cached grammar; raises like tree_sitter_languages for unknown languages."""
+  language = _languages.get(name)
+  if language is None:
+    with _languages_lock:
+      language = _languages.get(name)
+      if language is None:
+        language = _load_language(name)
+        _languages[name] = language
+  return language
+
+
+def get_parser(name: str) -> Parser:
+  """Parser for `name` owned by the calling thread, created on first use and reused afterwards."""
+  parsers: Dict[str, Parser] = getattr(_local, "parsers", None) or {}
+  if not parsers:
+    _local.parsers = parsers
+  parser = parsers.get(name)
+  if parser is None:
+    parser = Parser()
+    parser.set_language(get_language(name))
+    parsers[name] = parser
+  return parser
+
+
+def clear() -> None:
+  """Drop cached grammars and this thread's parsers (used by benchmarks to measure cold cost)."""
+  with _languages_lock:
+    _languages.clear()
+  _local.parsers = {}
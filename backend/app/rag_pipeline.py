@@ -1,16 +1,34 @@
 import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .embedding_store import EmbeddingStore
-from .embeddings import embed_text, cosine_similarity
-from .db import neighbors
-from .storage import read_file, load_embeddings, list_files
+from .embeddings import LOCAL_MODEL, embed_text
+from .code_graph import get_graph
+from .symbol_index import definitions_for, unused_symbols
+from .symbols import IDENTIFIER_RE
+from .storage import list_files
+from .snippets import file_lines, snippet
+from .vector_index import LocalVectorIndex
+from .lexical_index import LexicalIndex, has_lexical_index
 from .config import settings
-from .llm_clients import generate_with_provider, have_llm_provider
+from .context_packer import pack_context, prompt_stats, whole_file_tokens
+from .llm_cache import SKIPPED, generate_cached_outcome
+from .llm_clients import have_llm_provider
 from .review_intent import parse_intent
 
 
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
+# Distinct identifiers from retrieved snippets looked up in the symbol index per query.
+_MAX_EXPANSION_IDENTIFIERS = 200
+# Leading lines of each file offered to the repo review as its representative chunk.
+_FILE_PREVIEW_LINES = 40
+_SEVERITY_RANK = {"info": 0, "low": 1, "warning": 2, "medium": 2, "error": 3, "high": 3, "critical": 4}
+
+
 @dataclass
 class ReviewComment:
   file: str
@@ -30,69 +48,165 @@ class RagReviewResult:
   project_id: str
   query: str
   comments: List[ReviewComment]
+  prompt_tokens: int = 0
 
 
 def _llm_available() -> bool:
   return have_llm_provider()
 
 
-def retrieve_top_k(project_id: str, query: str, k: int = 5, path: Optional[str] = None) -> List[dict]:
+def retrieve_top_k(
+  project_id: str, query: str, k: int = 5, path: Optional[str] = None, mode: Optional[str] = None
+) -> List[dict]:
   """
   Retrieve top-k relevant chunks.
-  Prefers Qdrant via EmbeddingStore; falls back to local embeddings.json cosine similarity.
+  `mode` (default settings.retrieval_mode) is "vector", "lexical" or "hybrid". Vector search
+  prefers Qdrant via EmbeddingStore and falls back to the local chunk index; lexical search ranks
+  chunks by BM25 over identifiers; hybrid fuses both rankings with reciprocal rank fusion.
+  With `path`, search is limited to files within settings.graph_hops imports of it (either
+  direction) and results are ordered by graph distance, then score.
+  Definitions of identifiers used in the hits are appended from the symbol index.
   """
+  mode = mode or settings.retrieval_mode
+  if mode not in RETRIEVAL_MODES:
+    raise ValueError(f"unknown retrieval mode: {mode}")
+  distances: Dict[str, int] = {}
+  if path:
+    try:
+      distances = _graph_neighborhood(project_id, path)
+    except Exception as exc:
+      # Retrieval still works without the import graph, just not scoped to the file's neighborhood.
+      print(f"[rag] project={project_id} import graph unavailable ({exc}); searching unscoped")
+      path = None
+  if mode == "vector":
+    results = _vector_search(project_id, query, k, path, distances)
+  elif mode == "lexical":
+    results = _lexical_search(project_id, query, k, distances)
+  else:
+    # Over-fetch both lists so chunks ranked well by only one of them can still make the cut.
+    results = _fuse_rankings(
+      [_vector_search(project_id, query, k * 2, path, distances), _lexical_search(project_id, query, k * 2, distances)],
+      k,
+    )
+  if distances:
+    results.sort(key=lambda r: (distances.get(r["path"], len(distances)), -r["score"]))
+  return _with_definitions(project_id, results)
+
+
+def _vector_search(
+  project_id: str, query: str, k: int, path: Optional[str], distances: Dict[str, int]
+) -> List[dict]:
   try:
     store = EmbeddingStore()
-    paths = [path] if path else None
+    # Embedded once and reused for every per-path search.
+    query_vector = store.embed(query)
     if path:
-      paths = list({path, *neighbors(project_id, path)})
-    hits = []
-    if paths:
-      for p in paths:
-        hits.extend(store.search(project_id, query, limit=max(2, k // len(paths)), path=p))
+      paths = sorted(distances, key=lambda p: (distances[p], p))
+      hits = store.search_paths(project_id, query_vector, paths, per_path=max(2, k // len(paths)))
     else:
-      hits = store.search(project_id, query, limit=k, path=path)
-    results = []
+      hits = store.search(project_id, query, limit=k, query_vector=query_vector)
+    spans = []
     for hit in hits:
-      content = read_file(project_id, hit.path) or ""
-      snippet = content[:400]
-      start_line = hit.metadata.get("start_line", 1)
-      end_line = hit.metadata.get("end_line")
-      results.append(
-        {
-          "path": hit.path,
-          "score": hit.score,
-          "snippet": snippet,
-          "line": start_line,
-          "end_line": end_line,
-        }
-      )
-    return [r for r in results if not _skip_path(r["path"])]
+      if not _skip_path(hit.path):
+        start_line = hit.metadata.get("start_line", 1)
+        end_line = hit.metadata.get("end_line") or start_line
+        spans.append((hit.path, start_line, end_line, hit.score, hit.metadata.get("text")))
+    return _chunk_results(project_id, spans)
   except Exception:
-    # Fallback to local embeddings.json similarity over whole files.
-    vectors = load_embeddings(project_id)
-    if not vectors:
+    # Fallback to the local chunk index; files are read only for the winners.
+    index = LocalVectorIndex.load(project_id, LOCAL_MODEL, settings.vector_size)
+    if not len(index):
       return []
     query_vec = embed_text(query, dim=settings.vector_size)
-    scored = []
-    for p, vec in vectors.items():
-      score = cosine_similarity(query_vec, vec)
-      content = read_file(project_id, p) or ""
-      scored.append({"path": p, "score": score, "snippet": content[:400], "line": 1})
-    scored = [r for r in scored if not _skip_path(r["path"])]
-    return sorted(scored, key=lambda x: x["score"], reverse=True)[:k]
+    hits = []
+    # Over-fetch a little so skipped metadata paths do not leave us short of k.
+    for row, score in index.search(query_vec, k * 2, paths=distances or None):
+      hit = index.row(row)
+      if not _skip_path(hit.path):
+        hits.append((hit.path, hit.start_line, hit.end_line, score))
+        if len(hits) == k:
+          break
+    return _chunk_results(project_id, hits)
+
+
+def _lexical_search(project_id: str, query: str, k: int, distances: Dict[str, int]) -> List[dict]:
+  """BM25 over the project's lexical index; works without an embedding provider or Qdrant."""
+  if not has_lexical_index(project_id):
+    return []
+  with LexicalIndex.open(project_id) as lexical:
+    hits = lexical.search(query, k * 2, paths=list(distances) if distances else None)
+  return _chunk_results(project_id, [hit for hit in hits if not _skip_path(hit[0])][:k])
+
+
+def _chunk_results(project_id: str, hits: List[tuple]) -> List[dict]:
+  """
+  Result dicts for (path, start_line, end_line, score[, text]) hits. Hits that carry their chunk
+  text are used as-is; the rest are sliced from the snippet service's cached copy of the file.
+  """
+  results = []
+  for hit in hits:
+    path, start_line, end_line, score = hit[:4]
+    text = hit[4] if len(hit) > 4 else None
+    if text is None:
+      text = snippet(project_id, path, start_line, end_line)
+    results.append({"path": path, "score": score, "snippet": text, "line": start_line, "end_line": end_line})
+  return results
+
+
+def _fuse_rankings(rankings: List[List[dict]], k: int) -> List[dict]:
+  """
+  Reciprocal rank fusion: each chunk scores sum(1 / (settings.rrf_k + rank)) over the lists
+  that contain it, so vector and BM25 scores never need to share a scale.
+  """
+  fused: Dict[tuple, dict] = {}
+  for ranking in rankings:
+    for rank, result in enumerate(ranking, start=1):
+      key = (result["path"], result.get("line") or 1, result.get("end_line"))
+      entry = fused.setdefault(key, {**result, "score": 0.0})
+      entry["score"] += 1.0 / (settings.rrf_k + rank)
+  return sorted(fused.values(), key=lambda r: -r["score"])[:k]
+
+
+def _with_definitions(project_id: str, results: List[dict]) -> List[dict]:
+  """
+  Append up to settings.definition_expansion chunks defining identifiers that the hits use,
+  so the prompt sees exact definitions rather than only what is vector-similar.
+  """
+  limit = settings.definition_expansion
+  if limit <= 0 or not results:
+    return results
+  identifiers = list(dict.fromkeys(name for r in results for name in IDENTIFIER_RE.findall(r.get("snippet", ""))))
+  covered = [(r["path"], r.get("line") or 1, r.get("end_line") or r.get("line") or 1) for r in results]
+  added: List[dict] = []
+  for definition in definitions_for(project_id, identifiers[:_MAX_EXPANSION_IDENTIFIERS], limit * 4):
+    start, end = definition["start_line"], definition["end_line"]
+    if any(p == definition["path"] and s <= start and end <= e for p, s, e in covered) or _skip_path(definition["path"]):
+      continue
+    added.append(
+      {
+        "path": definition["path"],
+        "score": 0.0,
+        "snippet": snippet(project_id, definition["path"], start, end),
+        "line": start,
+        "end_line": end,
+        "definition_of": definition["name"],
+      }
+    )
+    covered.append((definition["path"], start, end))
+    if len(added) == limit:
+      break
+  return results + added
 
 
-def build_prompt_context(chunks: List[dict]) -> str:
-  parts = []
-  for chunk in chunks:
-    snippet = chunk["snippet"][:400]
-    parts.append(f"File: {chunk['path']} (score {chunk.get('score', 0):.3f})\n{snippet}")
-  return "\n\n".join(parts)
+def _graph_neighborhood(project_id: str, path: str) -> Dict[str, int]:
+  """`path` plus its import neighborhood, as path -> hop distance, capped to the closest files."""
+  distances = get_graph(project_id).k_hop([path], settings.graph_hops)
+  distances.setdefault(path, 0)
+  nearest = sorted(distances, key=lambda p: (distances[p], p))[: settings.graph_max_paths]
+  return {p: distances[p] for p in nearest}
 
 
-def build_repo_prompt(query: str, chunks: List[dict], intent) -> str:
-  context = build_prompt_context(chunks)
+def build_repo_prompt(query: str, context: str, intent) -> str:
   intent_name = getattr(intent, "name", query)
   checks = [
     "credentials validated before login success",
@@ -133,23 +247,33 @@ Context (grouped by file):
 """
 
 
-def generate_comments(query: str, context: str) -> List[ReviewComment]:
-  """
-  Generate structured review comments via LLM; falls back to heuristic JSON when LLM unavailable.
-  """
+def build_comments_prompt(query: str, context: str) -> str:
   system_prompt = (
     "You are an AI code reviewer. Return JSON array under key 'comments'. "
     "Each item: {file, line, lines (array), severity (info|warning|error|low|medium|high|critical), "
     "summary, explanation, recommendation, suggestion, optional_patch, cross_file}."
   )
+  return (
+    f"{system_prompt}\n"
+    'Respond ONLY with JSON, e.g. {"comments":[{"file":"file.ts","line":12,"lines":[12,13],"severity":"warning","summary":"...","explanation":"...","recommendation":"...","suggestion":"...","optional_patch":"...","cross_file":false}]}.\n'
+    f"Query: {query}\n\nContext:\n{context}"
+  )
+
 
+def generate_comments(query: str, context: str, project_id: Optional[str] = None) -> List[ReviewComment]:
+  """
+  Generate structured review comments via LLM; falls back to heuristic JSON when LLM unavailable.
+  """
+  return _generate_comments(query, context, project_id)[0]
+
+
+def _generate_comments(
+  query: str, context: str, project_id: Optional[str] = None
+) -> Tuple[List[ReviewComment], str]:
+  """generate_comments plus the llm_cache outcome of the call, for prompt accounting."""
+  outcome = SKIPPED
   if _llm_available():
-    prompt = (
-      f"{system_prompt}\n"
-      'Respond ONLY with JSON, e.g. {"comments":[{"file":"file.ts","line":12,"lines":[12,13],"severity":"warning","summary":"...","explanation":"...","recommendation":"...","suggestion":"...","optional_patch":"...","cross_file":false}]}.\n'
-      f"Query: {query}\n\nContext:\n{context}"
-    )
-    raw = generate_with_provider(prompt, system="")
+    raw, outcome = generate_cached_outcome(build_comments_prompt(query, context), system="", project_id=project_id)
     if raw:
       parsed = _safe_parse_json(raw)
       if parsed is not None:
@@ -167,7 +291,7 @@ def generate_comments(query: str, context: str) -> List[ReviewComment]:
             cross_file=bool(item.get("cross_file", False)),
           )
           for item in parsed.get("comments", [])
-        ]
+        ], outcome
       else:
         print("[llm] JSON parse failed, falling back to heuristic review.")
   else:
@@ -181,35 +305,197 @@ def generate_comments(query: str, context: str) -> List[ReviewComment]:
     summary="No LLM key provided; returning placeholder review.",
     recommendation="Configure LLM provider env (LLM_PROVIDER + key/model) to enable structured review generation.",
   )
-  return [comment]
+  return [comment], outcome
+
 
+def run_rag_review(
+  project_id: str, query: str, k: int = 5, path: Optional[str] = None, mode: Optional[str] = None
+) -> RagReviewResult:
+  chunks = retrieve_top_k(project_id, query, k, path, mode)
+  budget = settings.context_token_budget
+  context = pack_context(chunks, budget)
+  comments, outcome = _generate_comments(query, context.text, project_id)
+  prompt = build_comments_prompt(query, context.text)
+  prompt_tokens = prompt_stats.record("file_review", prompt, context, budget, outcome)
+  return RagReviewResult(project_id=project_id, query=query, comments=comments, prompt_tokens=prompt_tokens)
 
-def run_rag_review(project_id: str, query: str, k: int = 5, path: Optional[str] = None) -> RagReviewResult:
-  chunks = retrieve_top_k(project_id, query, k, path)
-  context = build_prompt_context(chunks)
-  comments = generate_comments(query, context)
-  return RagReviewResult(project_id=project_id, query=query, comments=comments)
 
+def run_repo_review(
+  project_id: str, query: str, k: int = 20, mode: Optional[str] = None, review_mode: Optional[str] = None
+) -> dict:
+  """
+  Repository review as one prompt ("single": top-k hits plus the heads of the most central files)
+  or, with review_mode "map_reduce", over every file; see iter_repo_review.
+  review_mode defaults to settings.repo_review_mode.
+  """
+  review_mode = review_mode or settings.repo_review_mode
+  if review_mode == "map_reduce":
+    summary: dict = {}
+    for event in iter_repo_review(project_id, query):
+      summary = event
+    return summary
+  if review_mode != "single":
+    raise ValueError(f"unknown review mode: {review_mode}")
 
-def run_repo_review(project_id: str, query: str, k: int = 20) -> dict:
   intent = parse_intent(query)
-  chunks = retrieve_top_k(project_id, query, k)
-  # add one representative chunk per file to broaden coverage
-  extra_chunks = []
-  for path in list_files(project_id)[:50]:
-    content = read_file(project_id, path) or ""
-    if content:
-      extra_chunks.append({"path": path, "score": 0, "snippet": content[:200], "line": 1})
-  chunks.extend(extra_chunks)
+  chunks = retrieve_top_k(project_id, query, k, mode=mode)
+  # Then the head of each file to broaden coverage, most central files first; the packer keeps
+  # whatever fits the budget after the retrieved hits.
+  for path in _review_files(project_id, 50):
+    lines = file_lines(project_id, path)
+    if lines is not None and lines.line_count:
+      end_line = min(lines.line_count, _FILE_PREVIEW_LINES)
+      chunks.append({"path": path, "score": 0, "snippet": lines.slice(1, end_line), "line": 1, "end_line": end_line})
   chunks = [c for c in chunks if not _skip_path(c["path"])]
-  prompt = build_repo_prompt(query, chunks, intent)
-  raw = generate_with_provider(prompt)
-  parsed = _safe_parse_json(raw or "{}")
-  findings = parsed.get("findings", []) if parsed else []
-  findings = _normalize_repo_findings(findings)
-  findings = [f for f in findings if not any(_skip_path(p) for p in f.get("files", []))]
+  budget = settings.repo_context_token_budget
+  context = pack_context(chunks, budget)
+  prompt = build_repo_prompt(query, context.text, intent)
+  raw, outcome = generate_cached_outcome(prompt, project_id=project_id)
+  prompt_tokens = prompt_stats.record("repo_review", prompt, context, budget, outcome)
+  findings = _parse_repo_findings(raw)
   findings += _heuristic_repo_findings(project_id)
-  return {"findings": findings}
+  return {"findings": findings, "prompt_tokens": prompt_tokens}
+
+
+def iter_repo_review(project_id: str, query: str) -> Iterator[dict]:
+  """
+  Map-reduce repository review covering every file.
+  Files are split into partitions that each fit settings.repo_context_token_budget (see
+  partition_files); up to settings.review_concurrency partitions are reviewed at once.
+  Yields a {"type": "partition"} event with that partition's findings as each one finishes, then
+  a final {"type": "summary"} event with all findings merged and deduplicated. Partitions still
+  unfinished after settings.review_deadline_seconds are abandoned and counted in the summary.
+  """
+  started = time.monotonic()
+  intent = parse_intent(query)
+  partitions = partition_files(project_id, settings.repo_context_token_budget)
+  findings: List[dict] = []
+  prompt_tokens = 0
+  reviewed = files_reviewed = 0
+  pool = ThreadPoolExecutor(max_workers=max(1, settings.review_concurrency), thread_name_prefix="review-map")
+  try:
+    futures = {
+      pool.submit(_review_partition, project_id, query, intent, files): index for index, files in enumerate(partitions)
+    }
+    pending = set(futures)
+    deadline = started + settings.review_deadline_seconds
+    while pending:
+      finished, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+      if not finished:
+        break
+      for future in finished:
+        index = futures[future]
+        try:
+          partition_findings, tokens, packed = future.result()
+        except Exception as exc:
+          print(f"[review] partition {index} failed: {exc}")
+          partition_findings, tokens, packed = [], 0, []
+        findings.extend(partition_findings)
+        prompt_tokens += tokens
+        reviewed += 1
+        files_reviewed += len(packed)
+        yield {
+          "type": "partition",
+          "partition": index,
+          "partitions_done": reviewed,
+          "partitions_total": len(partitions),
+          "files": packed,
+          "findings": partition_findings,
+        }
+  finally:
+    pool.shutdown(wait=False, cancel_futures=True)
+
+  yield {
+    "type": "summary",
+    "findings": _merge_repo_findings(findings + _heuristic_repo_findings(project_id)),
+    "partitions_total": len(partitions),
+    "partitions_reviewed": reviewed,
+    "files_total": sum(len(files) for files in partitions),
+    "files_reviewed": files_reviewed,
+    "timed_out": reviewed < len(partitions),
+    "elapsed_seconds": round(time.monotonic() - started, 3),
+    "prompt_tokens": prompt_tokens,
+  }
+
+
+def partition_files(project_id: str, budget: int) -> List[List[str]]:
+  """
+  Split the project's non-empty files into review partitions of at most `budget` tokens, costed
+  as pack_context will charge them, so each partition packs whole. Files are taken in path order
+  so a directory's files stay together; a file larger than the budget gets a partition of its
+  own and is cut by the packer.
+  """
+  partitions: List[List[str]] = []
+  current: List[str] = []
+  used = 0
+  for path in sorted(list_files(project_id)):
+    if _skip_path(path):
+      continue
+    lines = file_lines(project_id, path)
+    if lines is None or not lines.text:
+      continue
+    cost = whole_file_tokens(path, lines.text)
+    if current and used + cost > budget:
+      partitions.append(current)
+      current, used = [], 0
+    current.append(path)
+    used += cost
+  if current:
+    partitions.append(current)
+  return partitions
+
+
+def _review_partition(
+  project_id: str, query: str, intent, files: List[str]
+) -> Tuple[List[dict], int, List[str]]:
+  """(findings, prompt tokens sent, paths that made it into the prompt) for one partition."""
+  chunks = []
+  for path in files:
+    lines = file_lines(project_id, path)
+    if lines is not None and lines.text:
+      chunks.append({"path": path, "score": 0, "snippet": lines.text, "line": 1})
+  budget = settings.repo_context_token_budget
+  context = pack_context(chunks, budget)
+  if not context.text:
+    return [], 0, []
+  prompt = build_repo_prompt(query, context.text, intent)
+  raw, outcome = generate_cached_outcome(prompt, project_id=project_id)
+  prompt_tokens = prompt_stats.record("repo_review_map", prompt, context, budget, outcome)
+  return _parse_repo_findings(raw), prompt_tokens, context.paths
+
+
+def _parse_repo_findings(raw: Optional[str]) -> List[dict]:
+  parsed = _safe_parse_json(raw or "{}")
+  findings = _normalize_repo_findings(parsed.get("findings", []) if parsed else [])
+  return [f for f in findings if not any(_skip_path(p) for p in f.get("files", []))]
+
+
+def _merge_repo_findings(findings: List[dict]) -> List[dict]:
+  """
+  Collapse findings reporting the same issue on the same files (as partitions overlapping on
+  shared code tend to), keeping the highest severity and the union of lines.
+  """
+  merged: Dict[tuple, dict] = {}
+  for finding in findings:
+    key = (" ".join(str(finding.get("issue", "")).lower().split()), tuple(sorted(finding.get("files", []))))
+    existing = merged.get(key)
+    if existing is None:
+      merged[key] = finding
+      continue
+    existing["lines"] = sorted(set(existing.get("lines", [])) | set(finding.get("lines", [])))
+    if _SEVERITY_RANK.get(finding.get("severity"), 0) > _SEVERITY_RANK.get(existing.get("severity"), 0):
+      existing["severity"] = finding["severity"]
+  return list(merged.values())
+
+
+def _review_files(project_id: str, limit: int) -> List[str]:
+  """Up to `limit` files ranked by import-graph centrality; files unknown to the graph go last."""
+  files = list_files(project_id)
+  known = set(files)
+  ranked = [p for p in get_graph(project_id).central_files() if p in known]
+  seen = set(ranked)
+  ranked += [p for p in files if p not in seen]
+  return ranked[:limit]
 
 
 def _safe_parse_json(raw: str) -> Optional[dict]:
@@ -263,59 +549,31 @@ def _normalize_repo_findings(findings: List[dict]) -> List[dict]:
 
 
 def _heuristic_repo_findings(project_id: str) -> List[dict]:
-  """Lightweight cross-file heuristics to flag unused functions/configs."""
-  files = list_files(project_id)
-  defs = {}
-  refs = {}
-  for path in files:
-    content = read_file(project_id, path) or ""
-    for name in _extract_function_names(content, path):
-      defs.setdefault(name, set()).add(path)
-    for name in defs.keys():
-      if name in content:
-        refs.setdefault(name, set()).add(path)
+  """Lightweight cross-file heuristics to flag unused functions/classes, backed by the persisted symbol index."""
+  grouped: Dict[str, dict] = {}
+  for symbol in unused_symbols(project_id):
+    if _skip_path(symbol["path"]):
+      continue
+    entry = grouped.setdefault(symbol["name"], {"files": set(), "lines": set()})
+    entry["files"].add(symbol["path"])
+    entry["lines"].add(symbol["line"])
 
   findings = []
-  for name, def_paths in defs.items():
-    ref_paths = refs.get(name, set())
-    if not ref_paths:
-      findings.append(
-        {
-          "issue": f"Function or method '{name}' is defined but never referenced",
-          "files": sorted(def_paths),
-          "lines": [],
-          "severity": "info",
-          "explanation": f"'{name}' appears to be unused across the repository.",
-          "suggestion": "Remove if dead code or ensure it is called where intended.",
-          "optional_patch": None,
-          "cross_file": True,
-        }
-      )
+  for name, entry in grouped.items():
+    findings.append(
+      {
+        "issue": f"Function or method '{name}' is defined but never referenced",
+        "files": sorted(entry["files"]),
+        "lines": sorted(entry["lines"]),
+        "severity": "info",
+        "explanation": f"'{name}' appears to be unused across the repository.",
+        "suggestion": "Remove if dead code or ensure it is called where intended.",
+        "optional_patch": None,
+        "cross_file": True,
+      }
+    )
   return findings
 
 
-def _extract_function_names(content: str, path: str) -> List[str]:
-  import re
-
-  names = set()
-  if path.endswith((".js", ".jsx", ".ts", ".tsx")):
-    for pat in [
-      r"function\s+(\w+)",
-      r"const\s+(\w+)\s*=\s*\(",
-      r"(\w+)\s*=\s*\(.*?\)\s*=>",
-      r"class\s+(\w+)",
-    ]:
-      names.update(re.findall(pat, content))
-  elif path.endswith(".py"):
-    names.update(re.findall(r"def\s+(\w+)\s*\(", content))
-    names.update(re.findall(r"class\s+(\w+)\s*:", content))
-  elif path.endswith(".go"):
-    names.update(re.findall(r"func\s+(\w+)\s*\(", content))
-  elif path.endswith(".java"):
-    names.update(re.findall(r"(?:class|interface)\s+(\w+)", content))
-    names.update(re.findall(r"(?:public|private|protected)\s+(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\(", content))
-  return list(names)
-
-
 def _skip_path(path: str) -> bool:
   return "__MACOSX" in path or "/._" in path or path.startswith("._")
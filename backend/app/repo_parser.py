@@ -1,10 +1,13 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 import os
 
 from .ast_chunker import extract_ast_chunks, chunk_by_lines, AstChunk
-from .language_registry import detect_language
+from .import_extractor import extract_import_specs, import_language
+from .language_registry import detect_language_with_tree
+from .parser_pool import get_parser
+from .symbols import SymbolDef, assign_chunks, identifier_counts, regex_definitions
 
 IGNORED_DIRS = {
   ".git",
@@ -66,14 +69,37 @@ def read_text_file(path: Path) -> Optional[str]:
 
 
 def parse_file(path: Path, content: str, rel_path: str) -> List[ParsedChunk]:
-  lang = detect_language(path, content)
-  if lang:
-    chunks = extract_ast_chunks(lang, content, rel_path)
-    if chunks:
-      return chunks
-  return chunk_by_lines(content, max_lines=80, path=rel_path, language=lang or "unknown")
-
-
+  return analyze_file(path, content, rel_path).chunks
+
+
+@dataclass
+class FileAnalysis:
+  chunks: List[ParsedChunk]
+  imports: List[str]
+  symbols: List[SymbolDef]
+  identifiers: Dict[str, int]
+
+
+def analyze_file(path: Path, content: str, rel_path: str) -> FileAnalysis:
+  """Chunks, import specifiers, defined symbols and identifier counts of one file from a single parse."""
+  lang, tree = detect_language_with_tree(path, content)
+  if lang and tree is None:
+    try:
+      tree = get_parser(lang).parse(bytes(content, "utf-8"))
+    except Exception:
+      tree = None
+  imports = extract_import_specs(rel_path, content, tree=tree) if import_language(rel_path) else []
+  chunks = extract_ast_chunks(lang, content, rel_path, tree=tree) if lang else []
+  if chunks:
+    symbols = [
+      SymbolDef(chunk.symbol, chunk.kind or "", chunk.start_line, chunk.end_line, chunk.decorated, i)
+      for i, chunk in enumerate(chunks)
+      if chunk.symbol
+    ]
+  else:
+    chunks = chunk_by_lines(content, max_lines=80, path=rel_path, language=lang or "unknown")
+    symbols = assign_chunks(regex_definitions(content, rel_path), [(c.start_line, c.end_line) for c in chunks])
+  return FileAnalysis(chunks=chunks, imports=imports, symbols=symbols, identifiers=identifier_counts(content))
 
 
 def _is_allowed(path: Path) -> bool:
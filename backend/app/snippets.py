@@ -0,0 +1,87 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .config import settings
+from .storage import file_stamp, read_file
+
+_NEWLINE_RE = re.compile(r"\n")
+
+
+class FileLines:
+  """Decoded file content plus the offset where each line starts, so line ranges slice in O(1)."""
+
+  __slots__ = ("text", "offsets")
+
+  def __init__(self, text: str) -> None:
+    self.text = text
+    self.offsets: List[int] = [0] + [m.end() for m in _NEWLINE_RE.finditer(text)]
+
+  @property
+  def line_count(self) -> int:
+    return len(self.offsets) - 1 if not self.text or self.text.endswith("\n") else len(self.offsets)
+
+  def slice(self, start_line: int, end_line: int) -> str:
+    """Lines start_line..end_line (1-based, inclusive) joined by newlines, like splitlines()[a - 1 : b]."""
+    start = max(start_line, 1)
+    end = min(end_line, self.line_count)
+    if start > end:
+      return ""
+    stop = self.offsets[end] if end < len(self.offsets) else len(self.text)
+    text = self.text[self.offsets[start - 1] : stop]
+    return text[:-1] if text.endswith("\n") else text
+
+
+# (project_id, path) -> ((mtime_ns, size), FileLines), least recently used first.
+_files: "OrderedDict[Tuple[str, str], Tuple[tuple, FileLines]]" = OrderedDict()
+_files_chars = 0
+_files_lock = threading.Lock()
+
+
+def file_lines(project_id: str, path: str) -> Optional[FileLines]:
+  """
+  The file's lines from the in-process LRU; a cached entry is reused while the file's mtime and
+  size are unchanged, so repeated hits on one file cost a stat rather than a read.
+  """
+  global _files_chars
+  stamp = file_stamp(project_id, path)
+  if stamp is None:
+    return None
+  key = (project_id, path)
+  with _files_lock:
+    cached = _files.get(key)
+    if cached is not None and cached[0] == stamp:
+      _files.move_to_end(key)
+      return cached[1]
+  content = read_file(project_id, path)
+  if content is None:
+    return None
+  lines = FileLines(content)
+  budget = settings.snippet_cache_bytes
+  if len(content) > budget:
+    return lines
+  with _files_lock:
+    previous = _files.pop(key, None)
+    if previous is not None:
+      _files_chars -= len(previous[1].text)
+    _files[key] = (stamp, lines)
+    _files_chars += len(content)
+    while _files_chars > budget:
+      _, (_, evicted) = _files.popitem(last=False)
+      _files_chars -= len(evicted.text)
+  return lines
+
+
+def snippet(project_id: str, path: str, start_line: int, end_line: int) -> str:
+  """Lines start_line..end_line of a project file; empty when the file is gone."""
+  lines = file_lines(project_id, path)
+  return lines.slice(start_line, end_line) if lines is not None else ""
+
+
+def invalidate_snippets(project_id: str) -> None:
+  """Drop a project's cached files; call after its files change or it is deleted."""
+  global _files_chars
+  with _files_lock:
+    for key in [key for key in _files if key[0] == project_id]:
+      _files_chars -= len(_files.pop(key)[1].text)
@@ -1,44 +1,173 @@
+import hashlib
 import json
+import shutil
 import zipfile
-from pathlib import Path
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
 
 from .config import settings
-from .repo_parser import list_repo_files, _is_allowed, IGNORED_DIRS
+from .repo_parser import _is_allowed, IGNORED_DIRS, MAX_FILE_BYTES
+
+
+STAGING_DIR = ".incoming"
+SPOOL_DIR = ".uploads"
+
+# Called with (relative path, content) for each file extracted from an archive.
+FileHook = Callable[[str, bytes], None]
+
+# project_id -> ((manifest mtime_ns, size), content hash)
+_content_hashes: Dict[str, tuple] = {}
+
+
+@dataclass
+class UploadDiff:
+  files: List[str]
+  added: List[str] = field(default_factory=list)
+  changed: List[str] = field(default_factory=list)
+  removed: List[str] = field(default_factory=list)
 
 
 def _project_dir(project_id: str) -> Path:
   return settings.storage_dir / project_id
 
 
-def save_upload(project_id: str, upload_name: str, data: bytes) -> List[str]:
-  """Persist uploaded archive or file and return relative file paths."""
+def project_exists(project_id: str) -> bool:
+  return (_project_dir(project_id) / "manifest.json").exists()
+
+
+class UploadRejected(ValueError):
+  """The upload exceeds a size/entry limit or looks like a zip bomb."""
+
+
+def spool_path() -> Path:
+  """Fresh temp path on the storage volume for spooling a request body to disk."""
+  spool_dir = settings.storage_dir / SPOOL_DIR
+  spool_dir.mkdir(parents=True, exist_ok=True)
+  return spool_dir / f"{uuid4().hex}.part"
+
+
+def save_upload(project_id: str, upload_name: str, upload: Path, on_file: Optional[FileHook] = None) -> List[str]:
+  """
+  Persist a spooled archive or file (moved into the project) and return relative file paths.
+  `on_file` sees each extracted file's bytes while they are still in memory.
+  """
   project_path = _project_dir(project_id)
   project_path.mkdir(parents=True, exist_ok=True)
-  upload_path = project_path / upload_name
-  upload_path.write_bytes(data)
+  hashes = _unpack_upload(project_path, upload_name, upload, on_file)
+  _write_manifest(project_path, hashes)
+  return sorted(hashes)
+
+
+def update_upload(
+  project_id: str, upload_name: str, upload: Path, on_file: Optional[FileHook] = None
+) -> UploadDiff:
+  """
+  Replace an existing project's files with a new upload, touching only what changed.
+  The upload is unpacked into a staging directory and diffed against manifest.json by content hash.
+  """
+  project_path = _project_dir(project_id)
+  old_hashes = _read_manifest(project_path)
+  staging = project_path / STAGING_DIR
+  shutil.rmtree(staging, ignore_errors=True)
+  staging.mkdir(parents=True)
+  upload_name = Path(upload_name).name
+  try:
+    new_hashes = _unpack_upload(staging, upload_name, upload, on_file)
+    diff = UploadDiff(files=sorted(new_hashes))
+    for path in diff.files:
+      if path not in old_hashes:
+        diff.added.append(path)
+      elif old_hashes[path] != new_hashes[path]:
+        diff.changed.append(path)
+      else:
+        continue
+      target = project_path / path
+      target.parent.mkdir(parents=True, exist_ok=True)
+      (staging / path).replace(target)
+    diff.removed = sorted(set(old_hashes) - set(new_hashes))
+    for path in diff.removed:
+      (project_path / path).unlink(missing_ok=True)
+    if (staging / upload_name).exists():
+      (staging / upload_name).replace(project_path / upload_name)
+  finally:
+    shutil.rmtree(staging, ignore_errors=True)
+  _write_manifest(project_path, new_hashes)
+  return diff
+
+
+def _unpack_upload(
+  target: Path, upload_name: str, upload: Path, on_file: Optional[FileHook] = None
+) -> Dict[str, str]:
+  """Move the spooled upload into `target` and extract it; returns relative path -> sha256."""
+  upload_path = target / Path(upload_name).name
+  shutil.move(str(upload), upload_path)
 
-  file_paths: List[str] = []
   if zipfile.is_zipfile(upload_path):
-    with zipfile.ZipFile(upload_path, "r") as zf:
-      zf.extractall(project_path)
-      file_paths = list_repo_files(project_path)
-  else:
-    # Treat as single file content; also write to a normalized path.
-    rel_path = Path(upload_name).name
-    normalized_path = project_path / rel_path
-    normalized_path.write_bytes(data)
-    file_paths = [rel_path] if _is_allowed(normalized_path) else []
+    return _extract_archive(upload_path, target, on_file)
+  # Treat as single file content; the upload itself is the normalized path.
+  if not _is_allowed(upload_path):
+    return {}
+  return {upload_path.name: _hash_file(upload_path)}
+
+
+def _extract_archive(archive: Path, target: Path, on_file: Optional[FileHook] = None) -> Dict[str, str]:
+  """
+  Stream allowed entries out of a zip, hashing as they are written.
+  Ignored directories, disallowed extensions and entries over MAX_FILE_BYTES are never extracted;
+  entry-count, total-size and compression-ratio limits reject zip bombs before or while writing.
+  """
+  hashes: Dict[str, str] = {}
+  total = 0
+  with zipfile.ZipFile(archive, "r") as zf:
+    for info in zf.infolist():
+      if info.is_dir():
+        continue
+      rel = _safe_member_path(info.filename)
+      if rel is None or not _is_allowed(Path(rel)) or info.file_size > MAX_FILE_BYTES:
+        continue
+      if len(hashes) >= settings.max_archive_entries:
+        raise UploadRejected(f"archive has more than {settings.max_archive_entries} source files")
+      total += info.file_size
+      if total > settings.max_extract_bytes:
+        raise UploadRejected(f"archive expands to more than {settings.max_extract_bytes} bytes")
+      if info.compress_size and info.file_size / info.compress_size > settings.max_compression_ratio:
+        raise UploadRejected(f"entry {rel} has a suspicious compression ratio")
+      dest = target / rel
+      dest.parent.mkdir(parents=True, exist_ok=True)
+      digest = hashlib.sha256()
+      written = 0
+      blocks: List[bytes] = []
+      with zf.open(info) as src, dest.open("wb") as out:
+        for block in iter(lambda: src.read(1 << 16), b""):
+          written += len(block)
+          # Never trust the header: stop if the entry inflates past its declared size.
+          if written > info.file_size:
+            raise UploadRejected(f"entry {rel} is larger than its declared size")
+          digest.update(block)
+          out.write(block)
+          if on_file:
+            blocks.append(block)
+      hashes[rel] = digest.hexdigest()
+      if on_file:
+        on_file(rel, b"".join(blocks))
+  return hashes
 
-  _write_manifest(project_path, file_paths)
-  return file_paths
+
+def _safe_member_path(name: str) -> Optional[str]:
+  """Normalized relative path for a zip member, or None if it would escape the target directory."""
+  parts = [part for part in PurePosixPath(name.replace("\\", "/")).parts if part not in ("", ".")]
+  if not parts or name.startswith("/") or ".." in parts or ":" in parts[0]:
+    return None
+  return "/".join(parts)
 
 
 def list_files(project_id: str) -> List[str]:
   project_path = _project_dir(project_id)
   manifest = project_path / "manifest.json"
   if manifest.exists():
-    files = json.loads(manifest.read_text())
+    files = list(_read_manifest(project_path))
   else:
     files = [str(p.relative_to(project_path)) for p in project_path.rglob("*") if p.is_file()]
   return [
@@ -48,6 +177,54 @@ def list_files(project_id: str) -> List[str]:
   ]
 
 
+def file_hashes(project_id: str) -> Dict[str, str]:
+  """sha256 of each project file, from the manifest; hashed on the fly for legacy manifests."""
+  project_path = _project_dir(project_id)
+  recorded = _read_manifest(project_path)
+  hashes: Dict[str, str] = {}
+  for path in list_files(project_id):
+    digest = recorded.get(path)
+    if digest is None:
+      full = project_path / path
+      if not full.is_file():
+        continue
+      digest = _hash_file(full)
+    hashes[path] = digest
+  return hashes
+
+
+def project_content_hash(project_id: str) -> str:
+  """
+  Digest of every file path and content hash in the project; changes whenever any file does.
+  Memoized on the manifest's mtime and size, so repeated calls cost one stat.
+  """
+  manifest = _project_dir(project_id) / "manifest.json"
+  try:
+    stat = manifest.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+  except OSError:
+    stamp = None
+  cached = _content_hashes.get(project_id)
+  if stamp is not None and cached is not None and cached[0] == stamp:
+    return cached[1]
+  digest = hashlib.sha256()
+  for path, sha in sorted(file_hashes(project_id).items()):
+    digest.update(f"{path}\0{sha}\n".encode("utf-8"))
+  value = digest.hexdigest()
+  if stamp is not None:
+    _content_hashes[project_id] = (stamp, value)
+  return value
+
+
+def file_stamp(project_id: str, rel_path: str) -> Optional[Tuple[int, int]]:
+  """(mtime_ns, size) of a project file, or None when it is missing; cheap change detection for caches."""
+  try:
+    stat = (_project_dir(project_id) / rel_path).stat()
+  except OSError:
+    return None
+  return stat.st_mtime_ns, stat.st_size
+
+
 def read_file(project_id: str, rel_path: str) -> Optional[str]:
   path = _project_dir(project_id) / rel_path
   if not path.exists() or not path.is_file():
@@ -55,18 +232,25 @@ def read_file(project_id: str, rel_path: str) -> Optional[str]:
   return path.read_text(encoding="utf-8", errors="ignore")
 
 
-def store_embeddings(project_id: str, embeddings: Dict[str, list]) -> None:
-  project_path = _project_dir(project_id)
-  project_path.mkdir(parents=True, exist_ok=True)
-  (project_path / "embeddings.json").write_text(json.dumps(embeddings), encoding="utf-8")
+def _read_manifest(project_path: Path) -> Dict[str, Optional[str]]:
+  """Map of relative path -> sha256; manifests written before hashing was added map to None."""
+  manifest = project_path / "manifest.json"
+  if not manifest.exists():
+    return {}
+  data = json.loads(manifest.read_text())
+  if isinstance(data, list):
+    return {path: None for path in data}
+  return dict(data.get("files", {}))
 
 
-def load_embeddings(project_id: str) -> Dict[str, list]:
-  path = _project_dir(project_id) / "embeddings.json"
-  if not path.exists():
-    return {}
-  return json.loads(path.read_text())
+def _write_manifest(project_path: Path, hashes: Dict[str, str]) -> None:
+  manifest = {"version": 2, "files": {path: hashes[path] for path in sorted(hashes)}}
+  (project_path / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
 
 
-def _write_manifest(project_path: Path, files: List[str]) -> None:
-  (project_path / "manifest.json").write_text(json.dumps(files, indent=2), encoding="utf-8")
+def _hash_file(path: Path) -> str:
+  digest = hashlib.sha256()
+  with path.open("rb") as fh:
+    for block in iter(lambda: fh.read(1 << 16), b""):
+      digest.update(block)
+  return digest.hexdigest()
@@ -0,0 +1,113 @@
+import re
+from typing import Dict, List
+
+from .chunk_pipeline import FileChunks, chunk_point_id, iter_chunk_batches
+from .config import settings
+from .db import (
+  apply_symbol_changes,
+  files_using_identifier,
+  find_symbol_defs,
+  symbol_file_hashes,
+  unused_symbol_defs,
+)
+from .storage import file_hashes, read_file
+from .symbols import IDENTIFIER_RE
+
+# Entry points, hooks and tests that are called by a runtime or framework rather than by name.
+_IMPLICIT_NAMES = {"main", "init", "constructor", "render", "setUp", "tearDown"}
+_IMPLICIT_PREFIXES = ("test_", "Test")
+
+
+def record_chunk_symbols(project_id: str, batch: List[FileChunks]) -> None:
+  """Store the definitions and identifier counts the chunker produced for `batch`."""
+  updates = [_symbol_update(project_id, item) for item in batch if item.sha256]
+  if updates:
+    apply_symbol_changes(project_id, [], updates)
+
+
+def ensure_symbol_index(project_id: str) -> int:
+  """
+  Bring the project's persisted symbol index up to date with its files, chunking only files whose
+  content hash changed since they were last indexed. Returns the number of files (re)indexed.
+  """
+  current = file_hashes(project_id)
+  indexed = symbol_file_hashes(project_id)
+  removed = [path for path in indexed if path not in current]
+  stale = [path for path, digest in current.items() if indexed.get(path) != digest]
+  if removed:
+    apply_symbol_changes(project_id, removed, [])
+  for batch in iter_chunk_batches(settings.storage_dir / project_id, stale):
+    record_chunk_symbols(project_id, batch)
+  return len(stale)
+
+
+def unused_symbols(project_id: str) -> List[Dict]:
+  """Definitions never referenced anywhere else in the project, refreshing the index first."""
+  ensure_symbol_index(project_id)
+  return [symbol for symbol in unused_symbol_defs(project_id) if not _implicit(symbol["name"])]
+
+
+def find_definitions(project_id: str, name: str) -> List[Dict]:
+  ensure_symbol_index(project_id)
+  return find_symbol_defs(project_id, names=[name])
+
+
+def file_symbols(project_id: str, path: str) -> List[Dict]:
+  ensure_symbol_index(project_id)
+  return find_symbol_defs(project_id, path=path)
+
+
+def find_references(project_id: str, name: str, limit: int = 500) -> List[Dict]:
+  """
+  Lines mentioning identifier `name`, excluding its definition lines. The index narrows the
+  search to files that contain the token, so only those are read.
+  """
+  if not IDENTIFIER_RE.fullmatch(name):
+    return []
+  ensure_symbol_index(project_id)
+  definitions = {(d["path"], d["start_line"]) for d in find_symbol_defs(project_id, names=[name])}
+  pattern = re.compile(rf"(?<![\w$]){re.escape(name)}(?![\w$])")
+  references: List[Dict] = []
+  for path, _ in files_using_identifier(project_id, name):
+    content = read_file(project_id, path) or ""
+    for number, line in enumerate(content.splitlines(), start=1):
+      if (path, number) in definitions or not pattern.search(line):
+        continue
+      references.append({"path": path, "line": number, "text": line.strip()})
+      if len(references) >= limit:
+        return references
+  return references
+
+
+def definitions_for(project_id: str, identifiers: List[str], limit: int) -> List[Dict]:
+  """
+  Up to `limit` unambiguous definitions (names defined exactly once) of `identifiers`, in the
+  order the identifiers are given. Uses the index as it stands; no refresh.
+  """
+  if limit <= 0 or not identifiers:
+    return []
+  by_name: Dict[str, List[Dict]] = {}
+  for definition in find_symbol_defs(project_id, names=list(dict.fromkeys(identifiers))):
+    by_name.setdefault(definition["name"], []).append(definition)
+  found = []
+  for name in dict.fromkeys(identifiers):
+    if len(by_name.get(name, [])) == 1:
+      found.append(by_name[name][0])
+      if len(found) == limit:
+        break
+  return found
+
+
+def _symbol_update(project_id: str, item: FileChunks) -> tuple:
+  definitions = []
+  for symbol in item.symbols:
+    chunk_id = None
+    if symbol.chunk_index is not None:
+      chunk = item.chunks[symbol.chunk_index]
+      chunk_id = chunk_point_id(project_id, item.path, chunk.start_line, chunk.end_line, chunk.text)
+    definitions.append((symbol.name, symbol.kind, symbol.start_line, symbol.end_line, chunk_id, symbol.decorated))
+  return item.path, item.sha256, item.identifiers, definitions
+
+
+def _implicit(name: str) -> bool:
+  return name in _IMPLICIT_NAMES or name.startswith(_IMPLICIT_PREFIXES) or (name.startswith("__") and name.endswith("__"))
@@ -0,0 +1,136 @@
+import re
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from tree_sitter import Node
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_$][\w$]*")
+_NEWLINE_RE = re.compile("\n")
+
+
+@dataclass
+class SymbolDef:
+  name: str
+  kind: str
+  start_line: int
+  end_line: int
+  # Reached through a decorator/annotation (routes, handlers, overrides) rather than by name.
+  decorated: bool = False
+  # Index of the file chunk that holds the definition, if any.
+  chunk_index: Optional[int] = None
+
+
+# Regex fallback for files tree-sitter could not chunk: (pattern, kind) per language family,
+# group 1 is the defined name.
+_DEFINITION_PATTERNS: Dict[str, List[tuple]] = {
+  "js": [
+    (re.compile(r"function\s*\*?\s+(\w+)"), "function"),
+    (re.compile(r"const\s+(\w+)\s*=\s*(?:async\s*)?\("), "function"),
+    (re.compile(r"(\w+)\s*=\s*(?:async\s*)?\([^()\n]*\)\s*=>"), "function"),
+    (re.compile(r"class\s+(\w+)"), "class"),
+  ],
+  "python": [
+    (re.compile(r"^[ \t]*(?:async[ \t]+)?def\s+(\w+)\s*\(", re.MULTILINE), "function"),
+    (re.compile(r"^[ \t]*class\s+(\w+)\s*[:(]", re.MULTILINE), "class"),
+  ],
+  "go": [
+    (re.compile(r"func\s+(?:\([^)]*\)\s*)?(\w+)\s*\("), "function"),
+  ],
+  "java": [
+    (re.compile(r"(?:class|interface)\s+(\w+)"), "class"),
+    (re.compile(r"(?:public|private|protected)\s+(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\("), "method"),
+  ],
+}
+_FAMILY = {".js": "js", ".jsx": "js", ".ts": "js", ".tsx": "js", ".py": "python", ".go": "go", ".java": "java"}
+
+_NODE_KINDS = {
+  "function_definition": "function",
+  "function_declaration": "function",
+  "function": "function",
+  "arrow_function": "function",
+  "class_definition": "class",
+  "class_declaration": "class",
+  "interface_declaration": "interface",
+  "method_definition": "method",
+  "method_declaration": "method",
+  "constructor_declaration": "constructor",
+}
+
+
+def identifier_counts(content: str) -> Dict[str, int]:
+  """How often each identifier-shaped token occurs in `content`."""
+  return dict(Counter(IDENTIFIER_RE.findall(content)))
+
+
+def symbol_name(node: Node) -> Optional[str]:
+  """Declared name of a definition node, from its tree-sitter `name` field."""
+  name = node.child_by_field_name("name")
+  return name.text.decode("utf-8", errors="ignore") if name is not None else None
+
+
+def symbol_kind(node: Node) -> str:
+  kind = _NODE_KINDS.get(node.type, node.type)
+  if kind == "function":
+    # Python methods are plain function_definitions inside a class body.
+    outer = node.parent
+    if outer is not None and outer.type == "decorated_definition":
+      outer = outer.parent
+    if outer is not None and outer.type == "block" and outer.parent is not None and outer.parent.type == "class_definition":
+      return "method"
+  return kind
+
+
+def is_decorated(node: Node) -> bool:
+  if node.parent is not None and node.parent.type == "decorated_definition":
+    return True
+  for child in node.children:
+    if child.type == "decorator":
+      return True
+    if child.type == "modifiers" and any("annotation" in mod.type for mod in child.children):
+      return True
+  return False
+
+
+def regex_definitions(content: str, path: str) -> List[SymbolDef]:
+  """Definitions found by the per-language regexes, one line each, in source order."""
+  family = _FAMILY.get(_suffix(path))
+  if family is None:
+    return []
+  line_starts = [0] + [match.end() for match in _NEWLINE_RE.finditer(content)]
+  lines = content.split("\n")
+  found: Dict[tuple, SymbolDef] = {}
+  for pattern, kind in _DEFINITION_PATTERNS[family]:
+    for match in pattern.finditer(content):
+      name = match.group(1)
+      line = bisect_right(line_starts, match.start(1))
+      if (name, line) not in found:
+        found[(name, line)] = SymbolDef(name, kind, line, line, decorated=_follows_decorator(lines, line))
+  return sorted(found.values(), key=lambda symbol: (symbol.start_line, symbol.name))
+
+
+def assign_chunks(symbols: List[SymbolDef], spans: Sequence[tuple]) -> List[SymbolDef]:
+  """Point each symbol without a chunk at the smallest (start, end) span that contains it."""
+  for symbol in symbols:
+    if symbol.chunk_index is not None:
+      continue
+    best = None
+    for i, (start, end) in enumerate(spans):
+      if start <= symbol.start_line and symbol.end_line <= end and (best is None or end - start < best[1]):
+        best = (i, end - start)
+    symbol.chunk_index = best[0] if best else None
+  return symbols
+
+
+def _follows_decorator(lines: List[str], line: int) -> bool:
+  for index in range(line - 2, -1, -1):
+    stripped = lines[index].strip()
+    if stripped:
+      return stripped.startswith("@")
+  return False
+
+
+def _suffix(path: str) -> str:
+  dot = path.rfind(".")
+  return path[dot:].lower() if dot != -1 else ""
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 from typing import List
 
-from tree_sitter import Language, Parser
+from tree_sitter import Language
+
+from .symbols import symbol_name
 
 _TS_LANGUAGE = Language.build_library(
   # Build a temporary shared library in memory to load TS; tree-sitter-languages ships grammars.
@@ -11,7 +13,7 @@ _TS_LANGUAGE = Language.build_library(
 ) if False else None  # Avoid building at import; languages provided below.
 
 try:
-  from tree_sitter_languages import get_language
+  from .parser_pool import get_parser
 except Exception as e:  # pragma: no cover
   raise RuntimeError("tree-sitter-languages is required for chunk extraction") from e
 
@@ -31,9 +33,7 @@ def extract_ts_chunks(source: str, max_lines: int = 80) -> List[TsChunk]:
   Falls back to a single chunk if parsing fails.
   """
   try:
-    parser = Parser()
-    language = get_language("typescript")
-    parser.set_language(language)
+    parser = get_parser("typescript")
     tree = parser.parse(bytes(source, "utf-8"))
     root = tree.root_node
     lines = source.splitlines()
@@ -85,10 +85,7 @@ def is_target(node) -> bool:
 
 
 def get_name(node) -> str:
-  name_field = node.child_by_field_name("name")
-  if name_field:
-    return name_field.text.decode("utf-8")
-  return node.type
+  return symbol_name(node) or node.type
 
 
 def slice_by_lines(code: str, start_line_zero: int, max_lines: int) -> List[TsChunk]:
@@ -0,0 +1,418 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .config import settings
+
+INDEX_DIR = "index"
+INDEX_VERSION = 2
+_VECTORS_FILE = "vectors.npy"
+_SCALES_FILE = "scales.npy"
+_FULL_FILE = "full.npy"
+_ROWS_FILE = "rows.npy"
+_CENTROIDS_FILE = "ivf_centroids.npy"
+_ASSIGN_FILE = "ivf_assign.npy"
+_META_FILE = "meta.json"
+VECTOR_DTYPES = ("float32", "float16", "int8")
+# Rows converted to float32 at a time when scoring a quantized matrix, bounding the temporary copy.
+_SCORE_BLOCK = 65536
+# IVF training: Lloyd iterations, and training rows sampled per list.
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLE_PER_LIST = 40
+
+
+@dataclass
+class IndexRow:
+  path: str
+  start_line: int
+  end_line: int
+
+
+class LocalVectorIndex:
+  """
+  On-disk chunk-level vector index used when Qdrant is unavailable.
+  Files under <project>/index/:
+    vectors.npy  [n, dim] L2-normalized rows stored as settings.local_vector_dtype: float32,
+                 float16, or int8 scaled per row; memory-mapped on load
+    scales.npy   float32 [n] per-row scale of int8 vectors (int8 only)
+    full.npy     float32 [n, dim] full-precision copy for re-ranking (quantized with re-rank only)
+    rows.npy     int32 [n, 3] = (path id, start_line, end_line)
+    ivf_*.npy    IVF-flat centroids [nlist, dim] and each row's list [n] (after build_ann only)
+    meta.json    version, embedder, dim, dtype, row count and the path id -> path table
+  A query is one matrix-vector product over vectors.npy, or over the rows of the
+  settings.ann_nprobe closest IVF lists once build_ann() has run; with full.npy, the best
+  k * settings.local_vector_rerank rows are re-scored at full precision.
+  """
+
+  def __init__(
+    self,
+    root: Path,
+    vectors: np.ndarray,
+    row_paths: List[str],
+    spans: np.ndarray,
+    scales: Optional[np.ndarray] = None,
+    full: Optional[np.ndarray] = None,
+    centroids: Optional[np.ndarray] = None,
+    assign: Optional[np.ndarray] = None,
+    embedder: Optional[str] = None,
+  ) -> None:
+    self.root = root
+    # Model that produced the vectors, recorded so an index from another embedder is not reused.
+    self.embedder = embedder
+    # Set by load() when it rejected the saved index; saving would replace it with this one.
+    self.stale = False
+    self.vectors = vectors
+    self.scales = scales
+    self.full = full
+    self.centroids = centroids
+    self.assign = assign
+    # (rows ordered by list, offset of each list) derived from `assign` on first probe.
+    self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    self.row_paths = row_paths
+    self.spans = spans
+    # Mutations are buffered and folded into the arrays by _compact(), so bulk upserts stay linear.
+    self._new_vectors: List[np.ndarray] = []
+    self._new_paths: List[str] = []
+    self._new_spans: List[Tuple[int, int]] = []
+    self._dead: Set[int] = set()
+    self._rows_of: Dict[str, List[int]] = {}
+    for row, path in enumerate(row_paths):
+      self._rows_of.setdefault(path, []).append(row)
+
+  def __len__(self) -> int:
+    return len(self.row_paths) + len(self._new_paths) - len(self._dead)
+
+  @property
+  def dim(self) -> int:
+    if self._new_vectors:
+      return int(self._new_vectors[0].shape[0])
+    return int(self.vectors.shape[1]) if self.vectors.ndim == 2 and self.vectors.shape[0] else 0
+
+  @property
+  def paths(self) -> List[str]:
+    """Distinct file paths with at least one live chunk."""
+    return sorted(self._rows_of)
+
+  @classmethod
+  def empty(cls, project_id: str, embedder: Optional[str] = None) -> "LocalVectorIndex":
+    """A new index for the project, replacing any saved one on save()."""
+    root = settings.storage_dir / project_id / INDEX_DIR
+    return cls(root, np.zeros((0, 0), dtype=np.float32), [], np.zeros((0, 2), dtype=np.int32), embedder=embedder)
+
+  @classmethod
+  def load(cls, project_id: str, embedder: Optional[str] = None, dim: Optional[int] = None) -> "LocalVectorIndex":
+    """
+    The project's saved index, or an empty one when there is none or it is stale. Given `embedder`
+    and `dim`, an index built by another embedder or at another dimension is stale too.
+    """
+    root = settings.storage_dir / project_id / INDEX_DIR
+    vectors_path = root / _VECTORS_FILE
+    rows_path = root / _ROWS_FILE
+    meta_path = root / _META_FILE
+    if vectors_path.exists() and rows_path.exists() and meta_path.exists():
+      meta = json.loads(meta_path.read_text())
+      vectors = np.load(vectors_path, mmap_mode="r")
+      rows = np.load(rows_path)
+      scales = np.load(root / _SCALES_FILE) if meta.get("dtype") == "int8" else None
+      full = np.load(root / _FULL_FILE, mmap_mode="r") if meta.get("full") else None
+      centroids = np.load(root / _CENTROIDS_FILE) if meta.get("ann") else None
+      assign = np.load(root / _ASSIGN_FILE) if meta.get("ann") else None
+      count = meta.get("count")
+      if (
+        meta.get("version") == INDEX_VERSION
+        and (embedder is None or meta.get("embedder") == embedder)
+        and (dim is None or not count or meta.get("dim") == dim)
+        and count == vectors.shape[0] == rows.shape[0]
+        and (scales is None or scales.shape[0] == count)
+        and (full is None or full.shape[0] == count)
+        and (assign is None or assign.shape[0] == count)
+      ):
+        table = meta["paths"]
+        spans = np.ascontiguousarray(rows[:, 1:])
+        row_paths = [table[i] for i in rows[:, 0]]
+        return cls(
+          root, vectors, row_paths, spans, scales, full, centroids, assign, embedder=embedder or meta.get("embedder")
+        )
+      print(f"[index] project={project_id} index is stale or out of sync; re-run /embedRepo to rebuild it")
+      index = cls.empty(project_id, embedder)
+      index.stale = True
+      return index
+    return cls.empty(project_id, embedder)
+
+  def upsert_chunks(self, path: str, vectors: Sequence[Sequence[float]], spans: Sequence[Tuple[int, int]]) -> None:
+    """Replace every chunk of `path` with the given vectors and (start_line, end_line) spans."""
+    if len(vectors) != len(spans):
+      raise ValueError("vectors and spans must have the same length")
+    rows = [np.asarray(vec, dtype=np.float32) for vec in vectors]
+    dim = self.dim if len(self) else 0
+    for row in rows:
+      if dim and row.shape[0] != dim:
+        raise ValueError(f"vector dimension {row.shape[0]} does not match index dimension {dim}")
+      dim = row.shape[0]
+    self.remove_paths([path])
+    first = len(self.row_paths) + len(self._new_paths)
+    self._rows_of[path] = list(range(first, first + len(rows)))
+    self._new_vectors.extend(rows)
+    self._new_paths.extend([path] * len(rows))
+    self._new_spans.extend((int(start), int(end)) for start, end in spans)
+    if not rows:
+      self._rows_of.pop(path)
+
+  def remove_paths(self, paths: Iterable[str]) -> None:
+    for path in paths:
+      self._dead.update(self._rows_of.pop(path, []))
+
+  def row(self, row: int) -> IndexRow:
+    start, end = self.spans[row]
+    return IndexRow(path=self.row_paths[row], start_line=int(start), end_line=int(end))
+
+  def save(self) -> None:
+    self._compact(convert=True)
+    self.root.mkdir(parents=True, exist_ok=True)
+    table = self.paths
+    path_ids = {path: i for i, path in enumerate(table)}
+    rows = np.zeros((len(self.row_paths), 3), dtype=np.int32)
+    if len(self.row_paths):
+      rows[:, 0] = [path_ids[path] for path in self.row_paths]
+      rows[:, 1:] = self.spans
+    meta = {
+      "version": INDEX_VERSION,
+      "embedder": self.embedder,
+      "dtype": self.vectors.dtype.name,
+      "full": self.full is not None,
+      "ann": int(self.centroids.shape[0]) if self.centroids is not None else 0,
+      "count": len(self.row_paths),
+      "dim": self.dim,
+      "paths": table,
+    }
+    arrays = {_VECTORS_FILE: self.vectors, _ROWS_FILE: rows}
+    if self.scales is not None:
+      arrays[_SCALES_FILE] = self.scales
+    if self.full is not None:
+      arrays[_FULL_FILE] = self.full
+    if self.centroids is not None:
+      arrays[_CENTROIDS_FILE] = self.centroids
+      arrays[_ASSIGN_FILE] = self.assign
+    # Write everything to temp files first so a crash never leaves a half-written index.
+    tmp = {name: self.root / (name + ".tmp") for name in (*arrays, _META_FILE)}
+    for name, array in arrays.items():
+      with tmp[name].open("wb") as fh:
+        np.save(fh, np.ascontiguousarray(array))
+    tmp[_META_FILE].write_text(json.dumps(meta), encoding="utf-8")
+    for name, path in tmp.items():
+      os.replace(path, self.root / name)
+    for name in (_SCALES_FILE, _FULL_FILE, _CENTROIDS_FILE, _ASSIGN_FILE):
+      if name not in arrays:
+        (self.root / name).unlink(missing_ok=True)
+
+  def search(
+    self,
+    query: Iterable[float],
+    k: int,
+    paths: Optional[Collection[str]] = None,
+    nprobe: Optional[int] = None,
+  ) -> List[Tuple[int, float]]:
+    """
+    Top-k (row, cosine score) pairs, best first, optionally only within `paths`. Use row() to resolve a row.
+    With an IVF index, unscoped searches scan the `nprobe` (default settings.ann_nprobe) closest lists;
+    nprobe <= 0 forces an exact scan.
+    """
+    self._compact()
+    if not len(self.row_paths) or k <= 0:
+      return []
+    q = _normalize(np.asarray(list(query), dtype=np.float32)[None, :])[0]
+    if q.shape[0] != self.dim:
+      print(f"[index] query dimension {q.shape[0]} does not match index dimension {self.dim}")
+      return []
+    nprobe = settings.ann_nprobe if nprobe is None else nprobe
+    if paths is not None:
+      candidates = np.array(sorted(row for path in paths for row in self._rows_of.get(path, [])), dtype=np.int64)
+      if not candidates.shape[0]:
+        return []
+    elif self.centroids is not None and 0 < nprobe < self.centroids.shape[0]:
+      candidates = self._probe(q, nprobe)
+      if not candidates.shape[0]:
+        # Every probed list is empty (e.g. their rows were all removed): scan everything instead.
+        candidates = None
+    else:
+      candidates = None
+    scores = self._scores(q, candidates)
+    rerank = self.full is not None and settings.local_vector_rerank > 0
+    top = _top_k(scores, k * settings.local_vector_rerank if rerank else k)
+    rows = top if candidates is None else candidates[top]
+    if rerank:
+      # Quantized scores only shortlist; the final order comes from the full-precision rows.
+      rows = np.sort(rows)
+      exact = np.asarray(self.full[rows], dtype=np.float32) @ q
+      best = _top_k(exact, k)
+      return [(int(rows[i]), float(exact[i])) for i in best]
+    return [(int(row), float(scores[i])) for row, i in zip(rows, top)]
+
+  def build_ann(self, nlist: Optional[int] = None) -> None:
+    """
+    Train IVF-flat coarse centroids (spherical k-means on a sample of rows) and assign every row
+    to its closest one. nlist defaults to settings.ann_nlist, or about sqrt(rows) when that is 0.
+    Rows added later are assigned to the existing centroids; call again to retrain.
+    """
+    self._compact()
+    count = len(self.row_paths)
+    if not count:
+      return
+    nlist = nlist or settings.ann_nlist or int(np.sqrt(count))
+    nlist = max(1, min(nlist, count))
+    rng = np.random.default_rng(0)
+    sample_rows = np.sort(rng.choice(count, size=min(count, nlist * _KMEANS_SAMPLE_PER_LIST), replace=False))
+    sample = self._float_rows(sample_rows)
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)]
+    for _ in range(_KMEANS_ITERATIONS):
+      labels = _nearest(sample, centroids)
+      order = np.argsort(labels, kind="stable")
+      members, starts = np.unique(labels[order], return_index=True)
+      sums = np.add.reduceat(sample[order], starts, axis=0)
+      # Lists that lost every member are reseeded from random sample rows.
+      centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)]
+      centroids[members] = sums
+      centroids = _normalize(centroids)
+    self.centroids = centroids
+    self.assign = np.concatenate(
+      [
+        _nearest(self._float_rows(np.arange(start, min(start + _SCORE_BLOCK, count))), centroids)
+        for start in range(0, count, _SCORE_BLOCK)
+      ]
+    )
+    self._lists = None
+
+  def _probe(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+    """Rows in the `nprobe` IVF lists whose centroids are closest to `q`, ascending."""
+    if self._lists is None:
+      order = np.argsort(self.assign, kind="stable")
+      offsets = np.searchsorted(self.assign[order], np.arange(self.centroids.shape[0] + 1))
+      self._lists = (order, offsets)
+    order, offsets = self._lists
+    lists = _top_k(self.centroids @ q, nprobe)
+    return np.sort(np.concatenate([order[offsets[c] : offsets[c + 1]] for c in lists]))
+
+  def _float_rows(self, rows: np.ndarray) -> np.ndarray:
+    """Rows as float32, from the full-precision copy when there is one."""
+    if self.full is not None:
+      return np.asarray(self.full[rows], dtype=np.float32)
+    return self._dequantized(rows)
+
+  def _scores(self, q: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+    """Cosine scores of `rows` (all rows when None) against the normalized query."""
+    vectors = self.vectors if rows is None else self.vectors[rows]
+    if vectors.dtype == np.float32:
+      scores = vectors @ q
+    else:
+      scores = np.empty(vectors.shape[0], dtype=np.float32)
+      for start in range(0, vectors.shape[0], _SCORE_BLOCK):
+        block = vectors[start : start + _SCORE_BLOCK]
+        scores[start : start + block.shape[0]] = block.astype(np.float32) @ q
+    if self.scales is not None:
+      scores *= self.scales if rows is None else self.scales[rows]
+    return scores
+
+  def _compact(self, convert: bool = False) -> None:
+    """
+    Fold buffered upserts and removals into the arrays. With `convert` (on save), rows stored
+    under other storage settings are converted even when nothing is pending; searches leave
+    them as they are, since every dtype can be scanned.
+    """
+    dtype = settings.local_vector_dtype
+    if dtype not in VECTOR_DTYPES:
+      raise ValueError(f"unknown local vector dtype: {dtype}")
+    keep_full = dtype != "float32" and settings.local_vector_rerank > 0
+    stored_as = self.vectors.dtype.name == dtype and (self.full is not None) == keep_full
+    if not self._new_vectors and not self._dead and (not convert or not self.row_paths or stored_as):
+      return
+    old_count = len(self.row_paths)
+    old_keep = np.array([i for i in range(old_count) if i not in self._dead], dtype=np.int64)
+    new_keep = [i for i in range(len(self._new_paths)) if old_count + i not in self._dead]
+    parts: List[Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]] = []
+    if old_keep.shape[0]:
+      if self.vectors.dtype.name == dtype and (self.full is not None or not keep_full):
+        parts.append(
+          (
+            self.vectors[old_keep],
+            self.scales[old_keep] if self.scales is not None else None,
+            np.asarray(self.full[old_keep], dtype=np.float32) if keep_full else None,
+          )
+        )
+      else:
+        # Storage settings changed: convert surviving rows, from full precision when we have it.
+        source = self.full[old_keep] if self.full is not None else self._dequantized(old_keep)
+        source = np.asarray(source, dtype=np.float32)
+        parts.append((*_quantize(source, dtype), source if keep_full else None))
+    if new_keep:
+      new = _normalize(np.stack([self._new_vectors[i] for i in new_keep]))
+      parts.append((*_quantize(new, dtype), new if keep_full else None))
+
+    if parts and self.centroids is not None and self.centroids.shape[1] == self.dim:
+      assign = [self.assign[old_keep]] if old_keep.shape[0] else []
+      if new_keep:
+        assign.append(_nearest(new, self.centroids))
+      self.assign = np.concatenate(assign).astype(np.int32)
+    else:
+      self.centroids = self.assign = None
+    self._lists = None
+
+    if parts:
+      self.vectors = np.ascontiguousarray(np.concatenate([part[0] for part in parts]))
+      self.scales = np.concatenate([part[1] for part in parts]) if dtype == "int8" else None
+      self.full = np.ascontiguousarray(np.concatenate([part[2] for part in parts])) if keep_full else None
+      spans = [np.asarray(self.spans, dtype=np.int32)[old_keep]] if old_keep.shape[0] else []
+      if new_keep:
+        spans.append(np.asarray(self._new_spans, dtype=np.int32).reshape(-1, 2)[new_keep])
+      self.spans = np.ascontiguousarray(np.concatenate(spans))
+    else:
+      self.vectors = np.zeros((0, 0), dtype=np.float32)
+      self.scales = self.full = None
+      self.spans = np.zeros((0, 2), dtype=np.int32)
+    self.row_paths = [self.row_paths[i] for i in old_keep] + [self._new_paths[i] for i in new_keep]
+    self._new_vectors, self._new_paths, self._new_spans, self._dead = [], [], [], set()
+    self._rows_of = {}
+    for row, path in enumerate(self.row_paths):
+      self._rows_of.setdefault(path, []).append(row)
+
+  def _dequantized(self, rows: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+    return vectors * self.scales[rows][:, None] if self.scales is not None else vectors
+
+
+def _quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+  """(stored rows, per-row scales) for normalized float32 rows; scales only for int8."""
+  if dtype == "float32":
+    return matrix.astype(np.float32), None
+  if dtype == "float16":
+    return matrix.astype(np.float16), None
+  scales = np.abs(matrix).max(axis=1) / 127.0
+  scales[scales == 0] = 1.0
+  return np.rint(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def _nearest(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+  """Index of the most similar centroid for each normalized row."""
+  return np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+  """Indices of the k highest scores, best first."""
+  k = min(k, scores.shape[0])
+  if k <= 0:
+    return np.zeros(0, dtype=np.int64)
+  top = np.argpartition(-scores, k - 1)[:k]
+  return top[np.argsort(-scores[top])]
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+  norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+  norms[norms == 0] = 1.0
+  return (matrix / norms).astype(np.float32)
+
+
+def has_local_index(project_id: str) -> bool:
+  return (settings.storage_dir / project_id / INDEX_DIR / _META_FILE).exists()
@@ -0,0 +1,59 @@
+"""
+Recall@k and QPS of the local index's IVF-flat search at several nprobe values, against the
+exact scan over the same index, plus the time build_ann() takes to train and assign.
+
+  python -m benchmarks.bench_ann_index --vectors 200000 --dim 384 --nprobe 4 8 16 32 64
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.config import settings
+
+from .bench_vector_quantization import build, synthetic_corpus
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--vectors", type=int, default=50000)
+  parser.add_argument("--dim", type=int, default=256)
+  parser.add_argument("--clusters", type=int, default=500)
+  parser.add_argument("--queries", type=int, default=200)
+  parser.add_argument("--k", type=int, default=10)
+  parser.add_argument("--nlist", type=int, default=0, help="0 = about sqrt(vectors)")
+  parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+  parser.add_argument("--dtype", default="float32")
+  args = parser.parse_args()
+
+  vectors = synthetic_corpus(args.vectors, args.dim, args.clusters)
+  queries = synthetic_corpus(args.queries, args.dim, args.clusters, seed=1)
+  with tempfile.TemporaryDirectory() as tmp:
+    settings.storage_dir = Path(tmp)
+    settings.local_vector_dtype = args.dtype
+    index = build("ann", vectors)
+    started = time.perf_counter()
+    index.build_ann(args.nlist or None)
+    built = time.perf_counter() - started
+    nlist = index.centroids.shape[0]
+    print(f"vectors={args.vectors} dim={args.dim} dtype={args.dtype} nlist={nlist} build={built:.2f}s")
+
+    started = time.perf_counter()
+    truth = [{row for row, _ in index.search(q, args.k, nprobe=0)} for q in queries]
+    exact_qps = len(queries) / (time.perf_counter() - started)
+    print(f"exact          recall@{args.k}=1.0000 qps={exact_qps:9.1f}")
+    for nprobe in args.nprobe:
+      started = time.perf_counter()
+      results = [{row for row, _ in index.search(q, args.k, nprobe=nprobe)} for q in queries]
+      qps = len(queries) / (time.perf_counter() - started)
+      recall = np.mean([len(r & t) / args.k for r, t in zip(results, truth)])
+      print(
+        f"nprobe={nprobe:<7} recall@{args.k}={recall:.4f} qps={qps:9.1f} speedup={qps / exact_qps:5.1f}x "
+        f"scanned~{min(1.0, nprobe / nlist):.1%}"
+      )
+
+
+if __name__ == "__main__":
+  main()
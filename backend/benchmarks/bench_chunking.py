@@ -0,0 +1,44 @@
+"""
+Files/s and chunks/s of the parse-and-chunk stage, serial vs. the process pool.
+
+  python -m benchmarks.bench_chunking --files 2000 --workers 1 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.chunk_pipeline import iter_chunk_batches
+
+from .synthetic_repo import build_synthetic_repo
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--files", type=int, default=1500)
+  parser.add_argument("--workers", type=int, nargs="+", default=[1, max(1, (os.cpu_count() or 1) - 1)])
+  parser.add_argument("--files-per-task", type=int, default=16)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmp:
+    root = Path(tmp)
+    files = build_synthetic_repo(root, args.files)
+    print(f"files={len(files)} cpus={os.cpu_count()}")
+    for workers in args.workers:
+      # Warm the pool (process spawn + grammar loading) outside the timed region.
+      list(iter_chunk_batches(root, files[: args.files_per_task * workers * 2], workers, args.files_per_task))
+      started = time.perf_counter()
+      file_count = chunk_count = 0
+      for batch in iter_chunk_batches(root, files, workers=workers, files_per_task=args.files_per_task):
+        file_count += len(batch)
+        chunk_count += sum(len(item.chunks) for item in batch)
+      elapsed = time.perf_counter() - started
+      print(
+        f"workers={workers:<3} elapsed={elapsed:6.2f}s files/s={file_count / elapsed:9.1f} "
+        f"chunks/s={chunk_count / elapsed:10.1f} chunks={chunk_count}"
+      )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,70 @@
+"""
+Compare per-chunk vs batched, concurrent embedding in EmbeddingStore.upsert_chunks.
+
+Runs against a local stub provider (fixed per-request latency) and an in-memory Qdrant,
+and reports chunks per second for each configuration.
+
+  python -m benchmarks.bench_embed_batch --chunks 2000 --latency-ms 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from .stub_provider import start_stub_provider
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--chunks", type=int, default=2000)
+  parser.add_argument("--latency-ms", type=float, default=20.0)
+  parser.add_argument("--dim", type=int, default=256)
+  args = parser.parse_args()
+
+  server, base_url = start_stub_provider(latency_s=args.latency_ms / 1000.0, dim=args.dim)
+  # Provider config is read at import time, so point it at the stub before importing the app.
+  os.environ.update(
+    {
+      "EMBEDDING_PROVIDER": "openai",
+      "OPENAI_API_KEY": "stub",
+      "OPENAI_EMBED_MODEL": "stub-embed",
+      "OPENAI_BASE_URL": base_url,
+    }
+  )
+  from qdrant_client import QdrantClient
+
+  from app.config import settings
+  from app.embedding_store import ChunkInput, EmbeddingStore
+
+  chunks = [
+    ChunkInput(
+      id=f"00000000-0000-0000-0000-{i:012d}",
+      project_id="bench",
+      path=f"src/module_{i // 20}.py",
+      text=f"def handler_{i}(request):\n    return process(request, {i})\n",
+      start_line=1,
+      end_line=2,
+    )
+    for i in range(args.chunks)
+  ]
+
+  configs = [(1, 1), (16, 1), (64, 1), (64, 4), (128, 8)]
+  print(f"chunks={args.chunks} latency_ms={args.latency_ms} dim={args.dim}")
+  for batch_size, inflight in configs:
+    settings.embed_batch_size = batch_size
+    settings.embed_max_inflight = inflight
+    store = EmbeddingStore(client=QdrantClient(location=":memory:"))
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+      store.upsert_chunks("bench", chunks)
+    elapsed = time.perf_counter() - started
+    print(
+      f"batch_size={batch_size:<4} inflight={inflight:<2} "
+      f"elapsed={elapsed:7.2f}s chunks/s={args.chunks / elapsed:9.1f}"
+    )
+  server.shutdown()
+
+
+if __name__ == "__main__":
+  main()
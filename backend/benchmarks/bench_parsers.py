@@ -0,0 +1,60 @@
+"""
+Cold vs. warm tree-sitter parse cost per language.
+
+cold: a fresh Parser plus grammar load for every parse (what the chunkers used to do)
+warm: the cached per-thread parser from app.parser_pool
+
+  python -m benchmarks.bench_parsers --iterations 300
+"""
+import argparse
+import time
+
+from tree_sitter import Parser
+from tree_sitter_languages import get_language
+
+from app import parser_pool
+
+SAMPLES = {
+  "python": "def handler(request):\n    return request.json()\n\nclass Service:\n    def run(self):\n        pass\n",
+  "javascript": "function handler(req) {\n  return req.body;\n}\nclass Service { run() { return 1; } }\n",
+  "typescript": "export function handler(req: Request): Body {\n  return req.body;\n}\n",
+  "tsx": "export const App = () => <div className=\"app\">{items.map((i) => <Item key={i} />)}</div>;\n",
+  "go": "package main\n\nfunc Handler(values []int) int {\n\treturn len(values)\n}\n",
+  "java": "public class Service {\n  public int run(int x) {\n    return x * 2;\n  }\n}\n",
+}
+
+
+def _cold(language: str, source: bytes) -> None:
+  parser = Parser()
+  parser.set_language(get_language(language))
+  parser.parse(source)
+
+
+def _warm(language: str, source: bytes) -> None:
+  parser_pool.get_parser(language).parse(source)
+
+
+def _time_per_call(fn, language: str, source: bytes, iterations: int) -> float:
+  started = time.perf_counter()
+  for _ in range(iterations):
+    fn(language, source)
+  return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--iterations", type=int, default=300)
+  args = parser.parse_args()
+
+  parser_pool.clear()
+  print(f"{'language':<12}{'cold us/parse':>15}{'warm us/parse':>15}{'speedup':>10}")
+  for language, text in SAMPLES.items():
+    source = text.encode("utf-8")
+    cold = _time_per_call(_cold, language, source, args.iterations)
+    _warm(language, source)  # first use loads the grammar and creates the thread's parser
+    warm = _time_per_call(_warm, language, source, args.iterations)
+    print(f"{language:<12}{cold:>15.1f}{warm:>15.1f}{cold / warm:>9.1f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,73 @@
+"""
+Recall@k, query time and on-disk size of the local vector index for each storage dtype,
+with and without the full-precision re-rank, on a synthetic clustered corpus.
+
+  python -m benchmarks.bench_vector_quantization --vectors 50000 --dim 768 --rerank 0 4
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.config import settings
+from app.vector_index import INDEX_DIR, VECTOR_DTYPES, LocalVectorIndex
+
+
+def synthetic_corpus(count: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+  """Vectors scattered around random centroids, so neighbors are close and quantization error matters."""
+  rng = np.random.default_rng(seed)
+  centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+  members = centroids[rng.integers(0, clusters, count)]
+  return members + 0.35 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def build(project_id: str, vectors: np.ndarray, per_file: int = 50) -> LocalVectorIndex:
+  index = LocalVectorIndex.load(project_id)
+  for start in range(0, len(vectors), per_file):
+    block = vectors[start : start + per_file]
+    index.upsert_chunks(f"f{start // per_file}.py", block, [(i, i) for i in range(len(block))])
+  index.save()
+  return LocalVectorIndex.load(project_id)
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--vectors", type=int, default=20000)
+  parser.add_argument("--dim", type=int, default=384)
+  parser.add_argument("--clusters", type=int, default=200)
+  parser.add_argument("--queries", type=int, default=200)
+  parser.add_argument("--k", type=int, default=10)
+  parser.add_argument("--rerank", type=int, nargs="+", default=[0, 4])
+  args = parser.parse_args()
+
+  vectors = synthetic_corpus(args.vectors, args.dim, args.clusters)
+  queries = synthetic_corpus(args.queries, args.dim, args.clusters, seed=1)
+  with tempfile.TemporaryDirectory() as tmp:
+    settings.storage_dir = Path(tmp)
+    settings.local_vector_dtype = "float32"
+    truth_index = build("truth", vectors)
+    truth = [{row for row, _ in truth_index.search(q, args.k)} for q in queries]
+    print(f"vectors={args.vectors} dim={args.dim} k={args.k} float32 matrix={vectors.nbytes / 2**20:.1f}MiB")
+    for dtype in VECTOR_DTYPES:
+      for rerank in args.rerank if dtype != "float32" else [0]:
+        settings.local_vector_dtype = dtype
+        settings.local_vector_rerank = rerank
+        project_id = f"{dtype}-{rerank}"
+        index = build(project_id, vectors)
+        root = Path(tmp) / project_id / INDEX_DIR
+        scanned = sum(f.stat().st_size for f in root.glob("*.npy") if f.name != "full.npy")
+        on_disk = sum(f.stat().st_size for f in root.glob("*.npy"))
+        started = time.perf_counter()
+        results = [{row for row, _ in index.search(q, args.k)} for q in queries]
+        elapsed = time.perf_counter() - started
+        recall = np.mean([len(r & t) / args.k for r, t in zip(results, truth)])
+        print(
+          f"dtype={dtype:<8} rerank={rerank:<2} recall@{args.k}={recall:.4f} qps={len(queries) / elapsed:8.1f} "
+          f"scanned={scanned / 2**20:7.1f}MiB on_disk={on_disk / 2**20:7.1f}MiB"
+        )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,63 @@
+"""Local OpenAI-compatible stub server used by benchmarks and tests."""
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+import numpy as np
+
+
+def _stub_vector(text: str, dim: int) -> np.ndarray:
+  seed = abs(hash(text)) % (2**32)
+  vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+  return vec / (np.linalg.norm(vec) or 1.0)
+
+
+def start_stub_provider(latency_s: float = 0.02, dim: int = 256) -> Tuple[ThreadingHTTPServer, str]:
+  """
+  Serve POST /v1/embeddings on an ephemeral port with a fixed per-request latency.
+  Returns the server and its base URL; call server.shutdown() when done.
+  """
+
+  class Handler(BaseHTTPRequestHandler):
+    requests_served = 0
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+      length = int(self.headers.get("Content-Length", "0"))
+      body = json.loads(self.rfile.read(length) or b"{}")
+      inputs: List[str] = body.get("input") or []
+      if isinstance(inputs, str):
+        inputs = [inputs]
+      time.sleep(latency_s)
+      data = []
+      for idx, text in enumerate(inputs):
+        vec = _stub_vector(text, dim)
+        if body.get("encoding_format") == "base64":
+          embedding = base64.b64encode(vec.tobytes()).decode("ascii")
+        else:
+          embedding = vec.tolist()
+        data.append({"object": "embedding", "index": idx, "embedding": embedding})
+      payload = json.dumps(
+        {
+          "object": "list",
+          "data": data,
+          "model": body.get("model", "stub"),
+          "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+      ).encode("utf-8")
+      Handler.requests_served += 1
+      self.send_response(200)
+      self.send_header("Content-Type", "application/json")
+      self.send_header("Content-Length", str(len(payload)))
+      self.end_headers()
+      self.wfile.write(payload)
+
+    def log_message(self, *args):  # silence per-request logging
+      pass
+
+  server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
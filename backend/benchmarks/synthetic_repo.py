@@ -0,0 +1,75 @@
+"""Generate a synthetic multi-language repository for chunking benchmarks."""
+import random
+from pathlib import Path
+from typing import List
+
+_PY = '''import os
+from typing import List
+
+
+class Service{n}:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def handle(self, items: List[int]) -> int:
+        total = 0
+        for item in items:
+            total += item * {n}
+        return total
+
+
+def helper_{n}(path: str) -> bool:
+    return os.path.exists(path)
+'''
+
+_TS = '''import {{ helper{m} }} from "./module_{m}";
+
+export class Widget{n} {{
+  constructor(private readonly name: string) {{}}
+
+  render(items: number[]): number {{
+    return items.reduce((acc, item) => acc + item * {n}, 0);
+  }}
+}}
+
+export function build{n}(name: string): Widget{n} {{
+  return new Widget{n}(name + helper{m}());
+}}
+'''
+
+_GO = '''package main
+
+import "fmt"
+
+func Handler{n}(values []int) int {{
+\ttotal := 0
+\tfor _, v := range values {{
+\t\ttotal += v * {n}
+\t}}
+\treturn total
+}}
+
+func Print{n}() {{
+\tfmt.Println("handler {n}")
+}}
+'''
+
+
+def build_synthetic_repo(root: Path, files: int, repeat: int = 4, seed: int = 0) -> List[str]:
+  """Write `files` source files (Python, TypeScript, Go) under root and return their relative paths."""
+  rng = random.Random(seed)
+  rel_paths: List[str] = []
+  for n in range(files):
+    kind = n % 3
+    package = root / f"pkg_{n % 25}"
+    package.mkdir(parents=True, exist_ok=True)
+    m = rng.randrange(max(1, files))
+    if kind == 0:
+      rel, body = f"pkg_{n % 25}/module_{n}.py", "\n".join(_PY.format(n=n * 10 + i) for i in range(repeat))
+    elif kind == 1:
+      rel, body = f"pkg_{n % 25}/module_{n}.ts", "\n".join(_TS.format(n=n * 10 + i, m=m) for i in range(repeat))
+    else:
+      rel, body = f"pkg_{n % 25}/module_{n}.go", "\n".join(_GO.format(n=n * 10 + i) for i in range(repeat))
+    (root / rel).write_text(body, encoding="utf-8")
+    rel_paths.append(rel)
+  return rel_paths
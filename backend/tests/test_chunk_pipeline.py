@@ -0,0 +1,18 @@
+from app.chunk_pipeline import chunk_files, iter_chunk_batches
+
+
+def test_pool_matches_serial_chunking(tmp_path):
+  files = []
+  for i in range(6):
+    (tmp_path / f"m{i}.py").write_text(f"def f{i}():\n  return {i}\n\n\nclass C{i}:\n  pass\n")
+    files.append(f"m{i}.py")
+  files.append("missing.py")
+
+  serial = {item.path: item.chunks for item in chunk_files(tmp_path, files)}
+  pooled = {}
+  for batch in iter_chunk_batches(tmp_path, files, workers=2, files_per_task=2):
+    pooled.update({item.path: item.chunks for item in batch})
+
+  assert sorted(pooled) == [f"m{i}.py" for i in range(6)]
+  assert pooled == serial
+  assert sorted(c.start_line for c in pooled["m0.py"]) == [1, 5]
@@ -0,0 +1,59 @@
+import pytest
+
+from app.code_graph import DependencyGraph, get_graph, invalidate_graph
+from app.config import settings
+from app.db import init_db, save_dependencies, save_project
+
+
+@pytest.fixture()
+def storage(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  init_db()
+  return tmp_path
+
+
+def _graph():
+  # app -> service -> util, service <-> repo form a cycle, cli -> app, lonely has no edges.
+  edges = [
+    ("app.py", "service.py"),
+    ("service.py", "util.py"),
+    ("service.py", "repo.py"),
+    ("repo.py", "service.py"),
+    ("cli.py", "app.py"),
+  ]
+  return DependencyGraph(["app.py", "cli.py", "lonely.py", "repo.py", "service.py", "util.py"], edges)
+
+
+def test_adjacency_and_k_hop_distances():
+  graph = _graph()
+  assert graph.dependencies("service.py") == ["repo.py", "util.py"]
+  assert graph.dependents("service.py") == ["app.py", "repo.py"]
+  assert graph.k_hop(["app.py"], 1, direction="out") == {"app.py": 0, "service.py": 1}
+  assert graph.k_hop(["util.py"], 2, direction="in") == {"util.py": 0, "service.py": 1, "app.py": 2, "repo.py": 2}
+  both = graph.k_hop(["app.py"], 2)
+  assert both == {"app.py": 0, "service.py": 1, "cli.py": 1, "util.py": 2, "repo.py": 2}
+  assert "lonely.py" not in graph.k_hop(["app.py"], 10)
+
+
+def test_cycles_and_centrality():
+  graph = _graph()
+  assert graph.strongly_connected_components(min_size=2) == [["repo.py", "service.py"]]
+  assert len(graph.strongly_connected_components()) == 5
+  ranks = graph.pagerank()
+  assert sum(ranks.values()) == pytest.approx(1.0)
+  assert graph.central_files(2)[0] == "service.py"
+  assert ranks["lonely.py"] < ranks["util.py"]
+
+
+def test_cached_graph_is_invalidated_after_dependency_save(storage):
+  save_project("p", "repo", "2024-01-01T00:00:00", ["a.py", "b.py"])
+  save_dependencies("p", [("a.py", "b.py")])
+  invalidate_graph("p")
+  graph = get_graph("p")
+  assert get_graph("p") is graph
+  assert graph.dependents("b.py") == ["a.py"]
+
+  save_dependencies("p", [("b.py", "a.py")])
+  invalidate_graph("p")
+  assert get_graph("p").dependents("b.py") == []
@@ -0,0 +1,57 @@
+from app.context_packer import PromptStats, count_tokens, pack_context
+
+
+def _chunk(path, line, lines, score=1.0):
+  return {"path": path, "line": line, "end_line": line + len(lines) - 1, "snippet": "\n".join(lines), "score": score}
+
+
+def test_overlapping_and_adjacent_ranges_merge_and_duplicates_pack_once():
+  body = [f"x{n} = {n}" for n in range(1, 21)]
+  chunks = [
+    _chunk("a.py", 1, body[0:8]),
+    _chunk("a.py", 5, body[4:12]),   # overlaps lines 5-8
+    _chunk("a.py", 13, body[12:15]),  # adjacent to line 12
+    _chunk("b.py", 1, body[0:8]),    # same text as the first chunk, other file
+    _chunk("a.py", 18, body[17:20]),
+  ]
+  packed = pack_context(chunks, budget=10_000)
+  assert packed.chunks_packed == 4
+  assert packed.text.splitlines()[:2] == ["File: a.py", "@@ lines 1-15"]
+  assert "@@ lines 18-20" in packed.text
+  assert "   15 | x15 = 15" in packed.text
+  assert "b.py" not in packed.text
+  assert packed.text.count("x5 = 5\n") == 1
+
+
+def test_budget_is_respected_and_filled_greedily():
+  big = _chunk("big.py", 1, [f"value_{n} = compute(value_{n - 1})" for n in range(1, 200)])
+  small = _chunk("small.py", 10, ["return total"])
+  packed = pack_context([big, small], budget=300)
+  assert packed.tokens <= 300
+  # The oversized chunk is cut to its leading lines, which fill the budget.
+  assert "    1 | value_1 = compute(value_0)" in packed.text
+  assert (packed.chunks_packed, packed.chunks_dropped) == (1, 1)
+
+  # With too little room left to be worth cutting, it is skipped and a later, smaller chunk fits.
+  medium = _chunk("medium.py", 1, [f"item_{n} = {n}" for n in range(1, 30)])
+  budget = pack_context([medium], budget=10_000).tokens + 8 + 30
+  packed = pack_context([medium, big, small], budget=budget)
+  assert "big.py" not in packed.text
+  assert "   10 | return total" in packed.text
+  assert packed.tokens <= budget
+
+
+def test_prompt_stats_accumulate_per_kind():
+  stats = PromptStats()
+  packed = pack_context([_chunk("a.py", 1, ["def f():", "  return 1"])], budget=1000)
+  tokens = stats.record("file_review", "Context:\n" + packed.text, packed, 1000, "sent")
+  stats.record("file_review", "Context:\n" + packed.text, packed, 1000, "sent")
+  assert tokens == count_tokens("Context:\n" + packed.text)
+  # Prompts never sent to the provider are counted, but not as sent tokens.
+  assert stats.record("file_review", "Context:\n" + packed.text, packed, 1000, "cached") == 0
+  assert stats.record("file_review", "Context:\n" + packed.text, packed, 1000, "skipped") == 0
+  [entry] = stats.stats()
+  assert entry["kind"] == "file_review" and entry["requests"] == 4
+  assert (entry["sent"], entry["cached"], entry["skipped"]) == (2, 1, 1)
+  assert entry["prompt_tokens"] == 2 * tokens and entry["avg_prompt_tokens"] == tokens
+  assert entry["cached_prompt_tokens"] == tokens
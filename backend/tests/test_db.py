@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import _MIGRATIONS, init_db, list_projects, save_project
+from app.main import app
+
+
+@pytest.fixture()
+def storage(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return tmp_path
+
+
+def test_migrations_are_recorded_and_idempotent(storage):
+  init_db()
+  conn = sqlite3.connect(settings.database_path)
+  version = conn.execute("PRAGMA user_version").fetchone()[0]
+  indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+  mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+  conn.close()
+  assert version == len(_MIGRATIONS)
+  assert {"idx_files_project_path", "idx_dependencies_src", "idx_jobs_status_created"} <= indexes
+  assert mode == "wal"
+
+
+def test_list_projects_paginates_with_file_counts(storage):
+  for i in range(5):
+    save_project(f"p{i}", f"repo{i}", f"2024-01-0{i + 1}T00:00:00", [f"f{j}.py" for j in range(i)])
+
+  page = list_projects(limit=2, offset=1)
+  assert [p["id"] for p in page] == ["p3", "p2"]
+  assert [p["file_count"] for p in page] == [3, 2]
+  assert "files" not in page[0]
+  assert list_projects(limit=1, include_files=True)[0]["files"] == ["f0.py", "f1.py", "f2.py", "f3.py"]
+
+  resp = TestClient(app).get("/listProjects", params={"limit": 2})
+  body = resp.json()
+  assert body["total"] == 5 and body["limit"] == 2 and body["offset"] == 0
+  assert [p["file_count"] for p in body["projects"]] == [4, 3]
+  assert body["projects"][0]["files"] is None
@@ -0,0 +1,90 @@
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import init_db, load_dependencies
+from app.dependency_graph import build_dependency_edges, resolve_import_edges
+from app.import_extractor import extract_import_specs
+from app.main import app
+from app.parser_pool import get_parser
+
+
+@pytest.fixture()
+def storage(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return tmp_path
+
+
+FILES = [
+  "web/src/app/page.tsx",
+  "web/src/lib/store.ts",
+  "web/src/lib/api/index.ts",
+  "web/src/util.js",
+  "backend/app/__init__.py",
+  "backend/app/db.py",
+  "backend/app/main.py",
+  "backend/app/models.py",
+  "svc/internal/store/store.go",
+  "svc/internal/store/store_test.go",
+  "svc/cmd/main.go",
+  "java/src/com/acme/Service.java",
+  "java/src/com/acme/model/User.java",
+  "java/src/com/acme/model/Role.java",
+]
+
+
+def test_resolves_relative_alias_and_index_imports():
+  specs = {
+    "web/src/app/page.tsx": ["../lib/store", "@/lib/api", "../util.js", "react", "./missing"],
+    "backend/app/main.py": [".db", ".", "app.models", "os"],
+    "svc/cmd/main.go": ["example.com/svc/internal/store", "fmt"],
+    "java/src/com/acme/Service.java": ["com.acme.model.*", "com.acme.model.User.ADMIN"],
+  }
+  edges = set(resolve_import_edges(FILES, specs))
+  assert edges == {
+    ("web/src/app/page.tsx", "web/src/lib/store.ts"),
+    ("web/src/app/page.tsx", "web/src/lib/api/index.ts"),
+    ("web/src/app/page.tsx", "web/src/util.js"),
+    ("backend/app/main.py", "backend/app/db.py"),
+    ("backend/app/main.py", "backend/app/__init__.py"),
+    ("backend/app/main.py", "backend/app/models.py"),
+    ("svc/cmd/main.go", "svc/internal/store/store.go"),
+    ("java/src/com/acme/Service.java", "java/src/com/acme/model/User.java"),
+    ("java/src/com/acme/Service.java", "java/src/com/acme/model/Role.java"),
+  }
+
+
+def test_tree_limits_specs_to_import_statements():
+  source = 'import os\n\ndef load():\n  from .db import get\n  return "import fake"\n\nDOC = """\nimport not_real\n"""\n'
+  tree = get_parser("python").parse(source.encode("utf-8"))
+  assert extract_import_specs("m.py", source, tree=tree) == [".db", ".db.get", "os"]
+  assert "not_real" in extract_import_specs("m.py", source)
+
+  go = 'package main\n\nimport (\n  "fmt"\n  store "example.com/svc/store"\n)\n\nvar s = "x"\n'
+  assert extract_import_specs("main.go", go) == ["fmt", "example.com/svc/store"]
+
+
+def test_build_scans_only_sources_missing_specs(tmp_path):
+  (tmp_path / "a.py").write_text("import b\n")
+  (tmp_path / "b.py").write_text("import a\n")
+  edges = build_dependency_edges(tmp_path, ["a.py", "b.py", "c.py"], specs={"b.py": ["c"]})
+  assert edges == [("a.py", "b.py"), ("b.py", "c.py")]
+
+
+def test_upload_builds_edges_from_extracted_bytes(storage):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    zf.writestr("src/index.ts", 'import { x } from "./lib";\nconst y = require("./util");\n')
+    zf.writestr("src/lib/index.ts", "export const x = 1;\n")
+    zf.writestr("src/util.ts", "export {};\n")
+  project_id = TestClient(app).post("/uploadRepo", files={"file": ("repo.zip", buf.getvalue())}).json()["project_id"]
+  assert sorted(load_dependencies(project_id)) == [
+    ("src/index.ts", "src/lib/index.ts"),
+    ("src/index.ts", "src/util.ts"),
+  ]
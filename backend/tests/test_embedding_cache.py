@@ -0,0 +1,45 @@
+from app.config import settings
+from app.embedding_cache import EmbeddingCache, get_embedding_cache
+
+
+def test_cache_hits_and_misses(tmp_path):
+  cache = EmbeddingCache(tmp_path / "cache.db", max_entries=100)
+  assert cache.get_many("openai", "m", 0, ["a", "b"]) == [None, None]
+  cache.put_many("openai", "m", 0, ["a"], [[1.0, 0.5]])
+  assert cache.get_many("openai", "m", 0, ["a", "b"]) == [[1.0, 0.5], None]
+  # Different model or dimension must not collide.
+  assert cache.get_many("openai", "other", 0, ["a"]) == [None]
+  assert cache.get_many("openai", "m", 64, ["a"]) == [None]
+  stats = cache.stats()
+  assert stats["hits"] == 1
+  assert stats["misses"] == 5
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+  cache = EmbeddingCache(tmp_path / "cache.db", max_entries=10)
+  for i in range(10):
+    cache.put_many("local", "stub", 4, [f"t{i}"], [[float(i)] * 4])
+  # Touch t0 so it becomes most recently used, then overflow the cache.
+  cache.get_many("local", "stub", 4, ["t0"])
+  cache.put_many("local", "stub", 4, ["t10"], [[10.0] * 4])
+  stats = cache.stats()
+  assert stats["entries"] <= 10
+  assert stats["evictions"] >= 1
+  assert cache.get_many("local", "stub", 4, ["t0"]) == [[0.0] * 4]
+  assert cache.get_many("local", "stub", 4, ["t1"]) == [None]
+
+
+def test_cache_persists_across_instances(tmp_path):
+  path = tmp_path / "cache.db"
+  EmbeddingCache(path, max_entries=10).put_many("gemini", "e", 0, ["x"], [[0.25]])
+  assert EmbeddingCache(path, max_entries=10).get_many("gemini", "e", 0, ["x"]) == [[0.25]]
+
+
+def test_process_cache_follows_storage_dir(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "embed_cache_max_entries", 10)
+  monkeypatch.setattr(settings, "storage_dir", tmp_path / "one")
+  (tmp_path / "one").mkdir()
+  first = get_embedding_cache()
+  monkeypatch.setattr(settings, "storage_dir", tmp_path / "two")
+  (tmp_path / "two").mkdir()
+  assert get_embedding_cache().path == tmp_path / "two" / "embedding_cache.db" != first.path
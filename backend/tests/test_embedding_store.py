@@ -0,0 +1,68 @@
+import pytest
+from qdrant_client import QdrantClient
+
+from app import embedding_store
+from app.config import settings
+from app.clients import CollectionSizeMismatch, ensure_collection
+from app.embedding_store import ChunkInput, EmbeddingStore
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  # Local vectors only, whatever provider the environment configures.
+  monkeypatch.setattr(embedding_store, "have_embedding_provider", lambda: False)
+  store = EmbeddingStore(client=QdrantClient(":memory:"))
+  chunks = [
+    ChunkInput(
+      id=f"00000000-0000-0000-0000-{i:012d}",
+      project_id="p",
+      path=f"f{i % 3}.py",
+      text=f"def fn_{i}(): return '{'x' * i}'",
+      start_line=i,
+      end_line=i,
+    )
+    for i in range(12)
+  ]
+  store.upsert_chunks("p", chunks)
+  return store
+
+
+def test_grouped_and_parallel_path_search_agree(store, monkeypatch):
+  vector = store.embed("def fn_4(): pass")
+  grouped = store.search_paths("p", vector, ["f0.py", "f1.py"], per_path=2)
+  assert sorted(hit.path for hit in grouped) == ["f0.py", "f0.py", "f1.py", "f1.py"]
+
+  monkeypatch.setattr(settings, "qdrant_path_search", "parallel")
+  parallel = store.search_paths("p", vector, ["f0.py", "f1.py"], per_path=2)
+  assert sorted(hit.id for hit in parallel) == sorted(hit.id for hit in grouped)
+
+
+def test_collection_existence_is_checked_once(store, monkeypatch):
+  calls = []
+  original = store.client.collection_exists
+  monkeypatch.setattr(store.client, "collection_exists", lambda name: calls.append(name) or original(name))
+  vector = store.embed("query")
+  for _ in range(3):
+    store.search("p", "", limit=1, query_vector=vector)
+  assert calls == []  # already known from the upsert
+
+
+def test_new_collections_use_configured_quantization(monkeypatch):
+  monkeypatch.setattr(settings, "qdrant_quantization", "scalar")
+  client = QdrantClient(":memory:")
+  created = []
+  monkeypatch.setattr(client, "create_collection", lambda **kwargs: created.append(kwargs))
+  ensure_collection(client, "quantized", 8)
+  assert created[0]["quantization_config"].scalar.type == "int8"
+
+
+
+def test_other_vector_sizes_never_drop_the_collection(store):
+  collection = store._collection("p")
+  before = store.client.count(collection).count
+  with pytest.raises(CollectionSizeMismatch):
+    store.search("p", "", limit=1, query_vector=[0.1] * (settings.vector_size * 2))
+  assert store.client.count(collection).count == before
+  ensure_collection(store.client, collection, settings.vector_size * 2, recreate=True)
+  assert store.client.count(collection).count == 0
@@ -0,0 +1,27 @@
+import numpy as np
+
+from app.config import settings
+from app.embeddings import embed_text, embed_texts
+
+
+def test_batches_match_single_texts_and_are_normalized():
+  texts = ["def load_config(path):\n  return json.load(open(path))", "", "   \n\t", "x", "ünïcode_name = 1"]
+  batch = embed_texts(texts, dim=128)
+  assert batch.shape == (5, 128) and batch.dtype == np.float32
+  np.testing.assert_allclose(batch, [embed_text(text, dim=128) for text in texts], atol=1e-7)
+  np.testing.assert_allclose(np.linalg.norm(batch[[0, 4]], axis=1), 1.0, rtol=1e-6)
+  assert not batch[1].any()
+  assert len(embed_text("anything")) == settings.vector_size
+
+
+def test_identifier_styles_land_close_together():
+  query, same, other = embed_texts(
+    [
+      "getUserById",
+      "def get_user_by_id(user_id):\n  return db.users.find(user_id)",
+      "def render_chart(series):\n  return plot.draw(series)",
+    ],
+    dim=256,
+  )
+  assert query @ same > 0.3
+  assert query @ same > query @ other + 0.2
@@ -16,4 +16,4 @@ def test_list_projects_empty_ok():
   """listProjects should respond even when no projects exist."""
   resp = client.get("/listProjects")
   assert resp.status_code == 200
-  assert isinstance(resp.json(), list)
+  assert isinstance(resp.json()["projects"], list)
@@ -0,0 +1,109 @@
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import init_db, neighbors
+from app.embeddings import LOCAL_MODEL
+from app.indexing import EmbedCancelled, embed_project
+from app.main import app
+from app.rag_pipeline import retrieve_top_k
+from app.vector_index import LocalVectorIndex
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return TestClient(app)
+
+
+def _zip(files):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    for name, content in files.items():
+      zf.writestr(name, content)
+  return buf.getvalue()
+
+
+def test_update_upload_reindexes_only_changed_files(client):
+  first = _zip({"a.py": "def a():\n  return 1\n", "b.py": "import a\n", "c.py": "x = 1\n"})
+  resp = client.post("/uploadRepo", files={"file": ("repo.zip", first)})
+  project_id = resp.json()["project_id"]
+  assert client.post(f"/embedRepo?project_id={project_id}").status_code == 200
+  assert neighbors(project_id, "b.py") == ["a.py"]
+
+  second = _zip({"a.py": "def a():\n  return 2\n", "c.py": "x = 1\n", "d.py": "import c\n"})
+  resp = client.post(f"/uploadRepo?project_id={project_id}", files={"file": ("repo.zip", second)})
+  body = resp.json()
+  assert resp.status_code == 200
+  assert body["project_id"] == project_id
+  assert body["added"] == ["d.py"]
+  assert body["changed"] == ["a.py"]
+  assert body["removed"] == ["b.py"]
+  assert sorted(body["reembedded"]) == ["a.py", "d.py"]
+  assert sorted(LocalVectorIndex.load(project_id).paths) == ["a.py", "c.py", "d.py"]
+  assert neighbors(project_id, "b.py") == []
+  assert neighbors(project_id, "d.py") == ["c.py"]
+  assert client.get(f"/getFile?project_id={project_id}&path=b.py").status_code == 404
+
+
+def test_update_unknown_project_404(client):
+  resp = client.post("/uploadRepo?project_id=missing", files={"file": ("repo.zip", _zip({"a.py": ""}))})
+  assert resp.status_code == 404
+
+
+def test_added_file_resolves_imports_of_unchanged_files(client):
+  first = _zip({"b.py": "import a\n", "c.py": "x = 1\n"})
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", first)}).json()["project_id"]
+  assert neighbors(project_id, "b.py") == []
+
+  second = _zip({"a.py": "def a():\n  return 1\n", "b.py": "import a\n", "c.py": "x = 1\n"})
+  body = client.post(f"/uploadRepo?project_id={project_id}", files={"file": ("repo.zip", second)}).json()
+  assert body["added"] == ["a.py"] and body["changed"] == []
+  assert neighbors(project_id, "b.py") == ["a.py"]
+
+  third = _zip({"b.py": "import a\n", "c.py": "x = 1\n"})
+  client.post(f"/uploadRepo?project_id={project_id}", files={"file": ("repo.zip", third)})
+  assert neighbors(project_id, "b.py") == []
+
+
+def test_reembed_after_vector_size_change(client, monkeypatch):
+  monkeypatch.setattr(settings, "vector_size", 64)
+  first = _zip({"a.py": "def load_config(path):\n  return open(path).read()\n", "b.py": "x = 1\n"})
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", first)}).json()["project_id"]
+  assert client.post(f"/embedRepo?project_id={project_id}").status_code == 200
+  assert LocalVectorIndex.load(project_id).dim == 64
+
+  monkeypatch.setattr(settings, "vector_size", 128)
+  assert LocalVectorIndex.load(project_id, LOCAL_MODEL, 128).stale
+  second = _zip({"a.py": "def load_config(path):\n  return open(path).read()\n", "b.py": "x = 2\n"})
+  resp = client.post(f"/uploadRepo?project_id={project_id}", files={"file": ("repo.zip", second)})
+  # The upload must not replace the stale index with one covering only b.py.
+  assert resp.status_code == 200 and resp.json()["reembedded"] == []
+  saved = LocalVectorIndex.load(project_id)
+  assert saved.dim == 64 and saved.paths == ["a.py", "b.py"]
+  assert LocalVectorIndex.load(project_id, LOCAL_MODEL, 128).stale
+  assert retrieve_top_k(project_id, "load_config", k=1, mode="vector") == []
+
+  assert client.post(f"/embedRepo?project_id={project_id}").status_code == 200
+  index = LocalVectorIndex.load(project_id, LOCAL_MODEL, 128)
+  assert index.dim == 128 and index.paths == ["a.py", "b.py"]
+  hits = retrieve_top_k(project_id, "load_config", k=1, mode="vector")
+  assert [hit["path"] for hit in hits] == ["a.py"]
+
+
+def test_cancelled_embed_keeps_the_saved_index(client, monkeypatch):
+  files = {f"{name}.py": f"def {name}():\n  return 1\n" for name in "abcd"}
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", _zip(files))}).json()["project_id"]
+  assert client.post(f"/embedRepo?project_id={project_id}").status_code == 200
+
+  monkeypatch.setattr(settings, "chunk_files_per_task", 1)
+  checks = iter([False, True])
+  with pytest.raises(EmbedCancelled):
+    embed_project(project_id, sorted(files), should_stop=lambda: next(checks, True))
+  assert LocalVectorIndex.load(project_id).paths == sorted(files)
@@ -0,0 +1,58 @@
+import io
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import claim_next_job, get_job, init_db, requeue_interrupted_jobs
+from app.main import app
+
+
+@pytest.fixture()
+def storage(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return tmp_path
+
+
+def _upload(client):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    zf.writestr("a.py", "def a():\n  return 1\n")
+    zf.writestr("b.py", "import a\n")
+  return client.post("/uploadRepo", files={"file": ("repo.zip", buf.getvalue())}).json()["project_id"]
+
+
+def test_embed_repo_job_runs_in_background(storage):
+  with TestClient(app) as client:
+    project_id = _upload(client)
+    job = client.post("/jobs", json={"kind": "embed_repo", "project_id": project_id}).json()
+    deadline = time.time() + 10
+    while job["status"] in ("queued", "running") and time.time() < deadline:
+      time.sleep(0.05)
+      job = client.get(f"/jobs/{job['id']}").json()
+  assert job["status"] == "succeeded"
+  assert job["progress_done"] == job["progress_total"] == 2
+  assert job["result"]["files_embedded"] == 2
+
+
+def test_cancel_queued_job_and_requeue_interrupted(storage):
+  client = TestClient(app)  # no lifespan, so no workers pick jobs up
+  project_id = _upload(client)
+  first = client.post("/jobs", json={"kind": "review_repo", "project_id": project_id}).json()
+  assert client.post(f"/jobs/{first['id']}/cancel").json()["status"] == "cancelled"
+
+  second = client.post("/jobs", json={"kind": "embed_repo", "project_id": project_id}).json()
+  assert claim_next_job("2030-01-01T00:00:00")["id"] == second["id"]
+  assert requeue_interrupted_jobs("2030-01-01T00:00:01") == 1
+  assert get_job(second["id"])["status"] == "queued"
+
+
+def test_unknown_job_kind_rejected(storage):
+  client = TestClient(app)
+  project_id = _upload(client)
+  assert client.post("/jobs", json={"kind": "nope", "project_id": project_id}).status_code == 400
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from app import ast_chunker, language_registry
+from app.repo_parser import parse_file
+
+
+def _count_parses(monkeypatch):
+  calls = []
+  real = language_registry.get_parser
+
+  def counting(language):
+    calls.append(language)
+    return real(language)
+
+  monkeypatch.setattr(language_registry, "get_parser", counting)
+  monkeypatch.setattr(ast_chunker, "get_parser", counting)
+  return calls
+
+
+def test_extensionless_file_is_parsed_once(monkeypatch):
+  calls = _count_parses(monkeypatch)
+  source = "package main\n\nimport \"fmt\"\n\nfunc Run() {\n\tx := 1\n\tfmt.Println(x)\n}\n"
+  chunks = parse_file(Path("tool"), source, "tool")
+  assert calls == ["go"]
+  assert [(c.language, c.start_line, c.end_line) for c in chunks] == [("go", 5, 8)]
+
+
+def test_prose_skips_parsing(monkeypatch):
+  calls = _count_parses(monkeypatch)
+  assert language_registry.detect_language(Path("NOTES"), "Meeting notes\n\nNothing to see.\n") is None
+  assert calls == []
+
+
+def test_candidates_ranked_by_cheap_signals():
+  ts = "interface A { x: string }\nexport type B = A;\nconst f = (a: number): boolean => a > 1;\n"
+  assert language_registry._rank_candidates(ts)[0] == "typescript"
+  py = "import os\n\ndef f(x):\n    if x:\n        return None\n"
+  assert language_registry._rank_candidates(py)[0] == "python"
@@ -0,0 +1,64 @@
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import init_db
+from app.lexical_index import LexicalIndex, lexical_terms
+from app.main import app
+from app.rag_pipeline import _fuse_rankings, retrieve_top_k
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  monkeypatch.setattr(settings, "definition_expansion", 0)
+  init_db()
+  return TestClient(app)
+
+
+def _zip(files):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    for name, body in files.items():
+      zf.writestr(name, body)
+  return buf.getvalue()
+
+
+def test_terms_split_identifiers():
+  assert lexical_terms("parseHTTPResponse(max_retries, 429)") == [
+    "parsehttpresponse", "parse", "http", "response", "maxretries", "max", "retries", "429",
+  ]
+
+
+def test_lexical_search_without_provider_and_incremental_updates(client):
+  files = {
+    "auth.py": "def check_token(token):\n  raise ValueError('TokenExpiredError: refresh required')\n",
+    "math_utils.py": "def add(a, b):\n  return a + b\n",
+  }
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", _zip(files))}).json()["project_id"]
+  assert client.post("/embedRepo", params={"project_id": project_id}).status_code == 200
+
+  hits = retrieve_top_k(project_id, "where is TokenExpiredError raised?", k=1, mode="lexical")
+  assert [(h["path"], h["line"], h["end_line"]) for h in hits] == [("auth.py", 1, 2)]
+  assert "TokenExpiredError" in hits[0]["snippet"]
+  assert retrieve_top_k(project_id, "token expired", k=2, mode="hybrid")[0]["path"] == "auth.py"
+
+  files["math_utils.py"] = "def add(a, b):\n  # TokenExpiredError is never raised here\n  return a + b\n"
+  del files["auth.py"]
+  client.post("/uploadRepo", params={"project_id": project_id}, files={"file": ("repo.zip", _zip(files))})
+  with LexicalIndex.open(project_id) as lexical:
+    assert [hit[0] for hit in lexical.search("TokenExpiredError", 5)] == ["math_utils.py"]
+    assert lexical.search("TokenExpiredError", 5, paths=["auth.py"]) == []
+
+
+def test_rrf_rewards_chunks_ranked_by_both_lists():
+  a = {"path": "a.py", "line": 1, "end_line": 5, "score": 0.9, "snippet": ""}
+  b = {"path": "b.py", "line": 1, "end_line": 5, "score": 0.8, "snippet": ""}
+  c = {"path": "c.py", "line": 1, "end_line": 5, "score": 12.0, "snippet": ""}
+  fused = _fuse_rankings([[a, b], [c, dict(b, score=7.0)]], k=2)
+  assert [r["path"] for r in fused] == ["b.py", "a.py"]
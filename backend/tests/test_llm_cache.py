@@ -0,0 +1,98 @@
+import io
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import llm_cache
+from app.config import settings
+from app.db import init_db
+from app.llm_cache import CACHED, SENT, SKIPPED, LLMResponseCache, generate_cached, generate_cached_outcome
+from app.main import app
+
+
+@pytest.fixture()
+def provider(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  calls = []
+  lock = threading.Lock()
+
+  def fake_generate(prompt, system=""):
+    with lock:
+      calls.append(prompt)
+    time.sleep(0.1)
+    return f"answer {len(calls)}"
+
+  monkeypatch.setattr(llm_cache, "have_llm_provider", lambda: True)
+  monkeypatch.setattr(llm_cache, "llm_model_id", lambda: ("fake", "model-1"))
+  monkeypatch.setattr(llm_cache, "generate_with_provider", fake_generate)
+  return calls
+
+
+def _upload(client, body, project_id=None):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    zf.writestr("a.py", body)
+  params = {"project_id": project_id} if project_id else {}
+  return client.post("/uploadRepo", params=params, files={"file": ("repo.zip", buf.getvalue())}).json()["project_id"]
+
+
+def test_repeats_hit_and_project_changes_miss(provider):
+  client = TestClient(app)
+  project_id = _upload(client, "x = 1\n")
+  assert generate_cached_outcome("review a.py", project_id=project_id) == ("answer 1", SENT)
+  assert generate_cached_outcome("review a.py", project_id=project_id) == ("answer 1", CACHED)
+  assert generate_cached("review a.py", system="be strict", project_id=project_id) == "answer 2"
+  assert len(provider) == 2
+
+  _upload(client, "x = 2\n", project_id)
+  assert generate_cached("review a.py", project_id=project_id) == "answer 3"
+  stats = client.get("/llmCacheStats").json()
+  assert stats["enabled"] and (stats["hits"], stats["misses"]) == (1, 3)
+
+
+def test_identical_concurrent_calls_share_one_request(provider):
+  with ThreadPoolExecutor(max_workers=5) as pool:
+    answers = list(pool.map(lambda _: generate_cached("same prompt"), range(5)))
+  assert answers == ["answer 1"] * 5
+  assert len(provider) == 1
+
+
+def test_entries_expire_and_evict_least_recently_used(tmp_path):
+  cache = LLMResponseCache(tmp_path / "llm.db", max_entries=10, ttl_seconds=60)
+  for i in range(10):
+    cache.put(f"k{i}", f"v{i}")
+  cache.get("k0")
+  cache.put("k10", "v10")
+  assert cache.get("k0") == "v0" and cache.get("k1") is None
+  assert cache.stats()["entries"] <= 10
+
+  short = LLMResponseCache(tmp_path / "short.db", max_entries=10, ttl_seconds=0.05)
+  short.put("k", "v")
+  assert short.get("k") == "v"
+  time.sleep(0.1)
+  assert short.get("k") is None and short.stats()["expired"] == 1
+
+
+def test_followers_of_a_failed_call_are_not_reported_as_cached(provider, monkeypatch):
+  def failing_generate(prompt, system=""):
+    provider.append(prompt)
+    time.sleep(0.1)
+    return None
+
+  monkeypatch.setattr(llm_cache, "generate_with_provider", failing_generate)
+  with ThreadPoolExecutor(max_workers=3) as pool:
+    outcomes = sorted(pool.map(lambda _: generate_cached_outcome("same prompt"), range(3)))
+  assert len(provider) == 1
+  assert outcomes == [(None, SENT), (None, SKIPPED), (None, SKIPPED)]
+
+
+def test_no_provider_is_reported_as_skipped(monkeypatch):
+  monkeypatch.setattr(llm_cache, "have_llm_provider", lambda: False)
+  assert generate_cached_outcome("anything") == (None, SKIPPED)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import llm_clients
+from app.config import settings
+from app.llm_clients import (
+  agenerate_with_provider,
+  embed_batch_with_provider,
+  generate_with_provider,
+  shutdown_llm_clients,
+)
+
+
+class FakeProvider(ThreadingHTTPServer):
+  """OpenAI-compatible endpoint on localhost that replays scripted statuses, then succeeds."""
+
+  daemon_threads = True
+
+  def __init__(self) -> None:
+    super().__init__(("127.0.0.1", 0), _Handler)
+    self.script = []
+    self.delay = 0.0
+    self.requests = 0
+    self.client_ports = set()
+    self.inflight = 0
+    self.max_inflight = 0
+    self.lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+
+  def log_message(self, *args):
+    pass
+
+  def do_POST(self):
+    server: FakeProvider = self.server
+    body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+    with server.lock:
+      server.requests += 1
+      server.client_ports.add(self.client_address[1])
+      server.inflight += 1
+      server.max_inflight = max(server.max_inflight, server.inflight)
+      status = server.script.pop(0) if server.script else 200
+    time.sleep(server.delay)
+    with server.lock:
+      server.inflight -= 1
+    if status != 200:
+      payload = {"error": {"message": f"scripted {status}", "type": "fake"}}
+    elif self.path.endswith("/embeddings"):
+      inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+      data = [{"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0]} for i, text in enumerate(inputs)]
+      payload = {"object": "list", "data": data[::-1], "model": body["model"], "usage": {"prompt_tokens": 1, "total_tokens": 1}}
+    else:
+      payload = {
+        "id": "fake",
+        "object": "chat.completion",
+        "created": 0,
+        "model": body["model"],
+        "choices": [
+          {"index": 0, "message": {"role": "assistant", "content": body["messages"][-1]["content"].upper()}, "finish_reason": "stop"}
+        ],
+      }
+    raw = json.dumps(payload).encode()
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(raw)))
+    if status == 429:
+      self.send_header("Retry-After", "0")
+    self.end_headers()
+    self.wfile.write(raw)
+
+
+@pytest.fixture()
+def provider(monkeypatch):
+  server = FakeProvider()
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+  monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+  monkeypatch.setattr(llm_clients, "_llm_provider", "openai")
+  monkeypatch.setattr(llm_clients, "_openai_llm_model", "fake-chat")
+  monkeypatch.setattr(llm_clients, "_embedding_provider", "openai")
+  monkeypatch.setattr(llm_clients, "_openai_embed_model", "fake-embed")
+  monkeypatch.setattr(settings, "llm_backoff_seconds", 0.01)
+  monkeypatch.setattr(settings, "llm_max_retries", 3)
+  monkeypatch.setattr(settings, "llm_timeout_seconds", 5.0)
+  monkeypatch.setattr(settings, "llm_max_concurrency", 2)
+  monkeypatch.setattr(settings, "llm_requests_per_minute", 0)
+  shutdown_llm_clients()
+  yield server
+  shutdown_llm_clients()
+  server.shutdown()
+  server.server_close()
+
+
+def test_retries_rate_limits_and_server_errors_on_one_connection(provider):
+  provider.script = [429, 503]
+  assert generate_with_provider("review this") == "REVIEW THIS"
+  assert generate_with_provider("and this") == "AND THIS"
+  assert provider.requests == 4
+  assert len(provider.client_ports) == 1  # keep-alive: every request reused the first connection
+
+  provider.script = [400]
+  assert generate_with_provider("bad request") is None
+  assert provider.requests == 5  # client errors are not retried
+
+  provider.script = [500] * 4
+  assert generate_with_provider("still failing") is None
+  assert provider.requests == 9  # first attempt + llm_max_retries
+
+
+def test_concurrency_is_capped_across_threads_and_event_loops(provider):
+  provider.delay = 0.1
+  with ThreadPoolExecutor(max_workers=6) as pool:
+    replies = list(pool.map(generate_with_provider, [f"q{i}" for i in range(6)]))
+  assert replies == [f"Q{i}" for i in range(6)]
+
+  async def from_another_loop():
+    return await asyncio.gather(*(agenerate_with_provider(f"a{i}") for i in range(4)))
+
+  assert asyncio.run(from_another_loop()) == [f"A{i}" for i in range(4)]
+  assert provider.max_inflight == 2
+
+
+def test_token_bucket_spaces_requests(provider, monkeypatch):
+  monkeypatch.setattr(settings, "llm_max_concurrency", 1)
+  monkeypatch.setattr(settings, "llm_requests_per_minute", 600)  # one every 0.1s after a burst of 1
+  shutdown_llm_clients()
+  started = time.monotonic()
+  for i in range(4):
+    generate_with_provider(f"q{i}")
+  assert time.monotonic() - started >= 0.29
+
+
+def test_batch_embeddings_keep_input_order(provider):
+  assert embed_batch_with_provider(["a", "abc", "ab"]) == [[1.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
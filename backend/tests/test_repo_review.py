@@ -0,0 +1,95 @@
+import io
+import json
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import rag_pipeline
+from app.config import settings
+from app.context_packer import pack_context
+from app.db import init_db
+from app.main import app
+from app.rag_pipeline import partition_files, run_repo_review
+from app.storage import read_file
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  monkeypatch.setattr(settings, "repo_context_token_budget", 400)
+  init_db()
+  return TestClient(app)
+
+
+def _project(client, count=12):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    for i in range(count):
+      folder = "api" if i % 2 else "core"
+      zf.writestr(f"{folder}/mod{i:02d}.py", f"def handler_{i}(request):\n" + "  value = request.get('x')\n" * 10)
+  return client.post("/uploadRepo", files={"file": ("repo.zip", buf.getvalue())}).json()["project_id"]
+
+
+def _fake_llm(prompt, system="", project_id=None):
+  files = sorted({line[len("File: "):] for line in prompt.splitlines() if line.startswith("File: ")})
+  response = json.dumps(
+    {
+      "findings": [
+        {"issue": "Unvalidated request input", "files": ["shared.py"], "lines": [len(files)], "severity": "medium"},
+        {"issue": f"Review of {files[0]}", "files": files[:1], "lines": "1-2", "severity": "info"},
+      ]
+    }
+  )
+  return response, "sent"
+
+
+def test_partitions_cover_every_file_within_budget(client):
+  project_id = _project(client)
+  partitions = partition_files(project_id, 400)
+  assert len(partitions) > 1
+  flat = [path for files in partitions for path in files]
+  assert flat == sorted(flat) and len(flat) == 12
+  assert all(path.startswith("api/") for path in partitions[0])
+  for files in partitions:
+    chunks = [{"path": path, "snippet": read_file(project_id, path), "line": 1} for path in files]
+    packed = pack_context(chunks, 400)
+    assert packed.chunks_dropped == 0 and packed.paths == files
+
+
+def test_map_reduce_streams_partitions_and_merges_findings(client, monkeypatch):
+  monkeypatch.setattr(rag_pipeline, "generate_cached_outcome", _fake_llm)
+  project_id = _project(client)
+  resp = client.post("/reviewRepoStream", json={"project_id": project_id, "query": "input validation"})
+  events = [json.loads(line) for line in resp.text.splitlines()]
+  partitions = [e for e in events if e["type"] == "partition"]
+  summary = events[-1]
+  assert summary["type"] == "summary" and not summary["timed_out"]
+  assert sorted(path for e in partitions for path in e["files"]) == sorted(
+    path for files in partition_files(project_id, 400) for path in files
+  )
+  assert summary["files_reviewed"] == summary["files_total"] == 12
+  shared = [f for f in summary["findings"] if f["issue"] == "Unvalidated request input"]
+  assert len(shared) == 1 and shared[0]["severity"] == "medium"
+  assert len([f for f in summary["findings"] if f["issue"].startswith("Review of")]) == len(partitions)
+
+  resp = client.post("/reviewRepo", json={"project_id": project_id, "review_mode": "map_reduce"})
+  assert resp.status_code == 200 and resp.json()["files_reviewed"] == 12
+
+
+def test_map_reduce_respects_deadline(client, monkeypatch):
+  def slow_llm(prompt, system="", project_id=None):
+    time.sleep(0.3)
+    return None, "sent"
+
+  monkeypatch.setattr(rag_pipeline, "generate_cached_outcome", slow_llm)
+  monkeypatch.setattr(settings, "review_concurrency", 1)
+  monkeypatch.setattr(settings, "review_deadline_seconds", 0.1)
+  project_id = _project(client)
+  started = time.monotonic()
+  summary = run_repo_review(project_id, "review", review_mode="map_reduce")
+  assert time.monotonic() - started < 0.3
+  assert summary["timed_out"] and summary["files_reviewed"] < summary["files_total"]
@@ -0,0 +1,68 @@
+import io
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import snippets
+from app.config import settings
+from app.db import init_db
+from app.main import app
+from app.rag_pipeline import retrieve_top_k
+from app.snippets import FileLines
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return TestClient(app)
+
+
+def _zip(files):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    for name, body in files.items():
+      zf.writestr(name, body)
+  return buf.getvalue()
+
+
+@pytest.mark.parametrize("text", ["", "a", "a\nb", "a\nb\n", "a\n\n\nb\n\n", "\n"])
+def test_slices_match_splitlines(text):
+  lines = FileLines(text)
+  expected = text.splitlines()
+  assert lines.line_count == len(expected)
+  for start in range(1, len(expected) + 2):
+    for end in range(start - 1, len(expected) + 2):
+      assert lines.slice(start, end) == "\n".join(expected[start - 1 : end])
+
+
+def test_retrieval_reads_each_file_once(client, monkeypatch):
+  files = {
+    f"handlers{i}.py": "".join(f"def handle_order_{n}(order):\n  return validate_order(order)\n\n" for n in range(15))
+    for i in range(2)
+  }
+  files["validation.py"] = "def validate_order(order):\n  return order\n"
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", _zip(files))}).json()["project_id"]
+  assert client.post("/embedRepo", params={"project_id": project_id}).status_code == 200
+
+  reads = []
+  original = snippets.read_file
+  monkeypatch.setattr(snippets, "read_file", lambda pid, path: reads.append(path) or original(pid, path))
+  snippets.invalidate_snippets(project_id)
+  hits = retrieve_top_k(project_id, "handle order", k=20, mode="lexical")
+  assert len(hits) >= 20
+  assert sorted(reads) == sorted(set(reads))
+  assert all(h["snippet"].startswith(f"def handle_order_") for h in hits[:20])
+  assert any(h.get("definition_of") == "validate_order" for h in hits)
+
+  # Cached contents are reused until the file changes on disk.
+  retrieve_top_k(project_id, "handle order", k=20, mode="lexical")
+  assert sorted(reads) == sorted(set(reads))
+  target = settings.storage_dir / project_id / "handlers0.py"
+  time.sleep(0.01)
+  target.write_text("def handle_order_0(order):\n  return None\n")
+  assert snippets.snippet(project_id, "handlers0.py", 2, 2) == "  return None"
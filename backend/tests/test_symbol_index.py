@@ -0,0 +1,91 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import init_db, symbol_file_hashes
+from app.main import app
+from app.rag_pipeline import retrieve_top_k
+from app.repo_parser import analyze_file
+from app.symbol_index import ensure_symbol_index, unused_symbols
+from app.symbols import regex_definitions
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return TestClient(app)
+
+
+def _zip(files):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    for name, body in files.items():
+      zf.writestr(name, body)
+  return buf.getvalue()
+
+
+def test_definitions_record_kind_span_and_decorators():
+  source = "import x\n\n@app.get('/')\ndef route():\n  pass\n\nclass Thing(Base):\n  def run(self):\n    pass\n"
+  symbols = sorted(analyze_file(Path("m.py"), source, "m.py").symbols, key=lambda s: s.start_line)
+  assert [(s.name, s.kind, s.start_line, s.end_line, s.decorated) for s in symbols] == [
+    ("route", "function", 4, 5, True),
+    ("Thing", "class", 7, 9, False),
+    ("run", "method", 8, 9, False),
+  ]
+  # Files tree-sitter cannot chunk fall back to the regexes.
+  assert [(s.name, s.decorated) for s in regex_definitions(source, "m.py")] == [("route", True), ("Thing", False), ("run", False)]
+
+
+def test_unused_symbols_see_later_files_and_update_incrementally(client):
+  files = {
+    "a.py": "from b import used_later\n\nused_later()\n",
+    "b.py": "def used_later():\n  return 1\n\n\ndef orphan():\n  return 2\n",
+  }
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", _zip(files))}).json()["project_id"]
+  assert [(s["name"], s["path"], s["line"]) for s in unused_symbols(project_id)] == [("orphan", "b.py", 5)]
+  assert ensure_symbol_index(project_id) == 0
+
+  files["a.py"] = "import b\n\nb.orphan()\n"
+  client.post("/uploadRepo", params={"project_id": project_id}, files={"file": ("repo.zip", _zip(files))})
+  assert [s["name"] for s in unused_symbols(project_id)] == ["used_later"]
+  assert set(symbol_file_hashes(project_id)) == {"a.py", "b.py"}
+
+  del files["a.py"]
+  client.post("/uploadRepo", params={"project_id": project_id}, files={"file": ("repo.zip", _zip(files))})
+  assert sorted(s["name"] for s in unused_symbols(project_id)) == ["orphan", "used_later"]
+  assert set(symbol_file_hashes(project_id)) == {"b.py"}
+
+
+def test_symbol_endpoints_and_definition_expansion(client):
+  files = {
+    "lib.py": "def compute_total(items):\n  return sum(items)\n",
+    "app.py": "from lib import compute_total\n\n\ndef handler(order):\n  return compute_total(order.items)\n",
+  }
+  project_id = client.post("/uploadRepo", files={"file": ("repo.zip", _zip(files))}).json()["project_id"]
+  assert client.post("/embedRepo", params={"project_id": project_id}).status_code == 200
+  assert ensure_symbol_index(project_id) == 0  # embedding already recorded the symbols
+
+  definition = client.get("/findDefinition", params={"project_id": project_id, "name": "compute_total"}).json()
+  assert [(s["path"], s["kind"], s["start_line"], s["end_line"]) for s in definition["symbols"]] == [
+    ("lib.py", "function", 1, 2)
+  ]
+  assert definition["symbols"][0]["chunk_id"]
+
+  refs = client.get("/findReferences", params={"project_id": project_id, "name": "compute_total"}).json()
+  assert [(r["path"], r["line"]) for r in refs["references"]] == [("app.py", 1), ("app.py", 5)]
+
+  listed = client.get("/listSymbols", params={"project_id": project_id, "path": "app.py"}).json()
+  assert [s["name"] for s in listed["symbols"]] == ["handler"]
+
+  hits = retrieve_top_k(project_id, "def handler(order):\n  return compute_total(order.items)", k=1)
+  assert hits[0]["path"] == "app.py"
+  assert {"path": "lib.py", "definition_of": "compute_total", "line": 1} == {
+    key: hits[-1][key] for key in ("path", "definition_of", "line")
+  }
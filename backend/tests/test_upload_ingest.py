@@ -0,0 +1,64 @@
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.db import init_db
+from app.main import app
+from app.repo_parser import MAX_FILE_BYTES
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "database_path", tmp_path / "projects.db")
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  init_db()
+  return TestClient(app)
+
+
+def _zip(entries, compression=zipfile.ZIP_STORED):
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+    for name, content in entries.items():
+      zf.writestr(name, content)
+  return buf.getvalue()
+
+
+def test_only_allowed_entries_are_extracted(client, tmp_path):
+  archive = _zip(
+    {
+      "src/app.py": "print('hi')\n",
+      "node_modules/lib/index.js": "module.exports = 1;\n",
+      "assets/logo.png": b"\x89PNG",
+      "src/huge.json": "x" * (MAX_FILE_BYTES + 1),
+      "../escape.py": "import os\n",
+    }
+  )
+  body = client.post("/uploadRepo", files={"file": ("repo.zip", archive)}).json()
+  project = tmp_path / body["project_id"]
+  assert body["files"] == ["src/app.py"]
+  assert not (project / "node_modules").exists()
+  assert not (project / "assets").exists()
+  assert not (tmp_path / "escape.py").exists()
+  manifest = json.loads((project / "manifest.json").read_text())
+  assert list(manifest["files"]) == ["src/app.py"]
+  assert len(manifest["files"]["src/app.py"]) == 64
+  assert not any((tmp_path / ".uploads").iterdir())
+
+
+def test_zip_bomb_is_rejected(client, tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "max_compression_ratio", 50)
+  archive = _zip({"bomb.json": "0" * 300_000}, compression=zipfile.ZIP_DEFLATED)
+  resp = client.post("/uploadRepo", files={"file": ("repo.zip", archive)})
+  assert resp.status_code == 413
+  assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == [".uploads"]
+
+
+def test_total_size_limit(client, monkeypatch):
+  monkeypatch.setattr(settings, "max_extract_bytes", 100)
+  archive = _zip({"a.py": "a = 1\n" * 10, "b.py": "b = 2\n" * 10})
+  assert client.post("/uploadRepo", files={"file": ("repo.zip", archive)}).status_code == 413
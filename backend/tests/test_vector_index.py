@@ -0,0 +1,167 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.embeddings import LOCAL_MODEL
+from app.rag_pipeline import retrieve_top_k
+from app.vector_index import LocalVectorIndex
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+  monkeypatch.setattr(settings, "storage_dir", tmp_path)
+  monkeypatch.setattr(settings, "qdrant_url", None)
+  return tmp_path
+
+
+def test_search_returns_top_k_by_cosine():
+  index = LocalVectorIndex.load("p")
+  index.upsert_chunks("a.py", [[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]], [(1, 3), (5, 9)])
+  index.upsert_chunks("b.py", [[0.7, 0.7, 0.0]], [(1, 2)])
+  hits = index.search([1.0, 0.1, 0.0], k=2)
+  rows = [index.row(row) for row, _ in hits]
+  assert [(r.path, r.start_line, r.end_line) for r in rows] == [("a.py", 1, 3), ("b.py", 1, 2)]
+  assert hits[0][1] > hits[1][1]
+  scoped = index.search([1.0, 0.1, 0.0], k=5, paths=["b.py"])
+  assert [index.row(row).path for row, _ in scoped] == ["b.py"]
+  assert scoped[0][1] == pytest.approx(hits[1][1])
+
+
+def test_upsert_replaces_file_chunks_and_save_roundtrips():
+  index = LocalVectorIndex.load("p")
+  index.upsert_chunks("a.py", [[1.0, 0.0], [0.5, 0.5]], [(1, 2), (3, 4)])
+  index.upsert_chunks("b.py", [[0.0, 1.0]], [(1, 1)])
+  index.upsert_chunks("a.py", [[0.0, 2.0]], [(10, 12)])
+  index.remove_paths(["b.py"])
+  index.save()
+
+  loaded = LocalVectorIndex.load("p")
+  assert loaded.paths == ["a.py"]
+  assert len(loaded) == 1
+  assert isinstance(loaded.vectors, np.memmap)
+  np.testing.assert_allclose(loaded.vectors[0], [0.0, 1.0])
+  assert loaded.row(0).start_line == 10
+
+
+def test_fallback_retrieval_returns_chunk_text_and_lines(storage):
+  project = storage / "p"
+  project.mkdir()
+  (project / "m.py").write_text("import os\n\ndef target():\n  return os.getcwd()\n")
+  from app.embeddings import embed_text
+
+  index = LocalVectorIndex.empty("p", LOCAL_MODEL)
+  index.upsert_chunks("m.py", [embed_text("def target():\n  return os.getcwd()")], [(3, 4)])
+  index.save()
+  hits = retrieve_top_k("p", "target", k=1)
+  assert hits[0]["line"] == 3
+  assert hits[0]["end_line"] == 4
+  assert hits[0]["snippet"] == "def target():\n  return os.getcwd()"
+
+
+def test_path_scoped_retrieval_survives_graph_errors(storage, monkeypatch):
+  import sqlite3
+
+  from app import rag_pipeline
+  from app.embeddings import embed_text
+
+  project = storage / "p"
+  project.mkdir()
+  (project / "m.py").write_text("def target():\n  return 1\n")
+  index = LocalVectorIndex.empty("p", LOCAL_MODEL)
+  index.upsert_chunks("m.py", [embed_text("def target():\n  return 1")], [(1, 2)])
+  index.save()
+
+  def broken(project_id):
+    raise sqlite3.OperationalError("database is locked")
+
+  monkeypatch.setattr(rag_pipeline, "get_graph", broken)
+  hits = retrieve_top_k("p", "target", k=1, path="m.py", mode="vector")
+  assert [h["path"] for h in hits] == ["m.py"]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_storage_shrinks_and_reranks_to_exact_order(storage, monkeypatch, dtype):
+  rng = np.random.default_rng(0)
+  vectors = rng.standard_normal((400, 32)).astype(np.float32)
+  queries = rng.standard_normal((10, 32)).astype(np.float32)
+
+  exact = LocalVectorIndex.load("p")
+  exact.upsert_chunks("a.py", vectors, [(i, i) for i in range(len(vectors))])
+  expected = [[row for row, _ in exact.search(q, k=5)] for q in queries]
+
+  monkeypatch.setattr(settings, "local_vector_dtype", dtype)
+  monkeypatch.setattr(settings, "local_vector_rerank", 4)
+  index = LocalVectorIndex.load("q")
+  index.upsert_chunks("a.py", vectors, [(i, i) for i in range(len(vectors))])
+  index.save()
+  loaded = LocalVectorIndex.load("q")
+  assert loaded.vectors.dtype == np.dtype(dtype) and isinstance(loaded.full, np.memmap)
+  assert [[row for row, _ in loaded.search(q, k=5)] for q in queries] == expected
+
+  monkeypatch.setattr(settings, "local_vector_rerank", 0)
+  loaded.upsert_chunks("b.py", vectors[:1], [(1, 1)])
+  loaded.save()
+  compact = LocalVectorIndex.load("q")
+  assert compact.full is None and len(compact) == 401
+  assert not (storage / "q" / "index" / "full.npy").exists()
+  assert (storage / "q" / "index" / "vectors.npy").stat().st_size < vectors.nbytes * 0.6
+  approx = [[row for row, _ in compact.search(q, k=5)] for q in queries]
+  recall = np.mean([len(set(a) & set(e)) / 5 for a, e in zip(approx, expected)])
+  assert recall >= 0.8
+
+
+def test_save_converts_index_stored_with_another_dtype(storage, monkeypatch):
+  vectors = np.random.default_rng(2).standard_normal((50, 16)).astype(np.float32)
+  index = LocalVectorIndex.load("p")
+  index.upsert_chunks("a.py", vectors, [(i, i) for i in range(len(vectors))])
+  index.save()
+
+  monkeypatch.setattr(settings, "local_vector_dtype", "int8")
+  loaded = LocalVectorIndex.load("p")
+  top = [row for row, _ in loaded.search(vectors[0], k=3)]
+  assert loaded.vectors.dtype == np.float32
+  loaded.save()
+  converted = LocalVectorIndex.load("p")
+  assert converted.vectors.dtype == np.int8 and converted.scales.shape == (50,) and converted.full is None
+  assert [row for row, _ in converted.search(vectors[0], k=3)][0] == top[0]
+
+
+def test_ivf_probe_recall_and_incremental_assignment(storage):
+  rng = np.random.default_rng(1)
+  centers = rng.standard_normal((20, 16)).astype(np.float32)
+  vectors = centers[rng.integers(0, 20, 2000)] + 0.2 * rng.standard_normal((2000, 16)).astype(np.float32)
+  index = LocalVectorIndex.load("p")
+  for start in range(0, 2000, 100):
+    index.upsert_chunks(f"f{start}.py", vectors[start : start + 100], [(i, i) for i in range(100)])
+  index.build_ann(nlist=20)
+  index.save()
+
+  loaded = LocalVectorIndex.load("p")
+  assert loaded.centroids.shape == (20, 16) and loaded.assign.shape == (2000,)
+  queries = vectors[rng.integers(0, 2000, 20)] + 0.05 * rng.standard_normal((20, 16)).astype(np.float32)
+  exact = [{row for row, _ in loaded.search(q, k=10, nprobe=0)} for q in queries]
+  approx = [{row for row, _ in loaded.search(q, k=10, nprobe=3)} for q in queries]
+  assert np.mean([len(a & e) / 10 for a, e in zip(approx, exact)]) >= 0.9
+  assert [row for row, _ in loaded.search(queries[0], k=10, nprobe=20)] == [
+    row for row, _ in loaded.search(queries[0], k=10, nprobe=0)
+  ]
+
+  # New chunks join the closest existing list and are found without retraining.
+  loaded.upsert_chunks("new.py", [centers[3]], [(1, 1)])
+  loaded.save()
+  reloaded = LocalVectorIndex.load("p")
+  assert reloaded.assign.shape == (2001,)
+  assert reloaded.row(reloaded.search(centers[3], k=1, nprobe=1)[0][0]).path == "new.py"
+
+
+def test_ivf_search_with_only_empty_probed_lists_scans_exactly(storage):
+  rng = np.random.default_rng(3)
+  near_x = np.array([1.0, 0.0, 0.0, 0.0]) + 0.05 * rng.standard_normal((20, 4))
+  near_y = np.array([0.0, 1.0, 0.0, 0.0]) + 0.05 * rng.standard_normal((20, 4))
+  index = LocalVectorIndex.load("p")
+  index.upsert_chunks("x.py", near_x, [(i, i) for i in range(20)])
+  index.upsert_chunks("y.py", near_y, [(i, i) for i in range(20)])
+  index.build_ann(nlist=2)
+  index.remove_paths(["y.py"])
+  hits = index.search([0.0, 1.0, 0.0, 0.0], k=3, nprobe=1)
+  assert len(hits) == 3 and {index.row(row).path for row, _ in hits} == {"x.py"}
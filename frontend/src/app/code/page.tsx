@@ -2,7 +2,7 @@
 
 import { useEffect, useMemo, useState } from "react";
 import { ReviewFinding } from "@/lib/types";
-import { backendUrl } from "@/lib/backend";
+import { backendUrl, fetchAllProjects } from "@/lib/backend";
 import { Prism as SyntaxHighlighter } from "react-syntax-highlighter";
 import { atomDark } from "react-syntax-highlighter/dist/cjs/styles/prism";
 
@@ -27,9 +27,8 @@ export default function CodePage() {
   const [expanded, setExpanded] = useState<Set<string>>(new Set());
 
   useEffect(() => {
-    fetch(`${backendUrl}/listProjects`)
-      .then((res) => res.json())
-      .then((data) => setProjects(data.projects || []))
+    fetchAllProjects<{ id: string; name: string; files: string[] }>()
+      .then(setProjects)
       .catch(() => setProjects([]));
     const params = new URLSearchParams(window.location.search);
     const projectId = params.get("projectId");
@@ -1,22 +1,38 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { backendFetch } from "@/lib/backend";
+import { backendFetch, ProjectPage } from "@/lib/backend";
+
+type ProjectFiles = { id: string; name: string; files: string[] };
+
+// Projects fetched per "Load more"; each carries its full file list, so pages stay small.
+const PAGE_SIZE = 50;
 
 export default function FilesPage() {
-  const [projects, setProjects] = useState<{ id: string; name: string; files: string[] }[]>([]);
+  const [projects, setProjects] = useState<ProjectFiles[]>([]);
+  const [total, setTotal] = useState(0);
+  const [loading, setLoading] = useState(false);
 
-  useEffect(() => {
-    backendFetch<{ projects: { id: string; name: string; files: string[] }[] }>("/listProjects")
+  function loadPage(offset: number) {
+    setLoading(true);
+    backendFetch<ProjectPage<ProjectFiles>>(`/listProjects?include_files=true&limit=${PAGE_SIZE}&offset=${offset}`)
       .then((data) => {
         const cleaned =
           data.projects?.map((p) => ({
             ...p,
             files: (p.files || []).filter((f) => !f.includes("__MACOSX") && !f.includes("._"))
           })) || [];
-        setProjects(cleaned);
+        setProjects((prev) => (offset === 0 ? cleaned : [...prev, ...cleaned]));
+        setTotal(data.total ?? cleaned.length);
+      })
+      .catch(() => {
+        if (offset === 0) setProjects([]);
       })
-      .catch(() => setProjects([]));
+      .finally(() => setLoading(false));
+  }
+
+  useEffect(() => {
+    loadPage(0);
   }, []);
 
   return (
@@ -62,6 +78,15 @@ export default function FilesPage() {
           );
         })}
       </div>
+      {projects.length < total && (
+        <button
+          className="rounded-lg border border-slate-700 px-4 py-2 text-sm text-slate-200 hover:bg-slate-800/60 disabled:opacity-50"
+          disabled={loading}
+          onClick={() => loadPage(projects.length)}
+        >
+          {loading ? "Loading…" : `Load more (${projects.length} of ${total})`}
+        </button>
+      )}
     </div>
   );
 }
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { backendFetch, backendUrl } from "@/lib/backend";
+import { backendFetch, backendUrl, fetchAllProjects } from "@/lib/backend";
 
 interface ProjectInfo {
   id: string;
@@ -33,8 +33,8 @@ export default function RepoReviewPage() {
   const [activeFileContent, setActiveFileContent] = useState<string>("");
 
   useEffect(() => {
-    backendFetch<{ projects: ProjectInfo[] }>("/listProjects")
-      .then((data) => setProjects(data.projects || []))
+    fetchAllProjects<ProjectInfo>()
+      .then(setProjects)
       .catch(() => setProjects([]));
   }, []);
 
@@ -10,3 +10,25 @@ export async function backendFetch<T = any>(path: string, init?: RequestInit): P
   }
   return (await res.json()) as T;
 }
+
+export interface ProjectPage<T> {
+  projects: T[];
+  total: number;
+  limit: number;
+  offset: number;
+}
+
+// Largest page /listProjects serves.
+const PROJECT_PAGE_LIMIT = 500;
+
+// Every project, following total/offset across pages; for pickers that must list them all.
+export async function fetchAllProjects<T = any>(): Promise<T[]> {
+  const projects: T[] = [];
+  for (;;) {
+    const page = await backendFetch<ProjectPage<T>>(
+      `/listProjects?limit=${PROJECT_PAGE_LIMIT}&offset=${projects.length}`
+    );
+    projects.push(...(page.projects || []));
+    if (!page.projects?.length || projects.length >= page.total) return projects;
+  }
+}